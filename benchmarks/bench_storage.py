@@ -0,0 +1,158 @@
+"""
+Storage backends benchmark: latency and throughput of the database calls
+made by the weather and queries endpoints, on PostgreSQL and SQLite.
+
+Run from the project root (PostgreSQL settings are read from .env):
+    python -m benchmarks.bench_storage --backend all --rows 2000
+Rows written to PostgreSQL are deleted at the end.
+"""
+
+# Other imports
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+BACKENDS = ('sqlite', 'postgresql')
+
+
+def summary(name: str, latencies: List[float], elapsed: float) -> str:
+    percentiles = statistics.quantiles(latencies, n=100)
+    return (
+        f'{name:<22}{len(latencies) / elapsed:>10.0f}'
+        f'{percentiles[49] * 1000:>10.3f}'
+        f'{percentiles[94] * 1000:>10.3f}'
+        f'{percentiles[98] * 1000:>10.3f}'
+    )
+
+
+def measure(call: Callable[[int], None], count: int, threads: int) -> tuple:
+    """Runs ``call(i)`` for ``count`` values of ``i`` in ``threads``"""
+    def timed(i: int) -> float:
+        started = time.perf_counter()
+        call(i)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    if threads == 1:
+        latencies = [timed(i) for i in range(count)]
+    else:
+        with ThreadPoolExecutor(threads) as executor:
+            latencies = list(executor.map(timed, range(count)))
+    return latencies, time.perf_counter() - started
+
+
+def run(backend: str, rows: int, threads: int):
+    # Configuration is read on import, and the API key is only checked
+    os.environ['DB_BACKEND'] = backend
+    os.environ.setdefault('OPEN_WEATHER_API_KEY', 'benchmark')
+    from src.api_versions.v1.database import (  # noqa: I100
+        City,
+        Observation,
+        Query,
+        SessionLocal,
+        engine,
+        weather_conditions
+    )
+
+    db = SessionLocal()
+    city = City(name='Benchmark City', country='XX', lat=0.5, lon=0.5)
+    db.add(city)
+    db.commit()
+    observation = Observation(
+        city_id=city.id, observed_at=1700000000,
+        weather_condition_id=weather_conditions.encode(
+            'Clouds', 'broken clouds', '04d'
+        ),
+        temp=12.5, pressure=1012, humidity=70, visibility=10000,
+        wind_speed=3.5, wind_deg=200, wind_point=4, cloudiness=75,
+        sunrise=1700000000, sunset=1700040000
+    )
+    db.add(observation)
+    db.commit()
+    city_id, observation_id = city.id, observation.id
+    db.close()
+    query_ids = []
+
+    def insert(_i: int):
+        # Same calls as a weather request for a known city and observation
+        db = SessionLocal()
+        try:
+            if db.query(City).filter(City.id == city_id).first() is None:
+                raise RuntimeError('Benchmark city is gone')
+            query = Query(observation_id=observation_id)
+            db.add(query)
+            db.commit()
+            query_ids.append(query.id)
+        finally:
+            db.close()
+
+    def get_by_id(_i: int):
+        db = SessionLocal()
+        try:
+            db.get(Query, random.choice(query_ids))
+        finally:
+            db.close()
+
+    def get_page(_i: int):
+        db = SessionLocal()
+        try:
+            db.query(Query).order_by(Query.id.desc()).limit(100).all()
+        finally:
+            db.close()
+
+    print(f'\n{backend} ({engine.url.render_as_string(hide_password=True)}),'
+          f' {rows} rows, {threads} threads')
+    print(f'{"operation":<22}{"ops/s":>10}{"p50 ms":>10}'
+          f'{"p95 ms":>10}{"p99 ms":>10}')
+    try:
+        print(summary('insert', *measure(insert, rows, 1)))
+        print(summary(f'insert x{threads}', *measure(insert, rows, threads)))
+        print(summary('get by id', *measure(get_by_id, rows, 1)))
+        print(summary(f'get by id x{threads}',
+                      *measure(get_by_id, rows, threads)))
+        print(summary('page of 100', *measure(get_page, rows // 10, 1)))
+    finally:
+        db = SessionLocal()
+        db.query(Query).filter(
+            Query.observation_id == observation_id
+        ).delete()
+        db.query(Observation).filter(Observation.id == observation_id).delete()
+        db.query(City).filter(City.id == city_id).delete()
+        db.commit()
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--backend', choices=BACKENDS + ('all',),
+                        default='all')
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    if args.backend != 'all':
+        run(args.backend, args.rows, args.threads)
+        return
+    # Each backend in its own process, as the engine is created on import
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in BACKENDS:
+            env = dict(os.environ, SQLITE_PATH=os.path.join(
+                directory, 'bench.db'
+            ))
+            subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_storage',
+                 '--backend', backend, '--rows', str(args.rows),
+                 '--threads', str(args.threads)],
+                env=env, check=False
+            )
+
+
+if __name__ == '__main__':
+    main()
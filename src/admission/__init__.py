@@ -0,0 +1,19 @@
+"""
+This module contains adaptive admission control: concurrency limits which
+follow observed latency, event loop lag and database pool usage, and a
+middleware rejecting requests over the limit.
+"""
+
+from .admission import (
+    AdaptiveLimiter,
+    AdmissionController,
+    AdmissionMiddleware
+)
+from .loop_lag import LoopLagMonitor
+
+__all__ = [
+    'AdaptiveLimiter',
+    'AdmissionController',
+    'AdmissionMiddleware',
+    'LoopLagMonitor'
+]
@@ -0,0 +1,200 @@
+"""
+This module contains adaptive admission control: concurrency limits which
+follow observed latency, event loop lag and database pool usage, and a
+middleware rejecting requests over the limit.
+"""
+
+import json
+import time
+from typing import Callable, Dict, List, Sequence, Tuple, Union
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .loop_lag import LoopLagMonitor
+
+__all__ = [
+    'AdaptiveLimiter',
+    'AdmissionController',
+    'AdmissionMiddleware'
+]
+
+DEFAULT_CLASS = 'default'
+EXPENSIVE_CLASS = 'expensive'
+
+
+def _under(path: str, paths: Tuple[str, ...]) -> bool:
+    """Whether ``path`` is any of ``paths`` or below one of them"""
+    return any(
+        path == parent or path.startswith(parent + '/') for parent in paths
+    )
+
+
+class AdaptiveLimiter:
+    def __init__(
+            self,
+            initial_limit: int = 20,
+            min_limit: int = 1,
+            max_limit: int = 200,
+            target_latency: float = 1.0,
+            backoff: float = 0.9
+    ):
+        """
+        AIMD concurrency limit: grows by one for every ``limit`` requests
+        completed in time while the limit is in use, and is multiplied by
+        ``backoff`` (at most once per ``target_latency``) when a request is
+        slower than ``target_latency`` or the server is overloaded.
+        """
+        self._limit = float(initial_limit)
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._target_latency = target_latency
+        self._backoff = backoff
+        self._last_backoff = 0.0
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = 0
+
+    def __repr__(self):
+        return (f'AdaptiveLimiter(limit={self.limit}, '
+                f'in_flight={self.in_flight})')
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= self.limit:
+            self.shed += 1
+            return False
+        self.in_flight += 1
+        self.admitted += 1
+        return True
+
+    def release(self, latency: float, overloaded: bool = False):
+        in_use = self.in_flight
+        self.in_flight -= 1
+        if overloaded or latency > self._target_latency:
+            now = time.monotonic()
+            if now - self._last_backoff >= self._target_latency:
+                self._last_backoff = now
+                self._limit = max(self._limit * self._backoff, self._min_limit)
+        elif in_use * 2 >= self._limit:
+            self._limit = min(self._limit + 1 / self._limit, self._max_limit)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'limit': self.limit,
+            'in_flight': self.in_flight,
+            'admitted': self.admitted,
+            'shed': self.shed
+        }
+
+
+class AdmissionController:
+    def __init__(
+            self,
+            expensive_paths: List[str],
+            limiter_factory: Callable[[], AdaptiveLimiter] = AdaptiveLimiter,
+            loop_monitor: Union[LoopLagMonitor, None] = None,
+            max_loop_lag: float = 0.2,
+            db_pool_usage: Union[Callable[[], float], None] = None,
+            stream_paths: Sequence[str] = (),
+            prefixes: Sequence[str] = ('',)
+    ):
+        """
+        Requests to any of ``expensive_paths`` (or below it) under any of
+        route ``prefixes`` get their own limiter, so they can't starve
+        cheap requests. Long-lived responses of ``stream_paths`` are not
+        limited, as they would hold a slot for hours and skew the latency
+        signal.
+        The server counts as overloaded while event loop lag is over
+        ``max_loop_lag`` seconds or every database connection is in use.
+        """
+        self._expensive_paths = tuple(
+            prefix + path for prefix in prefixes for path in expensive_paths
+        )
+        self._stream_paths = tuple(
+            prefix + path for prefix in prefixes for path in stream_paths
+        )
+        self._limiters = {
+            DEFAULT_CLASS: limiter_factory(),
+            EXPENSIVE_CLASS: limiter_factory()
+        }
+        self.loop_monitor = loop_monitor or LoopLagMonitor()
+        self._max_loop_lag = max_loop_lag
+        self._db_pool_usage = db_pool_usage
+
+    def limiter(self, path: str) -> Union[AdaptiveLimiter, None]:
+        if _under(path, self._stream_paths):
+            return None
+        if _under(path, self._expensive_paths):
+            return self._limiters[EXPENSIVE_CLASS]
+        return self._limiters[DEFAULT_CLASS]
+
+    @property
+    def overloaded(self) -> bool:
+        if self.loop_monitor.lag > self._max_loop_lag:
+            return True
+        return bool(self._db_pool_usage and self._db_pool_usage() >= 1)
+
+    def stats(self) -> dict:
+        return {
+            'loop_lag': round(self.loop_monitor.lag, 6),
+            'max_loop_lag': round(self.loop_monitor.max_lag, 6),
+            'db_pool_usage': (
+                round(self._db_pool_usage(), 3)
+                if self._db_pool_usage else None
+            ),
+            'overloaded': self.overloaded,
+            'limiters': {
+                name: limiter.stats()
+                for name, limiter in self._limiters.items()
+            }
+        }
+
+
+class AdmissionMiddleware:
+    def __init__(
+            self,
+            app: ASGIApp,
+            controller: AdmissionController,
+            retry_after: int = 1
+    ):
+        """Rejects HTTP requests over the limit with 503"""
+        self.app = app
+        self._controller = controller
+        self._retry_after = str(retry_after)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self._controller.limiter(scope['path'])
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        if not limiter.try_acquire():
+            await self._reject(send)
+            return
+
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(
+                time.monotonic() - start, self._controller.overloaded
+            )
+
+    async def _reject(self, send: Send):
+        body = json.dumps({'error': 'Server is overloaded'}).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': 503,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+                (b'retry-after', self._retry_after.encode())
+            ]
+        })
+        await send({'type': 'http.response.body', 'body': body})
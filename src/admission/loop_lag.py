@@ -0,0 +1,60 @@
+"""
+This module contains an event loop lag monitor: a task which sleeps for a
+fixed interval and measures how late it wakes up.
+"""
+
+import asyncio
+import time
+from typing import Union
+
+__all__ = ['LoopLagMonitor']
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = 0.1, smoothing: float = 0.2):
+        """
+        Measures lag every ``interval`` seconds and keeps its exponential
+        moving average with ``smoothing`` weight of the newest sample.
+        """
+        self._interval = interval
+        self._smoothing = smoothing
+        self._lag = 0.0
+        self._max_lag = 0.0
+        self._task: Union[asyncio.Task, None] = None
+
+    def __repr__(self):
+        return f'LoopLagMonitor(lag={self._lag:.4f})'
+
+    @property
+    def lag(self) -> float:
+        """Smoothed lag in seconds"""
+        return self._lag
+
+    @property
+    def max_lag(self) -> float:
+        return self._max_lag
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.monotonic() + self._interval
+            await asyncio.sleep(self._interval)
+            lag = max(time.monotonic() - expected, 0)
+            self._lag += (lag - self._lag) * self._smoothing
+            self._max_lag = max(self._max_lag, lag)
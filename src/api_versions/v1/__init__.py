@@ -1,4 +1,19 @@
 from .constants import API_VERSION
-from .routes import main_router
+from .database import pool_usage
+from .routes import (
+    load_city_indexes,
+    main_router,
+    query_notifier,
+    subscription_hub,
+    weather_cache_snapshot
+)
 
-__all__ = ['API_VERSION', 'main_router']
+__all__ = [
+    'API_VERSION',
+    'load_city_indexes',
+    'main_router',
+    'pool_usage',
+    'query_notifier',
+    'subscription_hub',
+    'weather_cache_snapshot'
+]
@@ -0,0 +1,245 @@
+"""
+This module contains the archive of old query records for API v1.
+Records are moved from the database to compressed Arrow IPC files, one
+per month of every archival run, and an index of ID ranges of their
+record batches lets a lookup memory map a file and read only one batch.
+
+Archive old queries from the project root (e.g. daily with cron):
+    python -m src.api_versions.v1.archive
+"""
+
+# Other imports
+import argparse
+import bisect
+import itertools
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Tuple, Union
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc  # noqa: F401
+except ImportError:
+    # Archive is optional, without pyarrow every record stays in database
+    pa = None
+
+# Main imports
+from sqlalchemy.orm import sessionmaker
+
+# Import from this API version
+from . import constants
+from .database import Observation, Query, SessionLocal
+from .pydantic_models import WeatherResponse
+
+# Rows per record batch, the unit read from a file by a lookup
+BATCH_ROWS = 4096
+ARROW_TYPES = {int: 'int64', float: 'float64', str: 'string'}
+# First ID, last ID, file path, batch number
+ArchiveEntry = Tuple[int, int, str, int]
+
+
+class QueryArchive:
+    def __init__(self, directory: str = constants.ARCHIVE_DIR):
+        """
+        Archive in ``directory``, with records as ``WeatherResponse``
+        fields (metric units, English) and ``index.json`` of the files.
+        """
+        self._directory = directory
+        self._index_path = os.path.join(directory, 'index.json')
+        self._index_mtime = None
+        self._entries: List[ArchiveEntry] = []
+        self._first_ids: List[int] = []
+
+    def __repr__(self):
+        return f'QueryArchive(directory={self._directory})'
+
+    @property
+    def available(self) -> bool:
+        return pa is not None
+
+    @staticmethod
+    def _schema() -> 'pa.Schema':
+        return pa.schema([
+            (name, ARROW_TYPES[field.annotation])
+            for name, field in WeatherResponse.model_fields.items()
+        ])
+
+    def _read_index(self) -> List[dict]:
+        try:
+            with open(self._index_path, encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return []
+
+    def _load_index(self):
+        """Loads index again if it was changed (by archival process)"""
+        try:
+            mtime = os.stat(self._index_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._index_mtime:
+            return
+        self._entries = sorted(
+            (first_id, last_id, file['path'], batch)
+            for file in self._read_index()
+            for batch, (first_id, last_id) in enumerate(file['batches'])
+        )
+        self._first_ids = [entry[0] for entry in self._entries]
+        self._index_mtime = mtime
+
+    def _find(self, query_id: int) -> Union[ArchiveEntry, None]:
+        position = bisect.bisect_right(self._first_ids, query_id) - 1
+        if position < 0 or self._entries[position][1] < query_id:
+            return None
+        return self._entries[position]
+
+    @property
+    def last_id(self) -> Union[int, None]:
+        """
+        Largest archived query ID, None if nothing is archived. Queries
+        are archived in ID order, so every ID up to it that still exists
+        is in the archive, or in both places after an interrupted run.
+        """
+        if not self.available:
+            return None
+        self._load_index()
+        return max((entry[1] for entry in self._entries), default=None)
+
+    def get_many(self, query_ids: Iterable[int]) -> Dict[int, dict]:
+        """Archived records of ``query_ids``, missing ones are left out"""
+        if not self.available:
+            return {}
+        self._load_index()
+        wanted = {}
+        for query_id in query_ids:
+            entry = self._find(query_id)
+            if entry:
+                wanted.setdefault(entry[2:], set()).add(query_id)
+
+        records = {}
+        for (path, batch_number), batch_ids in wanted.items():
+            with pa.memory_map(os.path.join(self._directory, path)) as source:
+                batch = pa.ipc.open_file(source).get_batch(batch_number)
+                for row, query_id in enumerate(batch.column('id').to_pylist()):
+                    if query_id in batch_ids:
+                        records[query_id] = batch.slice(row, 1).to_pylist()[0]
+        return records
+
+    def get(self, query_id: int) -> Union[dict, None]:
+        return self.get_many([query_id]).get(query_id)
+
+    def write(self, records: List[dict]):
+        """
+        Writes ``records`` to a new file per month of ``utc_timestamp``
+        and adds them to the index. Records have to be sorted by ID.
+        """
+        schema = self._schema()
+        index = self._read_index()
+        for month, month_records in itertools.groupby(
+                records,
+                key=lambda record: datetime.fromtimestamp(
+                    record['utc_timestamp'], timezone.utc
+                ).strftime('%Y-%m')
+        ):
+            table = pa.Table.from_pylist(list(month_records), schema=schema)
+            path = os.path.join(
+                month,
+                f'queries-{table["id"][0]}-{table["id"][-1]}.arrow'
+            )
+            full_path = os.path.join(self._directory, path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            batches = []
+            with pa.ipc.new_file(
+                    f'{full_path}.tmp',
+                    schema,
+                    options=pa.ipc.IpcWriteOptions(compression='zstd')
+            ) as writer:
+                for batch in table.to_batches(max_chunksize=BATCH_ROWS):
+                    writer.write_batch(batch)
+                    batches.append([
+                        batch['id'][0].as_py(), batch['id'][-1].as_py()
+                    ])
+            os.replace(f'{full_path}.tmp', full_path)
+            index.append({'path': path, 'batches': batches})
+
+        os.makedirs(self._directory, exist_ok=True)
+        with open(f'{self._index_path}.tmp', 'w', encoding='utf-8') as file:
+            json.dump(index, file)
+        os.replace(f'{self._index_path}.tmp', self._index_path)
+
+    def archive_queries(
+            self,
+            to_record: Callable[[Query], WeatherResponse],
+            older_than_days: float = constants.ARCHIVE_AFTER_DAYS,
+            batch_size: int = 10000,
+            session_factory: sessionmaker = SessionLocal,
+            progress: Callable[[str], None] = print
+    ) -> int:
+        """
+        Moves queries older than ``older_than_days`` to the archive,
+        ``batch_size`` at a time, and deletes observations no query
+        refers to anymore. Queries are taken in ID order up to the first
+        new one, so ID ranges of archive files never overlap.
+        Records are written before rows are deleted, an interrupted run
+        leaves them in both places, where the database is read first.
+        """
+        if not self.available:
+            raise RuntimeError('pyarrow is required to archive queries')
+        cutoff = time.time() - older_than_days * 86400
+        archived = 0
+        while True:
+            db = session_factory()
+            try:
+                db_queries = db.query(Query).order_by(
+                    Query.id
+                ).limit(batch_size).all()
+                old_queries = list(itertools.takewhile(
+                    lambda db_query: db_query.utc_timestamp < cutoff,
+                    db_queries
+                ))
+                if not old_queries:
+                    break
+                self.write([
+                    to_record(db_query).model_dump()
+                    for db_query in old_queries
+                ])
+                last_id = old_queries[-1].id
+                db.query(Query).filter(Query.id.in_(
+                    [db_query.id for db_query in old_queries]
+                )).delete(synchronize_session=False)
+                db.query(Observation).filter(
+                    Observation.id.in_(
+                        {db_query.observation_id for db_query in old_queries}
+                    ),
+                    ~Observation.queries.any()
+                ).delete(synchronize_session=False)
+                db.commit()
+            finally:
+                db.close()
+            archived += len(old_queries)
+            progress(f'Archived {archived} queries, up to ID {last_id}')
+            if len(old_queries) < len(db_queries):
+                break
+        return archived
+
+
+def main():
+    # Routes import this module
+    from .routes import weather_response
+
+    parser = argparse.ArgumentParser(description='Archive old queries')
+    parser.add_argument('--older-than-days', type=float,
+                        default=constants.ARCHIVE_AFTER_DAYS)
+    parser.add_argument('--batch-size', type=int, default=10000)
+    args = parser.parse_args()
+    QueryArchive().archive_queries(
+        lambda db_query: weather_response(db_query, db_query.city),
+        older_than_days=args.older_than_days,
+        batch_size=args.batch_size
+    )
+
+
+if __name__ == '__main__':
+    main()
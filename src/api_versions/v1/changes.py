@@ -0,0 +1,196 @@
+"""
+This module contains notifications of new queries for API v1, which wake
+long-polling readers of the change feed. On PostgreSQL every insert is
+also sent with NOTIFY, so readers of other workers are woken too.
+"""
+
+# Other imports
+import asyncio
+import select
+import threading
+import time
+from logging import Logger
+from typing import List, Tuple, Union
+
+# Main imports
+from sqlalchemy import func, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+# Import from this API version
+from .database import Query, engine as default_engine
+
+CHANNEL = 'weather_queries'
+NOTIFY_SQL = text(f"SELECT pg_notify('{CHANNEL}', :query_id)")
+# Seconds to wait before the listener connects again after an error
+LISTEN_RETRY = 5
+# Seconds a query may take from getting its ID to being committed
+COMMIT_GRACE = 5
+
+error_logger = Logger('uvicorn.error')
+
+
+def committed_prefix(
+        db_queries: List[Query],
+        since_id: int,
+        now: Union[float, None] = None,
+        grace: float = COMMIT_GRACE
+) -> Tuple[List[Query], float]:
+    """
+    Leading ``db_queries`` (sorted by ID, all after ``since_id``) that no
+    query still being committed can come before, and seconds until the
+    first one left out can be taken (0 if none is).
+    IDs are taken at insert, but transactions of workers and threads
+    commit out of order, so a missing ID right before a query saved less
+    than ``grace`` seconds ago may still appear. Older gaps are IDs of
+    rolled back or archived queries.
+    """
+    if now is None:
+        now = time.time()
+    expected_id = since_id + 1
+    for position, db_query in enumerate(db_queries):
+        settled_in = db_query.utc_timestamp + grace - now
+        if db_query.id != expected_id and settled_in > 0:
+            return db_queries[:position], settled_in
+        expected_id = db_query.id + 1
+    return db_queries, 0
+
+
+class QueryNotifier:
+    def __init__(self, engine: Engine = default_engine):
+        """
+        Tracks the latest inserted query ID and wakes waiters for newer
+        ones. Listens for other workers only on PostgreSQL ``engine``.
+        """
+        self._engine = engine
+        self._listen = engine.dialect.name == 'postgresql'
+        self._latest_id = 0
+        self._event = asyncio.Event()
+        self._loop: Union[asyncio.AbstractEventLoop, None] = None
+        self._thread: Union[threading.Thread, None] = None
+        self._stopping = threading.Event()
+        self._counters = {'notified': 0, 'received': 0, 'timeouts': 0}
+
+    def __repr__(self):
+        return f'QueryNotifier(listen={self._listen})'
+
+    @property
+    def latest_id(self) -> int:
+        return self._latest_id
+
+    def start(self):
+        """
+        Starts from the latest saved query ID, so waiters for newer ones
+        are not woken at once, and listens for other workers, in a thread
+        """
+        self._loop = asyncio.get_running_loop()
+        with self._engine.connect() as connection:
+            latest_id = connection.execute(
+                func.max(Query.id).select()
+            ).scalar()
+        self._latest_id = max(self._latest_id, latest_id or 0)
+        if not self._listen or self._thread:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run_listener,
+            name='query-notifier',
+            daemon=True
+        )
+        self._thread.start()
+
+    async def stop(self):
+        if self._thread:
+            self._stopping.set()
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._thread.join
+            )
+            self._thread = None
+
+    def _wake(self, query_id: int):
+        """Runs in the event loop, replaces the event waiters wait for"""
+        self._latest_id = max(self._latest_id, query_id)
+        self._event.set()
+        self._event = asyncio.Event()
+
+    def _wake_threadsafe(self, query_id: int):
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            self._latest_id = max(self._latest_id, query_id)
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._wake(query_id)
+        else:
+            loop.call_soon_threadsafe(self._wake, query_id)
+
+    def notify(self, db: Session, query_id: int):
+        """
+        Announces query ``query_id`` to waiters of other workers, on
+        PostgreSQL. Is run in the transaction inserting the query, so the
+        notification is sent when it commits, and only if it does.
+        """
+        if self._listen:
+            db.execute(NOTIFY_SQL, {'query_id': str(query_id)})
+
+    def committed(self, query_id: int):
+        """
+        Wakes waiters of this worker once query ``query_id`` is
+        committed. Can be called from any thread.
+        """
+        self._counters['notified'] += 1
+        self._wake_threadsafe(query_id)
+
+    async def wait(self, since_id: int, timeout: float) -> bool:
+        """
+        Waits up to ``timeout`` seconds for a query newer than
+        ``since_id``, False if none was inserted
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Events can't be shared between loops (tests run several)
+            self._loop = loop
+            self._event = asyncio.Event()
+        if self._latest_id > since_id:
+            return True
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            self._counters['timeouts'] += 1
+            return False
+        return True
+
+    def _run_listener(self):
+        while not self._stopping.is_set():
+            connection = None
+            try:
+                # Detached, so it doesn't take a slot of the pool for good
+                connection = self._engine.raw_connection()
+                connection.detach()
+                dbapi_connection = connection.dbapi_connection
+                dbapi_connection.autocommit = True
+                dbapi_connection.cursor().execute(f'LISTEN {CHANNEL}')
+                while not self._stopping.is_set():
+                    if not select.select([dbapi_connection], [], [], 1)[0]:
+                        continue
+                    dbapi_connection.poll()
+                    while dbapi_connection.notifies:
+                        notification = dbapi_connection.notifies.pop(0)
+                        self._counters['received'] += 1
+                        self._wake_threadsafe(int(notification.payload))
+            except Exception as e:  # noqa: B902
+                error_logger.error(e)
+                self._stopping.wait(LISTEN_RETRY)
+            finally:
+                if connection is not None:
+                    connection.close()
+
+    def stats(self) -> dict:
+        return {
+            'listening': self._thread is not None,
+            'latest_id': self._latest_id,
+            **self._counters
+        }
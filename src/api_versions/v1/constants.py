@@ -10,11 +10,40 @@ __all__ = [
     'API_NAME',
     'MAIN_API_ADDRESS',
     'MAIN_SITE',
+    'DB_BACKEND',
+    'SQLITE_PATH',
     'POSTGRES_HOST',
     'POSTGRES_PORT',
     'POSTGRES_USER',
     'POSTGRES_PASSWORD',
-    'POSTGRES_NAME'
+    'POSTGRES_NAME',
+    'POSTGRES_REPLICA_HOST',
+    'POSTGRES_REPLICA_PORT',
+    'POSTGRES_REPLICA_USER',
+    'POSTGRES_REPLICA_PASSWORD',
+    'POSTGRES_REPLICA_NAME',
+    'REPLICA_MAX_LAG',
+    'REPLICA_CHECK_INTERVAL',
+    'WEATHER_CACHE_TTL',
+    'WARM_START_DIR',
+    'WARM_START_INTERVAL',
+    'QUERY_CACHE_SIZE',
+    'ARCHIVE_DIR',
+    'ARCHIVE_AFTER_DAYS',
+    'SUBSCRIPTION_POLL_INTERVAL',
+    'SUBSCRIPTION_POLLS_PER_MINUTE',
+    'SUBSCRIPTION_KEEPALIVE',
+    'COORDS_SNAP_RADIUS',
+    'UPSTREAM_CONNECT_TIMEOUT',
+    'UPSTREAM_READ_TIMEOUT',
+    'BREAKER_ERROR_RATE',
+    'BREAKER_WINDOW',
+    'BREAKER_MIN_CALLS',
+    'BREAKER_COOLDOWN',
+    'HEDGE_PERCENTILE',
+    'OPEN_WEATHER_KEY_RATE',
+    'OPEN_WEATHER_KEY_UNAUTHORIZED_COOLDOWN',
+    'OPEN_WEATHER_KEY_RATE_LIMITED_COOLDOWN'
 ]
 
 API_VERSION = 1
@@ -25,8 +54,44 @@ API_NAME = config.api_name
 MAIN_API_ADDRESS = config.main_api_address
 MAIN_SITE = config.main_site
 
+DB_BACKEND = config.db_backend
+SQLITE_PATH = config.sqlite_path
 POSTGRES_HOST = config.postgres_host
 POSTGRES_PORT = config.postgres_port
 POSTGRES_USER = config.postgres_user
 POSTGRES_PASSWORD = config.postgres_password
 POSTGRES_NAME = config.postgres_name
+POSTGRES_REPLICA_HOST = config.postgres_replica_host
+POSTGRES_REPLICA_PORT = config.postgres_replica_port
+POSTGRES_REPLICA_USER = config.postgres_replica_user
+POSTGRES_REPLICA_PASSWORD = config.postgres_replica_password
+POSTGRES_REPLICA_NAME = config.postgres_replica_name
+REPLICA_MAX_LAG = config.replica_max_lag
+REPLICA_CHECK_INTERVAL = config.replica_check_interval
+
+WEATHER_CACHE_TTL = config.weather_cache_ttl
+WARM_START_DIR = config.warm_start_dir
+WARM_START_INTERVAL = config.warm_start_interval
+QUERY_CACHE_SIZE = config.query_cache_size
+ARCHIVE_DIR = config.archive_dir
+ARCHIVE_AFTER_DAYS = config.archive_after_days
+SUBSCRIPTION_POLL_INTERVAL = config.subscription_poll_interval
+SUBSCRIPTION_POLLS_PER_MINUTE = config.subscription_polls_per_minute
+SUBSCRIPTION_KEEPALIVE = config.subscription_keepalive
+COORDS_SNAP_RADIUS = config.coords_snap_radius
+
+UPSTREAM_CONNECT_TIMEOUT = config.upstream_connect_timeout
+UPSTREAM_READ_TIMEOUT = config.upstream_read_timeout
+BREAKER_ERROR_RATE = config.breaker_error_rate
+BREAKER_WINDOW = config.breaker_window
+BREAKER_MIN_CALLS = config.breaker_min_calls
+BREAKER_COOLDOWN = config.breaker_cooldown
+HEDGE_PERCENTILE = config.hedge_percentile
+
+OPEN_WEATHER_KEY_RATE = config.open_weather_key_rate
+OPEN_WEATHER_KEY_UNAUTHORIZED_COOLDOWN = (
+    config.open_weather_key_unauthorized_cooldown
+)
+OPEN_WEATHER_KEY_RATE_LIMITED_COOLDOWN = (
+    config.open_weather_key_rate_limited_cooldown
+)
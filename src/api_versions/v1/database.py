@@ -1,32 +1,322 @@
 """
 This module contains the implementation of a database using
-SQLAlchemy (PostgreSQL).
+SQLAlchemy (PostgreSQL or SQLite).
 Used to store cities and queries.
 """
 
 # Other imports
+import logging
+import threading
+import time
+from collections import deque
 from datetime import datetime, timezone
+from typing import Callable, Tuple, TypeVar, Union
 
 # Main imports
-from sqlalchemy import Column, Float, ForeignKey, Integer, String
-from sqlalchemy import create_engine
-from sqlalchemy.engine import URL
-from sqlalchemy.orm import declarative_base, relationship, sessionmaker
+from sqlalchemy import Column, Float, ForeignKey, Integer, SmallInteger
+from sqlalchemy import String, UniqueConstraint
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, URL
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.orm import (
+    Session,
+    declarative_base,
+    relationship,
+    sessionmaker
+)
+from sqlalchemy.sql.elements import TextClause
 
-# Imports from project
+# Import from this API version
 from . import constants
+# Imports from project
+from ...open_weather_api import COMPASS_POINTS
+
+# WAL lets readers work while a write is in progress, and with it NORMAL
+# synchronous mode is still safe against corruption, only the last
+# transactions can be lost on power failure
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA foreign_keys=ON',
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA mmap_size=268435456'
+)
+# SQLite allows one writer at a time, writers of this process queue here
+# instead of polling the database lock with busy timeout sleeps
+sqlite_write_lock = threading.Lock()
+SQL_WRITES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+def _set_sqlite_pragmas(dbapi_connection, _connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+class SQLiteSession(Session):
+    """
+    Session holding ``sqlite_write_lock`` from its first write to the end
+    of the transaction. The driver begins a transaction before the first
+    write statement, sent by a flush or an executed DML statement, so the
+    database write lock is taken and released while this one is held.
+    """
+    _write_locked = False
+
+    def _lock_writes(self):
+        if not self._write_locked:
+            sqlite_write_lock.acquire()
+            self._write_locked = True
+
+    def _unlock_writes(self):
+        if self._write_locked:
+            self._write_locked = False
+            sqlite_write_lock.release()
+
+    def flush(self, objects=None):
+        if self.new or self.dirty or self.deleted:
+            self._lock_writes()
+        super().flush(objects)
+
+    def execute(self, statement, *args, **kwargs):
+        if getattr(statement, 'is_dml', False) or (
+                isinstance(statement, TextClause)
+                and statement.text.lstrip().upper().startswith(SQL_WRITES)
+        ):
+            self._lock_writes()
+        return super().execute(statement, *args, **kwargs)
+
+    def commit(self):
+        try:
+            super().commit()
+        finally:
+            self._unlock_writes()
 
-url = URL.create(
-    drivername='postgresql+psycopg2',
+    def rollback(self):
+        try:
+            super().rollback()
+        finally:
+            self._unlock_writes()
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._unlock_writes()
+
+
+def build_engine(
+        backend: str = constants.DB_BACKEND,
+        sqlite_path: str = constants.SQLITE_PATH,
+        **postgres
+) -> Engine:
+    """
+    Creates engine for ``backend``: SQLite database in ``sqlite_path``
+    file with tuned pragmas or PostgreSQL with ``postgres`` connection
+    settings (``host``, ``port``, ``username``, ``password``, ``database``).
+    """
+    if backend == 'sqlite':
+        sqlite_engine = create_engine(
+            f'sqlite:///{sqlite_path}',
+            connect_args={'check_same_thread': False, 'timeout': 5}
+        )
+        event.listen(sqlite_engine, 'connect', _set_sqlite_pragmas)
+        return sqlite_engine
+    return create_engine(
+        URL.create(drivername='postgresql+psycopg2', **postgres)
+    )
+
+
+def build_sessionmaker(bind: Engine) -> sessionmaker:
+    return sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        bind=bind,
+        class_=SQLiteSession if bind.dialect.name == 'sqlite' else Session
+    )
+
+
+engine = build_engine(
     host=constants.POSTGRES_HOST,
     port=constants.POSTGRES_PORT,
     username=constants.POSTGRES_USER,
     password=constants.POSTGRES_PASSWORD,
     database=constants.POSTGRES_NAME
 )
+SessionLocal = build_sessionmaker(engine)
+
+replica_engine = build_engine(
+    'postgresql',
+    host=constants.POSTGRES_REPLICA_HOST,
+    port=constants.POSTGRES_REPLICA_PORT,
+    username=constants.POSTGRES_REPLICA_USER,
+    password=constants.POSTGRES_REPLICA_PASSWORD,
+    database=constants.POSTGRES_REPLICA_NAME
+) if (constants.DB_BACKEND == 'postgresql'
+      and constants.POSTGRES_REPLICA_HOST) else None
+
+# Zero when everything received is replayed, so an idle primary
+# doesn't look like a lagging replica
+REPLICA_LAG_SQL = text(
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() '
+    'THEN 0 ELSE COALESCE(EXTRACT(EPOCH FROM '
+    'now() - pg_last_xact_replay_timestamp()), 0) END'
+)
+# The same before PostgreSQL 10, where WAL functions were named xlog
+REPLICA_LAG_SQL_9 = text(
+    'SELECT CASE WHEN pg_last_xlog_receive_location() '
+    '= pg_last_xlog_replay_location() '
+    'THEN 0 ELSE COALESCE(EXTRACT(EPOCH FROM '
+    'now() - pg_last_xact_replay_timestamp()), 0) END'
+)
+
+logger = logging.getLogger('uvicorn.error')
+Result = TypeVar('Result')
+
+
+class SessionRouter:
+    def __init__(
+            self,
+            primary: sessionmaker,
+            replica: Union[sessionmaker, None] = None,
+            max_lag: float = 5,
+            check_interval: float = 5
+    ):
+        """
+        Runs reads on ``replica`` while it is up and no more than
+        ``max_lag`` seconds behind (checked every ``check_interval``
+        seconds), and on ``primary`` otherwise.
+        Queries written by this process in the last ``max_lag`` seconds
+        are read from ``primary``, as the replica may not have them yet.
+        """
+        self._primary = primary
+        self._replica = replica
+        self._max_lag = max_lag
+        self._check_interval = check_interval
+        self._replica_usable = False
+        self._next_check = 0.0
+        self._lag = None
+        self._recent_writes = deque()
+        self._replica_reads = 0
+        self._primary_reads = 0
+
+    def __repr__(self):
+        return (f'SessionRouter(replica={self._replica is not None}, '
+                f'max_lag={self._max_lag})')
+
+    def _replica_lag(self) -> float:
+        db = self._replica()
+        try:
+            version = db.connection().dialect.server_version_info or ()
+            return float(db.execute(
+                REPLICA_LAG_SQL if version >= (10,) else REPLICA_LAG_SQL_9
+            ).scalar() or 0)
+        finally:
+            db.close()
+
+    def _replica_failed(self, error: Exception):
+        logger.warning(f'Read replica is unavailable: {error}')
+        self._replica_usable = False
+        self._next_check = time.monotonic() + self._check_interval
+
+    def _check_replica(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self._check_interval
+        try:
+            self._lag = self._replica_lag()
+        except DBAPIError as e:
+            # Not only connection errors, a replica the lag can't be
+            # checked on (e.g. lacking the functions) is not used either
+            self._lag = None
+            self._replica_failed(e)
+            return
+        usable = self._lag <= self._max_lag
+        if usable != self._replica_usable:
+            logger.warning(
+                f'Read replica is {"used" if usable else "not used"}, '
+                f'lag is {self._lag:.1f}s'
+            )
+        self._replica_usable = usable
+
+    def record_write(self, query_id: int):
+        """Routes reads of ``query_id`` to the primary for a while"""
+        self._recent_writes.append((time.monotonic(), query_id))
+
+    def _written_recently(self, query_id: Union[int, None]) -> bool:
+        expired = time.monotonic() - self._max_lag
+        while self._recent_writes and self._recent_writes[0][0] < expired:
+            self._recent_writes.popleft()
+        return (query_id is not None and bool(self._recent_writes)
+                and query_id >= self._recent_writes[0][1])
+
+    def read(
+            self,
+            load: Callable[[Session], Result],
+            query_id: Union[int, None] = None,
+            complete: Callable[[Result], bool] = lambda result: (
+                result is not None
+            )
+    ) -> Result:
+        """
+        Returns ``load(session)``. If the replica fails or its result is
+        not ``complete`` (by default, finds nothing), which may be rows it
+        doesn't have yet, ``load`` is run again on the primary.
+        Loaded objects are used after the session is closed, so ``load``
+        has to load everything needed.
+        """
+        use_replica = (self._replica is not None
+                       and not self._written_recently(query_id))
+        if use_replica:
+            self._check_replica()
+        if use_replica and self._replica_usable:
+            db = self._replica()
+            try:
+                result = load(db)
+                if complete(result):
+                    self._replica_reads += 1
+                    return result
+            except DBAPIError as e:
+                self._replica_failed(e)
+            finally:
+                db.close()
+
+        self._primary_reads += 1
+        db = self._primary()
+        try:
+            return load(db)
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        return {
+            'replica': self._replica is not None,
+            'replica_usable': self._replica_usable,
+            'replica_lag': self._lag,
+            'replica_reads': self._replica_reads,
+            'primary_reads': self._primary_reads
+        }
+
+
+session_router = SessionRouter(
+    primary=SessionLocal,
+    replica=build_sessionmaker(replica_engine) if replica_engine else None,
+    max_lag=constants.REPLICA_MAX_LAG,
+    check_interval=constants.REPLICA_CHECK_INTERVAL
+)
+
+
+def pool_usage() -> float:
+    """Share of database connections in use, 1 means requests wait"""
+    pool = engine.pool
+    if not hasattr(pool, 'checkedout'):
+        return 0
+    capacity = pool.size() + max(getattr(pool, '_max_overflow', 0), 0)
+    return pool.checkedout() / capacity if capacity else 0
 
-engine = create_engine(url)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
@@ -43,8 +333,8 @@ class City(Base):
         Float, default=lambda: datetime.now(timezone.utc).timestamp()
     )
 
-    queries = relationship(
-        'Query',
+    observations = relationship(
+        'Observation',
         back_populates='city',
         cascade='all, delete-orphan'
     )
@@ -70,30 +360,161 @@ class City(Base):
         )
 
 
+class WeatherCondition(Base):
+    """
+    Lookup table of weather name, description and icon combinations,
+    which queries refer to by a small ID instead of storing the strings
+    """
+    __tablename__ = 'weather_conditions'
+    __table_args__ = (UniqueConstraint('name', 'description', 'icon'),)
+
+    id = Column(  # noqa: A003, VNE003
+        SmallInteger().with_variant(Integer, 'sqlite'), primary_key=True
+    )
+    name = Column(String, nullable=False)
+    description = Column(String, nullable=False)
+    icon = Column(String, nullable=False)
+    # OpenWeatherMap condition ID, unknown for some conditions of queries
+    # saved before it was kept
+    owm_id = Column(Integer)
+
+    def __repr__(self):
+        return (
+            f'WeatherCondition(id={self.id}, '
+            f'name={self.name}, '
+            f'description={self.description}, '
+            f'icon={self.icon}, '
+            f'owm_id={self.owm_id})'
+        )
+
+
+class Observation(Base):
+    """
+    Weather in a city as OpenWeatherMap observed it at ``observed_at``.
+    Stored once and shared by every query that got it.
+    """
+    __tablename__ = 'observations'
+    __table_args__ = (UniqueConstraint('city_id', 'observed_at'),)
+
+    id = Column(Integer, primary_key=True, index=True)  # noqa: A003, VNE003
+    city_id = Column(Integer, ForeignKey('cities.id'), nullable=False)
+    # Upstream observation time ('dt'), UTC timestamp
+    observed_at = Column(Integer, nullable=False)
+    weather_condition_id = Column(
+        SmallInteger, ForeignKey('weather_conditions.id'), index=True
+    )
+    temp = Column(Float)
+    pressure = Column(Float)
+    humidity = Column(Float)
+    visibility = Column(Float)
+    wind_speed = Column(Float)
+    wind_deg = Column(Integer)
+    # Index in ``COMPASS_POINTS``
+    wind_point = Column(SmallInteger)
+    cloudiness = Column(Float)
+    sunrise = Column(Integer)
+    sunset = Column(Integer)
+
+    city = relationship('City', back_populates='observations', lazy='joined')
+    queries = relationship(
+        'Query',
+        back_populates='observation',
+        cascade='all, delete-orphan'
+    )
+
+    # Strings are decoded from in-memory maps, rows keep only codes
+    @property
+    def weather_name(self) -> str:
+        return weather_conditions.decode(self.weather_condition_id)[0]
+
+    @property
+    def weather_description(self) -> str:
+        return weather_conditions.decode(self.weather_condition_id)[1]
+
+    @property
+    def weather_icon(self) -> str:
+        return weather_conditions.decode(self.weather_condition_id)[2]
+
+    @property
+    def weather_id(self) -> Union[int, None]:
+        """OpenWeatherMap condition ID, None if it is not known"""
+        return weather_conditions.owm_id(self.weather_condition_id)
+
+    @property
+    def wind_direction(self) -> str:
+        if self.wind_point is None:
+            return ''
+        return COMPASS_POINTS[self.wind_point][0]
+
+    @property
+    def wind_code(self) -> str:
+        if self.wind_point is None:
+            return ''
+        return COMPASS_POINTS[self.wind_point][1]
+
+    def __repr__(self):
+        return (
+            f'Observation(id={self.id}, '
+            f'city_id={self.city_id}, '
+            f'observed_at={self.observed_at}, '
+            f'weather_condition_id={self.weather_condition_id}, '
+            f'temp={self.temp}, '
+            f'pressure={self.pressure}, '
+            f'humidity={self.humidity}, '
+            f'visibility={self.visibility}, '
+            f'wind_speed={self.wind_speed}, '
+            f'wind_deg={self.wind_deg}, '
+            f'wind_point={self.wind_point}, '
+            f'cloudiness={self.cloudiness}, '
+            f'sunrise={self.sunrise}, '
+            f'sunset={self.sunset})'
+        )
+
+
+def _from_observation(name: str) -> property:
+    return property(
+        lambda query: getattr(query.observation, name),
+        doc=f'``{name}`` of the observation'
+    )
+
+
 class Query(Base):
+    """
+    A weather request, referring to the observation it got. Observation
+    and city are always loaded with it, so the row can be used after its
+    session is closed.
+    """
     __tablename__ = 'queries'
 
     id = Column(Integer, primary_key=True, index=True)  # noqa: A003, VNE003
-    city_id = Column(Integer, ForeignKey('cities.id'))
-    weather_name = Column(String, index=True)
-    weather_description = Column(String, index=True)
-    weather_icon = Column(String, index=True)
-    temp = Column(Float, index=True)
-    pressure = Column(Float, index=True)
-    humidity = Column(Float, index=True)
-    visibility = Column(Float, index=True)
-    wind_speed = Column(Float, index=True)
-    wind_deg = Column(Integer, index=True)
-    wind_direction = Column(String, index=True)
-    wind_code = Column(String, index=True)
-    cloudiness = Column(Float, index=True)
-    sunrise = Column(Integer, index=True)
-    sunset = Column(Integer, index=True)
+    observation_id = Column(
+        Integer, ForeignKey('observations.id'), nullable=False, index=True
+    )
     utc_timestamp = Column(
         Float, default=lambda: datetime.now(timezone.utc).timestamp()
     )
 
-    city = relationship('City', back_populates='queries')
+    observation = relationship(
+        'Observation', back_populates='queries', lazy='joined'
+    )
+
+    city = _from_observation('city')
+    city_id = _from_observation('city_id')
+    weather_name = _from_observation('weather_name')
+    weather_description = _from_observation('weather_description')
+    weather_icon = _from_observation('weather_icon')
+    weather_id = _from_observation('weather_id')
+    temp = _from_observation('temp')
+    pressure = _from_observation('pressure')
+    humidity = _from_observation('humidity')
+    visibility = _from_observation('visibility')
+    wind_speed = _from_observation('wind_speed')
+    wind_deg = _from_observation('wind_deg')
+    wind_direction = _from_observation('wind_direction')
+    wind_code = _from_observation('wind_code')
+    cloudiness = _from_observation('cloudiness')
+    sunrise = _from_observation('sunrise')
+    sunset = _from_observation('sunset')
 
     def __str__(self):
         return (
@@ -120,23 +541,98 @@ class Query(Base):
     def __repr__(self):
         return (
             f'Query(id={self.id}, '
-            f'city_id={self.city_id}, '
-            f'weather_name={self.weather_name}, '
-            f'weather_description={self.weather_description}, '
-            f'weather_icon={self.weather_icon}, '
-            f'temp={self.temp}, '
-            f'pressure={self.pressure}, '
-            f'humidity={self.humidity}, '
-            f'visibility={self.visibility}, '
-            f'wind_speed={self.wind_speed}, '
-            f'wind_deg={self.wind_deg}, '
-            f'wind_direction={self.wind_direction}, '
-            f'wind_code={self.wind_code}, '
-            f'cloudiness={self.cloudiness}, '
-            f'sunrise={self.sunrise}, '
-            f'sunset={self.sunset}, '
+            f'observation_id={self.observation_id}, '
             f'utc_timestamp={self.utc_timestamp})'
         )
 
 
+class WeatherConditionMap:
+    def __init__(self, session_factory: sessionmaker):
+        """
+        In-memory copy of ``weather_conditions`` table, reloaded when a
+        code or a combination is not known yet (added by other process).
+        """
+        self._session_factory = session_factory
+        self._by_id = {}
+        self._by_value = {}
+        self._owm_ids = {}
+
+    def __repr__(self):
+        return f'WeatherConditionMap(size={len(self._by_id)})'
+
+    def _reload(self):
+        db = self._session_factory()
+        try:
+            rows = db.query(WeatherCondition).all()
+        finally:
+            db.close()
+        self._by_id = {
+            row.id: (row.name, row.description, row.icon) for row in rows
+        }
+        self._by_value = {value: code for code, value in self._by_id.items()}
+        self._owm_ids = {row.id: row.owm_id for row in rows}
+
+    def decode(self, code: Union[int, None]) -> Tuple[str, str, str]:
+        """Name, description and icon, empty for rows not migrated yet"""
+        if code is None:
+            return '', '', ''
+        if code not in self._by_id:
+            self._reload()
+        return self._by_id.get(code, ('', '', ''))
+
+    def owm_id(self, code: Union[int, None]) -> Union[int, None]:
+        """OpenWeatherMap condition ID, None if it is not known"""
+        if code is None:
+            return None
+        if code not in self._by_id:
+            self._reload()
+        return self._owm_ids.get(code)
+
+    def _missing(self, value: Tuple[str, str, str], owm_id) -> bool:
+        """Whether combination or its new OpenWeatherMap ID is not saved"""
+        code = self._by_value.get(value)
+        return code is None or (
+            owm_id is not None and self._owm_ids.get(code) is None
+        )
+
+    def encode(
+            self,
+            name: str,
+            description: str,
+            icon: str,
+            owm_id: Union[int, None] = None
+    ) -> int:
+        """
+        Code of the combination, added to the table if it is new. Its
+        OpenWeatherMap condition ID is saved if it is not known yet.
+        """
+        value = (name, description, icon)
+        if self._missing(value, owm_id):
+            self._reload()
+        if self._missing(value, owm_id):
+            db = self._session_factory()
+            try:
+                if value in self._by_value:
+                    db.query(WeatherCondition).filter(
+                        WeatherCondition.id == self._by_value[value]
+                    ).update({'owm_id': owm_id})
+                else:
+                    db.add(WeatherCondition(
+                        name=name,
+                        description=description,
+                        icon=icon,
+                        owm_id=owm_id
+                    ))
+                db.commit()
+            except IntegrityError:
+                # Added by other process at the same time
+                db.rollback()
+            finally:
+                db.close()
+            self._reload()
+        return self._by_value[value]
+
+
+weather_conditions = WeatherConditionMap(SessionLocal)
+
 Base.metadata.create_all(bind=engine)
@@ -0,0 +1,294 @@
+"""
+This module contains bulk ingest of OpenWeatherMap weather dumps for API
+v1. A dump has one weather JSON object per line, as returned by the
+current weather API (or with ``city_name``, ``lat`` and ``lon`` at the
+top level, as in history bulks), and may be gzip compressed. Every
+observation is saved with one query, observations already saved are
+skipped, so an interrupted ingest can be run again.
+
+Run from the project root:
+    python -m src.api_versions.v1.ingest weather.json.gz [more dumps]
+"""
+
+# Other imports
+import argparse
+import gzip
+import io
+import itertools
+import json
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Main imports
+from sqlalchemy.engine import Engine
+
+# Import from this API version
+from .database import (
+    City,
+    Observation,
+    WeatherConditionMap,
+    build_sessionmaker,
+    engine as default_engine
+)
+from .migrations import OBSERVATION_COLUMNS
+# Imports from project
+from ...open_weather_api import compass_points  # noqa: I100
+
+STAGING_COLUMNS = ('city_id', 'observed_at') + OBSERVATION_COLUMNS
+# Observations and their queries are added only for new staging rows.
+# An anti-join, as ON CONFLICT needs PostgreSQL 9.5
+INSERT_OBSERVATIONS_SQL = (
+    f'INSERT INTO observations ({", ".join(STAGING_COLUMNS)}) '
+    f'SELECT {", ".join(STAGING_COLUMNS)} FROM ingest_staging AS staged '
+    f'WHERE NOT EXISTS (SELECT 1 FROM observations '
+    f'WHERE observations.city_id = staged.city_id '
+    f'AND observations.observed_at = staged.observed_at) '
+    f'RETURNING id, observed_at'
+)
+INSERT_QUERIES_SQL = (
+    'INSERT INTO queries (observation_id, utc_timestamp) '
+    'SELECT id, observed_at FROM inserted'
+)
+# COPY text format escapes, backslash first so the others are kept
+COPY_ESCAPES = (('\\', '\\\\'), ('\t', '\\t'), ('\n', '\\n'), ('\r', '\\r'))
+
+
+def copy_value(value) -> str:
+    """``value`` in PostgreSQL COPY text format, ``\\N`` for NULL"""
+    if value is None:
+        return '\\N'
+    text = str(value)
+    for character, escape in COPY_ESCAPES:
+        text = text.replace(character, escape)
+    return text
+
+
+def copy_text(rows: Iterable[tuple]) -> str:
+    """``rows`` as COPY text format data, tab-separated lines"""
+    return ''.join(
+        '\t'.join(map(copy_value, row)) + '\n' for row in rows
+    )
+
+
+def parse_line(line: str) -> tuple:
+    """City name, country, coordinates and ``WeatherInfo`` fields"""
+    record = json.loads(line)
+    coord = record.get('coord', record)
+    weather = record['weather'][0]
+    sun = record.get('sys', {})
+    return (
+        record.get('name') or record['city_name'],
+        sun.get('country', ''),
+        coord['lat'],
+        coord['lon'],
+        record['dt'],
+        weather['id'],
+        weather['main'],
+        weather['description'],
+        weather['icon'],
+        record['main']['temp'],
+        record['main']['pressure'],
+        record['main']['humidity'],
+        record.get('visibility', 0),
+        record['wind']['speed'],
+        record['wind'].get('deg', 0),
+        record['clouds']['all'],
+        sun.get('sunrise', 0),
+        sun.get('sunset', 0)
+    )
+
+
+class BulkIngest:
+    def __init__(self, engine: Engine = default_engine):
+        """
+        Loads dumps to ``engine`` database, with COPY on PostgreSQL and
+        batched inserts on SQLite, through a temporary staging table.
+        """
+        self._engine = engine
+        self._session_maker = build_sessionmaker(engine)
+        self._conditions = WeatherConditionMap(self._session_maker)
+        # Lowercase name and country: city ID
+        self._cities: Dict[Tuple[str, str], int] = {}
+        self._cities_loaded = False
+
+    def __repr__(self):
+        return f'BulkIngest(engine={self._engine.url.drivername})'
+
+    def _city_ids(
+            self,
+            names: Iterable[str],
+            countries: Iterable[str],
+            lats: Iterable[float],
+            lons: Iterable[float]
+    ) -> List[int]:
+        """IDs of existing cities, new ones are saved first"""
+        db = self._session_maker()
+        try:
+            if not self._cities_loaded:
+                # Descending, so the oldest of cities with one name is used
+                self._cities.update(
+                    ((name.lower(), country), city_id)
+                    for city_id, name, country in db.query(
+                        City.id, City.name, City.country
+                    ).order_by(City.id.desc())
+                )
+                self._cities_loaded = True
+            new_cities = {}
+            for key in zip(names, countries, lats, lons):
+                city_key = (key[0].lower(), key[1])
+                if city_key not in self._cities and (
+                        city_key not in new_cities
+                ):
+                    new_cities[city_key] = City(
+                        name=key[0], country=key[1], lat=key[2], lon=key[3]
+                    )
+            if new_cities:
+                db.add_all(new_cities.values())
+                db.commit()
+                for city_key, db_city in new_cities.items():
+                    self._cities[city_key] = db_city.id
+        finally:
+            db.close()
+        return [
+            self._cities[(name.lower(), country)]
+            for name, country in zip(names, countries)
+        ]
+
+    def _staging_rows(self, parsed: List[tuple]) -> List[tuple]:
+        """
+        Rows of ``STAGING_COLUMNS`` for parsed lines of a batch, one per
+        city and observation time
+        """
+        (names, countries, lats, lons, observed_at, weather_ids,
+         weather_names, descriptions, icons, temps, pressures, humidities,
+         visibilities, wind_speeds, wind_degrees, cloudiness, sunrises,
+         sunsets) = zip(*parsed)
+        condition_ids = [
+            self._conditions.encode(*condition)
+            for condition in zip(
+                weather_names, descriptions, icons, weather_ids
+            )
+        ]
+        rows = {}
+        for row in zip(
+            self._city_ids(names, countries, lats, lons),
+            observed_at,
+            condition_ids,
+            temps,
+            pressures,
+            humidities,
+            visibilities,
+            wind_speeds,
+            wind_degrees,
+            compass_points(wind_degrees),
+            cloudiness,
+            sunrises,
+            sunsets
+        ):
+            rows.setdefault(row[:2], row)
+        return list(rows.values())
+
+    def _create_staging(self, cursor):
+        table = Observation.__table__
+        columns = ', '.join(
+            f'{name} '
+            f'{table.c[name].type.compile(dialect=self._engine.dialect)}'
+            for name in STAGING_COLUMNS
+        )
+        cursor.execute(
+            f'CREATE TEMP TABLE IF NOT EXISTS ingest_staging ({columns})'
+        )
+        cursor.execute('DELETE FROM ingest_staging')
+
+    @staticmethod
+    def _load_postgresql(cursor, rows: List[tuple]) -> int:
+        data = io.StringIO(copy_text(rows))
+        cursor.copy_expert(
+            f'COPY ingest_staging ({", ".join(STAGING_COLUMNS)}) '
+            f'FROM STDIN',
+            data
+        )
+        cursor.execute(
+            f'WITH inserted AS ({INSERT_OBSERVATIONS_SQL}) '
+            f'{INSERT_QUERIES_SQL}'
+        )
+        return cursor.rowcount
+
+    @staticmethod
+    def _load_sqlite(cursor, rows: List[tuple]) -> int:
+        cursor.executemany(
+            f'INSERT INTO ingest_staging VALUES '
+            f'({", ".join("?" * len(STAGING_COLUMNS))})',
+            rows
+        )
+        # No data-modifying CTEs in SQLite
+        inserted = cursor.execute(INSERT_OBSERVATIONS_SQL).fetchall()
+        cursor.executemany(
+            'INSERT INTO queries (observation_id, utc_timestamp) '
+            'VALUES (?, ?)',
+            inserted
+        )
+        return len(inserted)
+
+    def load(self, parsed: List[tuple]) -> int:
+        """Saves parsed lines in one transaction, returns new observations"""
+        rows = self._staging_rows(parsed)
+        connection = self._engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            self._create_staging(cursor)
+            if self._engine.dialect.name == 'postgresql':
+                saved = self._load_postgresql(cursor, rows)
+            else:
+                saved = self._load_sqlite(cursor, rows)
+            connection.commit()
+        finally:
+            connection.close()
+        return saved
+
+    def ingest_file(
+            self,
+            path: str,
+            batch_size: int = 50000,
+            progress: Callable[[str], None] = print
+    ) -> int:
+        """
+        Loads dump at ``path`` ``batch_size`` lines at a time, so memory
+        use doesn't depend on its size. Lines that are not weather JSON
+        objects are skipped. Returns the number of new observations.
+        """
+        opener = gzip.open if path.endswith('.gz') else open
+        lines = skipped = saved = 0
+        started = time.perf_counter()
+        with opener(path, 'rt', encoding='utf-8') as file:
+            while True:
+                batch = list(itertools.islice(file, batch_size))
+                if not batch:
+                    break
+                parsed = []
+                for line in batch:
+                    try:
+                        parsed.append(parse_line(line))
+                    except (ValueError, KeyError, IndexError, TypeError):
+                        skipped += 1
+                if parsed:
+                    saved += self.load(parsed)
+                lines += len(batch)
+                elapsed = time.perf_counter() - started
+                progress(f'{path}: {lines} lines, {saved} new, '
+                         f'{skipped} skipped, {lines / elapsed:.0f} rows/s')
+        return saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ingest weather dumps')
+    parser.add_argument('paths', nargs='+', metavar='path')
+    parser.add_argument('--batch-size', type=int, default=50000)
+    args = parser.parse_args()
+    ingest = BulkIngest()
+    for path in args.paths:
+        ingest.ingest_file(path, batch_size=args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
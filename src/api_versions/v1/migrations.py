@@ -0,0 +1,332 @@
+"""
+This module contains database migrations for API v1, which bring tables
+created by older versions to the current schema. Every migration can be
+interrupted and run again, converted rows are skipped.
+
+Run from the project root:
+    python -m src.api_versions.v1.migrations
+"""
+
+# Other imports
+import argparse
+from typing import Callable, Dict, Tuple
+
+# Main imports
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+# Import from this API version
+from .database import (
+    Observation,
+    WeatherConditionMap,
+    build_sessionmaker,
+    engine as default_engine
+)
+# Imports from project
+from ...open_weather_api import COMPASS_POINTS, condition_id  # noqa: I100
+
+# Columns replaced by ``weather_condition_id`` and ``wind_point``
+OLD_QUERY_COLUMNS = (
+    'weather_name',
+    'weather_description',
+    'weather_icon',
+    'wind_direction',
+    'wind_code'
+)
+
+# Columns moved to ``observations`` table, in its order
+OBSERVATION_COLUMNS = (
+    'weather_condition_id',
+    'temp',
+    'pressure',
+    'humidity',
+    'visibility',
+    'wind_speed',
+    'wind_deg',
+    'wind_point',
+    'cloudiness',
+    'sunrise',
+    'sunset'
+)
+
+WIND_POINT_SQL = 'CASE wind_code {} END'.format(' '.join(
+    f"WHEN '{code}' THEN {point}"
+    for point, (_direction, code) in enumerate(COMPASS_POINTS)
+))
+
+ENCODE_BATCH_SQL = text(
+    'UPDATE queries SET '
+    'weather_condition_id = ('
+    'SELECT weather_conditions.id FROM weather_conditions '
+    "WHERE weather_conditions.name = COALESCE(queries.weather_name, '') "
+    'AND weather_conditions.description = '
+    "COALESCE(queries.weather_description, '') "
+    "AND weather_conditions.icon = COALESCE(queries.weather_icon, '')), "
+    f'wind_point = {WIND_POINT_SQL} '
+    'WHERE id >= :first_id AND id < :last_id '
+    'AND weather_condition_id IS NULL'
+)
+
+
+def add_condition_owm_ids(
+        engine: Engine = default_engine,
+        progress: Callable[[str], None] = print
+):
+    """
+    Adds OpenWeatherMap condition IDs to ``weather_conditions`` table and
+    fills them for saved conditions by their English description. Has to
+    be run first, other migrations use the table.
+    """
+    inspector = inspect(engine)
+    if not inspector.has_table('weather_conditions'):
+        progress('No weather conditions table yet')
+        return
+    columns = {
+        column['name']
+        for column in inspector.get_columns('weather_conditions')
+    }
+    with engine.begin() as connection:
+        if 'owm_id' not in columns:
+            connection.execute(text(
+                'ALTER TABLE weather_conditions ADD COLUMN owm_id INTEGER'
+            ))
+        rows = connection.execute(text(
+            'SELECT id, description FROM weather_conditions '
+            'WHERE owm_id IS NULL'
+        )).all()
+        updates = [
+            {'code': code, 'owm_id': condition_id(description)}
+            for code, description in rows
+            if condition_id(description) is not None
+        ]
+        if updates:
+            connection.execute(text(
+                'UPDATE weather_conditions SET owm_id = :owm_id '
+                'WHERE id = :code'
+            ), updates)
+    progress(f'{len(updates)} weather conditions got OpenWeatherMap IDs')
+
+
+def encode_weather_strings(
+        engine: Engine = default_engine,
+        batch_size: int = 10000,
+        drop_old_columns: bool = False,
+        progress: Callable[[str], None] = print
+):
+    """
+    Moves weather name, description and icon of queries to
+    ``weather_conditions`` table and wind direction and code to compass
+    point numbers, converting ``batch_size`` rows per transaction.
+    String columns are dropped only with ``drop_old_columns``, as older
+    API instances still running need them.
+    """
+    inspector = inspect(engine)
+    columns = {column['name'] for column in inspector.get_columns('queries')}
+    indexes = {index['name'] for index in inspector.get_indexes('queries')}
+    if 'weather_name' not in columns:
+        progress('Weather strings are already encoded')
+        return
+
+    with engine.begin() as connection:
+        if 'weather_condition_id' not in columns:
+            connection.execute(text(
+                'ALTER TABLE queries ADD COLUMN weather_condition_id '
+                'SMALLINT REFERENCES weather_conditions(id)'
+            ))
+        if 'wind_point' not in columns:
+            connection.execute(text(
+                'ALTER TABLE queries ADD COLUMN wind_point SMALLINT'
+            ))
+        for column in ('weather_condition_id', 'wind_point'):
+            if f'ix_queries_{column}' not in indexes:
+                connection.execute(text(
+                    f'CREATE INDEX ix_queries_{column} ON queries ({column})'
+                ))
+
+    with engine.connect() as connection:
+        combinations = connection.execute(text(
+            'SELECT DISTINCT weather_name, weather_description, weather_icon '
+            'FROM queries WHERE weather_condition_id IS NULL'
+        )).all()
+        first_id, last_id = connection.execute(text(
+            'SELECT MIN(id), MAX(id) FROM queries '
+            'WHERE weather_condition_id IS NULL'
+        )).one()
+    conditions = WeatherConditionMap(build_sessionmaker(engine))
+    for name, description, icon in combinations:
+        conditions.encode(
+            name or '',
+            description or '',
+            icon or '',
+            condition_id(description or '')
+        )
+    progress(f'{len(combinations)} weather conditions in lookup table')
+
+    if first_id is not None:
+        for batch_start in range(first_id, last_id + 1, batch_size):
+            with engine.begin() as connection:
+                connection.execute(ENCODE_BATCH_SQL, {
+                    'first_id': batch_start,
+                    'last_id': batch_start + batch_size
+                })
+            progress(f'Encoded queries up to ID '
+                     f'{min(batch_start + batch_size - 1, last_id)} '
+                     f'of {last_id}')
+
+    if drop_old_columns:
+        _drop_columns(engine, OLD_QUERY_COLUMNS, progress)
+        progress('Old weather string columns are dropped')
+
+
+def _drop_columns(
+        engine: Engine,
+        columns: Tuple[str, ...],
+        progress: Callable[[str], None]
+):
+    inspector = inspect(engine)
+    existing = {column['name'] for column in inspector.get_columns('queries')}
+    indexes = {index['name'] for index in inspector.get_indexes('queries')}
+    foreign_keys = {
+        column
+        for foreign_key in inspector.get_foreign_keys('queries')
+        for column in foreign_key['constrained_columns']
+    }
+    with engine.begin() as connection:
+        for column in columns:
+            if column not in existing:
+                continue
+            if engine.dialect.name == 'sqlite' and column in foreign_keys:
+                progress(f"SQLite can't drop foreign key column {column}")
+                continue
+            # SQLite can't drop indexed columns
+            if f'ix_queries_{column}' in indexes:
+                connection.execute(text(f'DROP INDEX ix_queries_{column}'))
+            connection.execute(text(
+                f'ALTER TABLE queries DROP COLUMN {column}'
+            ))
+
+
+def split_observations(
+        engine: Engine = default_engine,
+        batch_size: int = 10000,
+        drop_old_columns: bool = False,
+        progress: Callable[[str], None] = print
+):
+    """
+    Moves weather fields of queries to ``observations`` table, so queries
+    only refer to them. Old queries have no upstream observation time,
+    so consecutive queries of a city with the same weather share one
+    observation, timed by the first of them. ``encode_weather_strings``
+    has to be run first.
+    """
+    inspector = inspect(engine)
+    columns = {column['name'] for column in inspector.get_columns('queries')}
+    indexes = {index['name'] for index in inspector.get_indexes('queries')}
+    if 'temp' not in columns:
+        progress('Observations are already split from queries')
+        return
+    if 'weather_condition_id' not in columns:
+        raise RuntimeError('Weather strings have to be encoded first')
+
+    with engine.begin() as connection:
+        if 'observation_id' not in columns:
+            connection.execute(text(
+                'ALTER TABLE queries ADD COLUMN observation_id '
+                'INTEGER REFERENCES observations(id)'
+            ))
+        if 'ix_queries_observation_id' not in indexes:
+            connection.execute(text(
+                'CREATE INDEX ix_queries_observation_id '
+                'ON queries (observation_id)'
+            ))
+        first_id, last_id = connection.execute(text(
+            'SELECT MIN(id), MAX(id) FROM queries '
+            'WHERE observation_id IS NULL'
+        )).one()
+
+    select_batch = text(
+        f'SELECT id, city_id, utc_timestamp, '
+        f'{", ".join(OBSERVATION_COLUMNS)} FROM queries '
+        f'WHERE id >= :first_id AND id < :last_id '
+        f'AND observation_id IS NULL ORDER BY id'
+    )
+    set_observation = text(
+        'UPDATE queries SET observation_id = :observation_id '
+        'WHERE id = :query_id'
+    )
+    session_maker = build_sessionmaker(engine)
+    # City ID: weather fields and ID of its last observation
+    last_observations: Dict[int, Tuple[tuple, int]] = {}
+    observations = 0
+    for batch_start in range(
+            first_id if first_id is not None else 0,
+            last_id + 1 if last_id is not None else 0,
+            batch_size
+    ):
+        db = session_maker()
+        try:
+            rows = db.execute(select_batch, {
+                'first_id': batch_start,
+                'last_id': batch_start + batch_size
+            }).all()
+            updates = []
+            for query_id, city_id, utc_timestamp, *fields in rows:
+                fields = tuple(fields)
+                last = last_observations.get(city_id)
+                if last is None or last[0] != fields:
+                    observed_at = int(utc_timestamp or 0)
+                    # Queries of different weather within one second
+                    while db.query(Observation.id).filter(
+                        Observation.city_id == city_id,
+                        Observation.observed_at == observed_at
+                    ).first():
+                        observed_at -= 1
+                    db_observation = Observation(
+                        city_id=city_id,
+                        observed_at=observed_at,
+                        **dict(zip(OBSERVATION_COLUMNS, fields))
+                    )
+                    db.add(db_observation)
+                    db.flush()
+                    observations += 1
+                    last = (fields, db_observation.id)
+                    last_observations[city_id] = last
+                updates.append({
+                    'observation_id': last[1], 'query_id': query_id
+                })
+            if updates:
+                db.execute(set_observation, updates)
+            db.commit()
+        finally:
+            db.close()
+        progress(f'Split queries up to ID '
+                 f'{min(batch_start + batch_size - 1, last_id)} of '
+                 f'{last_id}, {observations} observations')
+
+    if drop_old_columns:
+        _drop_columns(engine, ('city_id',) + OBSERVATION_COLUMNS, progress)
+        progress('Old observation columns are dropped')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='API v1 migrations')
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument(
+        '--drop-old-columns',
+        action='store_true',
+        help='drop replaced columns, when no older API version uses them'
+    )
+    args = parser.parse_args()
+    add_condition_owm_ids()
+    encode_weather_strings(
+        batch_size=args.batch_size,
+        drop_old_columns=args.drop_old_columns
+    )
+    split_observations(
+        batch_size=args.batch_size,
+        drop_old_columns=args.drop_old_columns
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,9 @@
 Pydantic models for API v1
 """
 
+# Other imports
+from typing import List, Literal
+
 # Main imports
 from pydantic import BaseModel, Field
 
@@ -33,9 +36,78 @@ class WeatherResponse(BaseModel):
     utc_timestamp: float
 
 
+# Largest number of IDs in one '/queries/lookup' request
+MAX_LOOKUP_IDS = 500
+
+
+class QueriesLookupRequest(BaseModel):
+    model_config = {'extra': 'forbid'}
+
+    ids: List[int] = Field(min_length=1, max_length=MAX_LOOKUP_IDS)
+
+
+class QueriesLookupResponse(BaseModel):
+    queries: List[WeatherResponse]
+    missing: List[int]
+
+
+# Longest wait of a '/queries/changes' request, in seconds
+MAX_CHANGES_TIMEOUT = 60
+
+
+class QueriesChangesQueryParams(BaseModel):
+    model_config = {'extra': 'forbid'}
+
+    since_id: int = Field(0, ge=0)
+    limit: int = Field(100, ge=1, le=1000)
+    timeout: float = Field(30, ge=0, le=MAX_CHANGES_TIMEOUT)
+
+
+class QueriesChangesResponse(BaseModel):
+    queries: List[WeatherResponse]
+    # ``since_id`` of the next request
+    next_since_id: int
+
+
 class GetWeathersQueryParams(BaseModel):
     model_config = {'extra': 'forbid'}
 
     limit: int = Field(20, ge=1, le=100)
     offset: int = Field(0, ge=0)
     descending: bool = False
+
+
+class WeatherQueryParams(BaseModel):
+    # '/weather' always ignored other parameters, e.g. cache busters
+    model_config = {'extra': 'ignore'}
+
+    units: Literal['standard', 'metric', 'imperial'] = 'metric'
+    lang: Literal['en', 'ru', 'de', 'fr', 'es'] = 'en'
+
+
+class CoordinatesQueryParams(WeatherQueryParams):
+    model_config = {'extra': 'forbid'}
+
+    lat: float = Field(ge=-90, le=90)
+    lon: float = Field(ge=-180, le=180)
+
+
+# Largest number of cities in one subscription
+MAX_SUBSCRIPTION_CITIES = 20
+
+
+class SubscriptionQueryParams(WeatherQueryParams):
+    city: List[str] = Field(min_length=1, max_length=MAX_SUBSCRIPTION_CITIES)
+
+
+class CitySuggestQueryParams(BaseModel):
+    model_config = {'extra': 'forbid'}
+
+    q: str = Field(min_length=1, max_length=100)  # noqa: VNE001
+    limit: int = Field(10, ge=1, le=50)
+
+
+class CitySuggestion(BaseModel):
+    id: int  # noqa: A003, VNE003
+    name: str
+    country: str
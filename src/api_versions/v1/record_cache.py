@@ -0,0 +1,63 @@
+"""
+This module contains an in-process cache of query records for API v1.
+Query records never change after insert, so cached ones are never stale.
+"""
+
+# Other imports
+from collections import OrderedDict
+from typing import Dict, Iterable, Union
+
+# Import from this API version
+from .pydantic_models import WeatherResponse
+
+
+class RecordCache:
+    def __init__(self, max_size: int = 10000):
+        """
+        Keeps up to ``max_size`` query responses (in metric units and
+        English), evicting least recently used ones. 0 disables caching.
+        """
+        self._max_size = max_size
+        self._records: OrderedDict = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def __repr__(self):
+        return f'RecordCache(max_size={self._max_size})'
+
+    def __len__(self):
+        return len(self._records)
+
+    def get(self, query_id: int) -> Union[WeatherResponse, None]:
+        record = self._records.get(query_id)
+        if record is None:
+            self._misses += 1
+            return None
+        self._records.move_to_end(query_id)
+        self._hits += 1
+        return record
+
+    def get_many(self, query_ids: Iterable[int]) -> Dict[int, WeatherResponse]:
+        """Cached records for ``query_ids``, missing ones are left out"""
+        found = {}
+        for query_id in query_ids:
+            record = self.get(query_id)
+            if record is not None:
+                found[query_id] = record
+        return found
+
+    def put(self, record: WeatherResponse):
+        if self._max_size <= 0:
+            return
+        self._records[record.id] = record
+        self._records.move_to_end(record.id)
+        if len(self._records) > self._max_size:
+            self._records.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self._records),
+            'max_size': self._max_size,
+            'hits': self._hits,
+            'misses': self._misses
+        }
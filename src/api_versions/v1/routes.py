@@ -3,8 +3,11 @@ Main routes for API v1
 """
 
 # Other imports
+import asyncio
+import os
+from functools import partial
 from logging import Logger
-from typing import Dict, List, Union
+from typing import AsyncIterator, Dict, List, Tuple, Union
 try:
     from typing import Annotated
 except ImportError:
@@ -12,22 +15,105 @@ except ImportError:
     from typing_extensions import Annotated
 
 # Main imports
-from fastapi import APIRouter, Query, Request, Response, status
-from fastapi.responses import RedirectResponse
+from fastapi import APIRouter, Header, Query, Request, Response, status
+from fastapi.responses import RedirectResponse, StreamingResponse
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 
 # Import from this API version
 from . import constants
-from .database import City as DB_City, Query as DB_Query, SessionLocal
+from .archive import QueryArchive
+from .changes import QueryNotifier, committed_prefix
+from .database import (
+    City as DB_City,
+    Observation as DB_Observation,
+    Query as DB_Query,
+    SessionLocal,
+    session_router,
+    weather_conditions
+)
 from .pydantic_models import (
+    CitySuggestQueryParams,
+    CitySuggestion,
+    CoordinatesQueryParams,
     Error,
     GetWeathersQueryParams,
+    QueriesChangesQueryParams,
+    QueriesChangesResponse,
+    QueriesLookupRequest,
+    QueriesLookupResponse,
+    SubscriptionQueryParams,
+    WeatherQueryParams,
     WeatherResponse
 )
+from .record_cache import RecordCache
+from .subscriptions import SubscriptionHub
 # Imports from project
-from ...open_weather_api import APIError, OpenWeatherAPI
+from ...http_cache import (
+    CACHE_IMMUTABLE,
+    CACHE_NO_CACHE,
+    etag_matches,
+    make_etag,
+    max_age,
+    not_modified
+)
+from ...name_index import CityNameIndex
+from ...open_weather_api import (
+    APIError,
+    ApiKeyPool,
+    CircuitBreaker,
+    City,
+    OPEN_WEATHER_API_KEYS,
+    OpenWeatherAPI,
+    UpstreamUnavailableError,
+    WeatherCacheSnapshot,
+    WeatherInfo,
+    compass_point,
+    convert_speed,
+    convert_temperature,
+    convert_visibility,
+    describe
+)
+from ...spatial_index import CityIndex, haversine_km
 
 main_router = APIRouter()
-open_weather_api = OpenWeatherAPI()
+open_weather_api = OpenWeatherAPI(
+    cache_ttl=constants.WEATHER_CACHE_TTL,
+    timeout=(
+        constants.UPSTREAM_CONNECT_TIMEOUT,
+        constants.UPSTREAM_READ_TIMEOUT
+    ),
+    circuit_breaker=CircuitBreaker(
+        error_rate=constants.BREAKER_ERROR_RATE,
+        window=constants.BREAKER_WINDOW,
+        min_calls=constants.BREAKER_MIN_CALLS,
+        cooldown=constants.BREAKER_COOLDOWN
+    ),
+    hedge_percentile=constants.HEDGE_PERCENTILE,
+    key_pool=ApiKeyPool(
+        OPEN_WEATHER_API_KEYS,
+        rate_per_minute=constants.OPEN_WEATHER_KEY_RATE,
+        unauthorized_cooldown=constants.OPEN_WEATHER_KEY_UNAUTHORIZED_COOLDOWN,
+        rate_limit_cooldown=constants.OPEN_WEATHER_KEY_RATE_LIMITED_COOLDOWN
+    )
+)
+weather_cache_snapshot = WeatherCacheSnapshot(
+    open_weather_api,
+    os.path.join(
+        constants.WARM_START_DIR,
+        f'weather-cache-v{constants.API_VERSION}.bin'
+    ),
+    interval=constants.WARM_START_INTERVAL
+)
+city_index = CityIndex(cell_size_km=constants.COORDS_SNAP_RADIUS)
+city_names = CityNameIndex()
+record_cache = RecordCache(max_size=constants.QUERY_CACHE_SIZE)
+query_archive = QueryArchive()
+query_notifier = QueryNotifier()
+# City ID: upstream time and ID of its latest saved observation
+latest_observations: Dict[int, Tuple[int, int]] = {}
 error_logger = Logger('uvicorn.error')
 
 
@@ -66,18 +152,413 @@ async def openapi_json_redirect() -> RedirectResponse:
     )
 
 
+@main_router.get('/status/upstream', include_in_schema=False)
+async def upstream_status() -> dict:
+    """OpenWeatherMap API calls, latency, circuit breaker, cache snapshot"""
+    return {
+        **open_weather_api.stats(),
+        'cache_snapshot': weather_cache_snapshot.stats()
+    }
+
+
+@main_router.get('/status/database', include_in_schema=False)
+async def database_status() -> dict:
+    """Read replica state, reads by replica and primary, record cache"""
+    return {**session_router.stats(), 'record_cache': record_cache.stats()}
+
+
+@main_router.get('/status/subscriptions', include_in_schema=False)
+async def subscriptions_status() -> dict:
+    """Polled cities, open streams and published updates"""
+    return subscription_hub.stats()
+
+
+@main_router.get('/status/changes', include_in_schema=False)
+async def changes_status() -> dict:
+    """Latest query ID, sent and received notifications of new queries"""
+    return query_notifier.stats()
+
+
+# ############################ WEATHER HELPERS ############################ #
+def weather_response(
+        db_query: DB_Query,
+        db_city: DB_City,
+        units: str = 'metric',
+        lang: str = 'en'
+) -> WeatherResponse:
+    """
+    Builds response model from query and its city database rows.
+    Saved weather is in metric units and English, other ``units`` and
+    ``lang`` are converted locally.
+    """
+    return WeatherResponse(
+        id=db_query.id,
+        city_name=db_city.name,
+        city_country=db_city.country,
+        latitude=db_city.lat,
+        longitude=db_city.lon,
+        weather_name=db_query.weather_name,
+        weather_description=describe(
+            db_query.weather_id,
+            lang,
+            db_query.weather_description
+        ),
+        weather_icon='https://openweathermap.org/img/wn/'
+                     f'{db_query.weather_icon}@2x.png',
+        temp=convert_temperature(db_query.temp, units),
+        pressure=db_query.pressure,
+        humidity=db_query.humidity,
+        visibility=convert_visibility(db_query.visibility, units),
+        wind_speed=convert_speed(db_query.wind_speed, units),
+        wind_degree=db_query.wind_deg,
+        wind_direction=db_query.wind_direction,
+        wind_code=db_query.wind_code,
+        cloudiness=db_query.cloudiness,
+        sunrise=db_query.sunrise,
+        sunset=db_query.sunset,
+        utc_timestamp=db_query.utc_timestamp
+    )
+
+
+def get_city_index(db: Session) -> CityIndex:
+    """Returns spatial index of known cities, loading it on first use"""
+    if not city_index.loaded:
+        city_index.load(db.query(DB_City.id, DB_City.lat, DB_City.lon))
+    return city_index
+
+
+def get_city_names(db: Session) -> CityNameIndex:
+    """
+    Returns name index of known cities, loading it on first use. Cities
+    are as popular at first as the number of their queries (observations
+    are shared by queries, so they don't count requests).
+    """
+    if not city_names.loaded:
+        queries = db.query(
+            DB_Observation.city_id,
+            func.count(DB_Query.id).label('queries')
+        ).join(DB_Observation.queries).group_by(
+            DB_Observation.city_id
+        ).subquery()
+        city_names.load(db.query(
+            DB_City.id,
+            DB_City.name,
+            DB_City.country,
+            func.coalesce(queries.c.queries, 0)
+        ).outerjoin(queries, queries.c.city_id == DB_City.id))
+    return city_names
+
+
+def load_city_indexes():
+    """Loads in-memory city indexes, at startup"""
+    db = SessionLocal()
+    try:
+        get_city_index(db)
+        get_city_names(db)
+    finally:
+        db.close()
+
+
+def find_geocoded_city(
+        db: Session,
+        city_data: City
+) -> Union[DB_City, None]:
+    """
+    Saved city of the same name and country as ``city_data`` within
+    ``COORDS_SNAP_RADIUS`` kilometers of it, since cities of one name
+    can be far apart
+    """
+    for db_city in db.query(DB_City).filter(
+            DB_City.name == city_data.name,
+            DB_City.country == city_data.country
+    ):
+        if haversine_km(
+                db_city.lat, db_city.lon, city_data.lat, city_data.lon
+        ) <= constants.COORDS_SNAP_RADIUS:
+            return db_city
+    return None
+
+
+def add_city(db: Session, city_name: str, city_data: City) -> DB_City:
+    """Saves new city and adds it to in-memory indexes"""
+    db_city = DB_City(
+        name=city_name,
+        country=city_data.country,
+        lat=city_data.lat,
+        lon=city_data.lon
+    )
+    db.add(db_city)
+    db.commit()
+    city_index.add(db_city.id, db_city.lat, db_city.lon)
+    city_names.add(db_city.id, db_city.name, db_city.country)
+    return db_city
+
+
+def upstream_unavailable(response: Response, error: APIError) -> Error:
+    """Sets 503 status with ``Retry-After`` for unavailable upstream"""
+    error_logger.error(error)
+    response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    response.headers['Retry-After'] = str(
+        max(int(open_weather_api.circuit_breaker.retry_after), 1)
+    )
+    return Error(error=str(error))
+
+
+def latest_weather_query(
+        db: Session,
+        db_city: DB_City
+) -> Union[DB_Query, None]:
+    """Most recent saved query for ``db_city``"""
+    return db.query(DB_Query).join(DB_Query.observation).filter(
+        DB_Observation.city_id == db_city.id
+    ).order_by(DB_Query.id.desc()).first()
+
+
+def get_observation_id(
+        db: Session,
+        db_city: DB_City,
+        weather_data: WeatherInfo
+) -> int:
+    """
+    ID of saved observation ``weather_data`` of ``db_city``, saved now if
+    it is new. Requests get the same observation until it is updated
+    upstream, so the latest one of each city is remembered.
+    """
+    latest = latest_observations.get(db_city.id)
+    if latest and latest[0] == weather_data.observed_at:
+        return latest[1]
+
+    def saved_observation_id() -> Union[int, None]:
+        return db.query(DB_Observation.id).filter(
+            DB_Observation.city_id == db_city.id,
+            DB_Observation.observed_at == weather_data.observed_at
+        ).scalar()
+
+    observation_id = saved_observation_id()
+    if observation_id is None:
+        db_observation = DB_Observation(
+            city_id=db_city.id,
+            observed_at=weather_data.observed_at,
+            weather_condition_id=weather_conditions.encode(
+                weather_data.weather_name,
+                weather_data.weather_description,
+                weather_data.weather_icon,
+                weather_data.weather_id
+            ),
+            temp=weather_data.temp,
+            pressure=weather_data.pressure,
+            humidity=weather_data.humidity,
+            visibility=weather_data.visibility,
+            wind_speed=weather_data.wind_speed,
+            wind_deg=weather_data.wind_degree,
+            wind_point=compass_point(weather_data.wind_degree),
+            cloudiness=weather_data.cloudiness,
+            sunrise=weather_data.sunrise,
+            sunset=weather_data.sunset
+        )
+        db.add(db_observation)
+        try:
+            db.commit()
+            observation_id = db_observation.id
+        except IntegrityError:
+            # Saved by other process at the same time
+            db.rollback()
+            observation_id = saved_observation_id()
+    latest_observations[db_city.id] = (
+        weather_data.observed_at, observation_id
+    )
+    return observation_id
+
+
+def add_weather_query(db: Session, db_city: DB_City) -> DB_Query:
+    """
+    Gets current weather for ``db_city`` and saves it as a new query.
+    Raises ``APIError`` if OpenWeatherMap API call fails.
+    """
+    weather_data = open_weather_api.get_weather_data(
+        db_city.lat,
+        db_city.lon
+    )
+    db_query = DB_Query(
+        observation_id=get_observation_id(db, db_city, weather_data)
+    )
+    db.add(db_query)
+    db.flush()
+    query_notifier.notify(db, db_query.id)
+    db.commit()
+    session_router.record_write(db_query.id)
+    query_notifier.committed(db_query.id)
+
+    return db.get(DB_Query, db_query.id)
+
+
+def poll_weather(
+        city_id: int,
+        observation_id: Union[int, None]
+) -> Union[DB_Query, None]:
+    """
+    Subscription poll of ``city_id``: None if weather is still
+    ``observation_id``, otherwise the latest query of the new observation,
+    which is saved only if no request got it yet.
+    """
+    db = SessionLocal()
+    try:
+        db_city = db.get(DB_City, city_id)
+        weather_data = open_weather_api.get_weather_data(
+            db_city.lat,
+            db_city.lon
+        )
+        new_observation_id = get_observation_id(db, db_city, weather_data)
+        if new_observation_id == observation_id:
+            return None
+        db_query = latest_weather_query(db, db_city)
+        if db_query is None or db_query.observation_id != new_observation_id:
+            db_query = DB_Query(observation_id=new_observation_id)
+            db.add(db_query)
+            db.flush()
+            query_notifier.notify(db, db_query.id)
+            db.commit()
+            session_router.record_write(db_query.id)
+            query_notifier.committed(db_query.id)
+            db_query = db.get(DB_Query, db_query.id)
+        return db_query
+    finally:
+        db.close()
+
+
+subscription_hub = SubscriptionHub(
+    poll_weather,
+    poll_interval=constants.SUBSCRIPTION_POLL_INTERVAL,
+    polls_per_minute=constants.SUBSCRIPTION_POLLS_PER_MINUTE,
+    retry_after=lambda: open_weather_api.circuit_breaker.retry_after
+)
+
+
+def weather_event(db_query: DB_Query, units: str, lang: str) -> str:
+    """
+    Server-sent event of a query, rendered once per publication for every
+    subscriber of its city with the same ``units`` and ``lang``
+    """
+    record = weather_response(db_query, db_query.city, units, lang)
+    return (f'id: {record.id}\nevent: weather\n'
+            f'data: {record.model_dump_json()}\n\n')
+
+
+async def weather_events(
+        city_ids: List[int],
+        units: str,
+        lang: str
+) -> AsyncIterator[str]:
+    """
+    Events of a subscription. The next update is taken only after the
+    previous one was sent, so a slow client holds just one per city.
+    """
+    build = partial(weather_event, units=units, lang=lang)
+    subscriber = subscription_hub.subscribe(city_ids)
+    try:
+        while True:
+            for publication in subscriber.take():
+                yield publication.render((units, lang), build)
+            if not await subscriber.wait(constants.SUBSCRIPTION_KEEPALIVE):
+                # Keeps proxies from closing an idle connection
+                yield ': keepalive\n\n'
+    finally:
+        subscription_hub.unsubscribe(subscriber)
+
+
+# ###################### GET WEATHER FROM COORDINATES ###################### #
+@main_router.get(
+    '/weather/by-coords',
+    responses={
+        200: {'model': WeatherResponse},
+        400: {'model': Error},
+        500: {'model': Error},
+        503: {'model': Error}
+    }
+)
+async def get_weather_by_coords(
+        response: Response,
+        coords: Annotated[CoordinatesQueryParams, Query()]
+) -> Union[WeatherResponse, Error]:  # noqa
+    """
+    Weather for the nearest known city within ``COORDS_SNAP_RADIUS``
+    kilometers, so close enough coordinates share cached weather data.
+    If there is no such city, it is looked up by reverse geocoding.
+    """
+    db = SessionLocal()
+    try:
+        nearest = get_city_index(db).nearest(
+            coords.lat, coords.lon, constants.COORDS_SNAP_RADIUS
+        )
+        db_city = db.get(DB_City, nearest[0]) if nearest else None
+
+        if not db_city:
+            try:
+                city_data = open_weather_api.get_reverse_geo_data(
+                    coords.lat, coords.lon
+                )
+            except UpstreamUnavailableError as e:
+                return upstream_unavailable(response, e)
+            except APIError as e:
+                error_logger.error(e)
+                response.status_code = status.HTTP_400_BAD_REQUEST
+                return Error(error=str(e))
+            db_city = find_geocoded_city(db, city_data)
+            if not db_city:
+                db_city = add_city(db, city_data.name, city_data)
+
+        stale = False
+        try:
+            db_query = add_weather_query(db, db_city)
+        except UpstreamUnavailableError as e:
+            db_query = latest_weather_query(db, db_city)
+            if not db_query:
+                return upstream_unavailable(response, e)
+            error_logger.error(e)
+            stale = True
+        except APIError as e:
+            error_logger.error(e)
+            response.status_code = status.HTTP_400_BAD_REQUEST
+            return Error(error=str(e))
+        db_city = db.get(DB_City, db_query.city_id)
+    except Exception as e:  # noqa: B902
+        error_logger.error(e)
+        response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        return Error(error=str(e))
+    finally:
+        db.close()
+
+    city_names.hit(db_city.id)
+    response.status_code = status.HTTP_200_OK
+    if stale:
+        response.headers['X-Weather-Stale'] = 'true'
+        response.headers['Cache-Control'] = CACHE_NO_CACHE
+    else:
+        response.headers['Cache-Control'] = max_age(
+            open_weather_api.weather_cache_ttl(db_city.lat, db_city.lon)
+        )
+    return weather_response(db_query, db_city, coords.units, coords.lang)
+
+
 # ######################## GET WEATHER FROM CITY ######################## #
 @main_router.get(
     '/weather/{city_name}',
     responses={
         200: {'model': WeatherResponse},
-        500: {'model': Error}
+        500: {'model': Error},
+        503: {'model': Error}
     }
 )
 async def get_weather(
         response: Response,
         city_name: str,
+        weather_query: Annotated[WeatherQueryParams, Query()]
 ) -> Union[WeatherResponse, Error]:  # noqa
+    """
+    Current weather in ``units`` (metric by default) with description in
+    ``lang`` (English by default). All variants share one OpenWeatherMap
+    call, which is made in metric units and English.
+    """
     db = SessionLocal()
     try:
         db_city = db.query(DB_City).filter(DB_City.name == city_name).first()
@@ -85,49 +566,28 @@ async def get_weather(
         if not db_city:
             try:
                 city_data = open_weather_api.get_geo_data(city_name)
+            except UpstreamUnavailableError as e:
+                return upstream_unavailable(response, e)
             except APIError as e:
                 error_logger.error(e)
                 response.status_code = status.HTTP_400_BAD_REQUEST
                 return Error(error=str(e))
-            db_city = DB_City(
-                name=city_name,
-                country=city_data.country,
-                lat=city_data.lat,
-                lon=city_data.lon
-            )
-            db.add(db_city)
-            db.commit()
+            db_city = add_city(db, city_name, city_data)
 
+        stale = False
         try:
-            weather_data = open_weather_api.get_weather_data(
-                db_city.lat,
-                db_city.lon
-            )
+            updated_query = add_weather_query(db, db_city)
+        except UpstreamUnavailableError as e:
+            # Serve the last known weather while OpenWeatherMap is down
+            updated_query = latest_weather_query(db, db_city)
+            if not updated_query:
+                return upstream_unavailable(response, e)
+            error_logger.error(e)
+            stale = True
         except APIError as e:
             error_logger.error(e)
             response.status_code = status.HTTP_400_BAD_REQUEST
             return Error(error=str(e))
-        db_query = DB_Query(
-            city_id=db_city.id,
-            weather_name=weather_data.weather_name,
-            weather_description=weather_data.weather_description,
-            weather_icon=weather_data.weather_icon,
-            temp=weather_data.temp,
-            pressure=weather_data.pressure,
-            humidity=weather_data.humidity,
-            visibility=weather_data.visibility,
-            wind_speed=weather_data.wind_speed,
-            wind_deg=weather_data.wind_degree,
-            wind_direction=weather_data.wind_direction,
-            wind_code=weather_data.wind_code,
-            cloudiness=weather_data.cloudiness,
-            sunrise=weather_data.sunrise,
-            sunset=weather_data.sunset
-        )
-        db.add(db_query)
-        db.commit()
-
-        updated_query = db.get(DB_Query, db_query.id)
         updated_city = db.get(DB_City, updated_query.city_id)
     except Exception as e:  # noqa: B902
         error_logger.error(e)
@@ -136,52 +596,99 @@ async def get_weather(
     finally:
         db.close()
 
+    city_names.hit(updated_city.id)
     response.status_code = status.HTTP_200_OK
-    return WeatherResponse(
-        id=updated_query.id,
-        city_name=updated_city.name,
-        city_country=updated_city.country,
-        latitude=updated_city.lat,
-        longitude=updated_city.lon,
-        weather_name=updated_query.weather_name,
-        weather_description=updated_query.weather_description,
-        weather_icon='https://openweathermap.org/img/wn/'
-                     f'{updated_query.weather_icon}@2x.png',
-        temp=updated_query.temp,
-        pressure=updated_query.pressure,
-        humidity=updated_query.humidity,
-        visibility=updated_query.visibility,
-        wind_speed=updated_query.wind_speed,
-        wind_degree=updated_query.wind_deg,
-        wind_direction=updated_query.wind_direction,
-        wind_code=updated_query.wind_code,
-        cloudiness=updated_query.cloudiness,
-        sunrise=updated_query.sunrise,
-        sunset=updated_query.sunset,
-        utc_timestamp=updated_query.utc_timestamp
+    if stale:
+        response.headers['X-Weather-Stale'] = 'true'
+        response.headers['Cache-Control'] = CACHE_NO_CACHE
+    else:
+        response.headers['Cache-Control'] = max_age(
+            open_weather_api.weather_cache_ttl(
+                updated_city.lat, updated_city.lon
+            )
+        )
+    return weather_response(
+        updated_query, updated_city, weather_query.units, weather_query.lang
     )
 
 
-# ######################## GET WEATHER BY QUERY ID ######################## #
+# ########################### SUGGEST CITY NAMES ############################ #
 @main_router.get(
-    '/queries/{query_id}',
+    '/cities/suggest',
     responses={
-        200: {'model': WeatherResponse},
-        400: {'model': Error},
+        200: {'model': List[CitySuggestion]},
         500: {'model': Error}
     }
 )
-async def get_query(
+async def suggest_cities(
         response: Response,
-        query_id: int
-) -> Union[WeatherResponse, Error]:  # noqa
+        suggest_query: Annotated[CitySuggestQueryParams, Query()]
+) -> Union[List[CitySuggestion], Error]:  # noqa
+    """
+    Known cities starting with ``q``, or with similar names if there are
+    not enough of them, the most requested first. Answered from memory,
+    without database or OpenWeatherMap calls.
+    """
+    try:
+        if not city_names.loaded:
+            db = SessionLocal()
+            try:
+                get_city_names(db)
+            finally:
+                db.close()
+        suggestions = city_names.suggest(
+            suggest_query.q, suggest_query.limit
+        )
+    except Exception as e:  # noqa: B902
+        error_logger.error(e)
+        response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        return Error(error=str(e))
+
+    response.status_code = status.HTTP_200_OK
+    return [
+        CitySuggestion(id=city_id, name=name, country=country)
+        for city_id, name, country in suggestions
+    ]
+
+
+# ###################### SUBSCRIBE TO CITIES WEATHER ###################### #
+@main_router.get(
+    '/subscriptions',
+    response_model=None,
+    responses={
+        200: {'content': {'text/event-stream': {}}},
+        400: {'model': Error},
+        500: {'model': Error},
+        503: {'model': Error}
+    }
+)
+async def subscribe_weather(
+        response: Response,
+        subscription: Annotated[SubscriptionQueryParams, Query()]
+) -> Union[StreamingResponse, Error]:
+    """
+    Server-sent events with weather of every ``city`` (the parameter can
+    be repeated): the latest known one at once, then each new observation.
+    All subscribers of a city share one OpenWeatherMap poller.
+    """
     db = SessionLocal()
     try:
-        db_query = db.get(DB_Query, query_id)
-        if not db_query:
-            response.status_code = status.HTTP_400_BAD_REQUEST
-            return Error(error='No weather query with this ID')
-        db_city = db_query.city
+        city_ids = []
+        for city_name in dict.fromkeys(subscription.city):
+            db_city = db.query(DB_City).filter(
+                DB_City.name == city_name
+            ).first()
+            if not db_city:
+                try:
+                    city_data = open_weather_api.get_geo_data(city_name)
+                except UpstreamUnavailableError as e:
+                    return upstream_unavailable(response, e)
+                except APIError as e:
+                    error_logger.error(e)
+                    response.status_code = status.HTTP_400_BAD_REQUEST
+                    return Error(error=str(e))
+                db_city = add_city(db, city_name, city_data)
+            city_ids.append(db_city.id)
     except Exception as e:  # noqa: B902
         error_logger.error(e)
         response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -189,32 +696,181 @@ async def get_query(
     finally:
         db.close()
 
+    return StreamingResponse(
+        weather_events(city_ids, subscription.units, subscription.lang),
+        media_type='text/event-stream',
+        headers={'Cache-Control': CACHE_NO_CACHE, 'X-Accel-Buffering': 'no'}
+    )
+
+
+# ###################### LOOKUP WEATHER QUERIES BY IDS ###################### #
+@main_router.post(
+    '/queries/lookup',
+    responses={
+        200: {'model': QueriesLookupResponse},
+        500: {'model': Error}
+    }
+)
+async def lookup_queries(
+        response: Response,
+        lookup: QueriesLookupRequest
+) -> Union[QueriesLookupResponse, Error]:  # noqa
+    """
+    Weather queries with ``ids`` in the same order (repeated IDs only
+    once), loaded in one database query. IDs not in the database are
+    looked up in the archive, ones not found at all are listed in
+    ``missing``.
+    """
+    query_ids = list(dict.fromkeys(lookup.ids))
+    records = record_cache.get_many(query_ids)
+    to_load = [query_id for query_id in query_ids if query_id not in records]
+    if to_load:
+        try:
+            db_queries = session_router.read(
+                lambda db: db.query(DB_Query).filter(
+                    DB_Query.id.in_(to_load)
+                ).all(),
+                max(to_load),
+                complete=lambda rows: len(rows) == len(to_load)
+            )
+            loaded = [
+                weather_response(db_query, db_query.city)
+                for db_query in db_queries
+            ]
+            if len(loaded) < len(to_load):
+                loaded_ids = {record.id for record in loaded}
+                loaded.extend(
+                    WeatherResponse(**row)
+                    for row in query_archive.get_many(
+                        query_id for query_id in to_load
+                        if query_id not in loaded_ids
+                    ).values()
+                )
+        except Exception as e:  # noqa: B902
+            error_logger.error(e)
+            response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+            return Error(error=str(e))
+        for record in loaded:
+            record_cache.put(record)
+            records[record.id] = record
+
     response.status_code = status.HTTP_200_OK
-    return WeatherResponse(
-        id=db_query.id,
-        city_name=db_city.name,
-        city_country=db_city.country,
-        latitude=db_city.lat,
-        longitude=db_city.lon,
-        weather_name=db_query.weather_name,
-        weather_description=db_query.weather_description,
-        weather_icon='https://openweathermap.org/img/wn/'
-                     f'{db_query.weather_icon}@2x.png',
-        temp=db_query.temp,
-        pressure=db_query.pressure,
-        humidity=db_query.humidity,
-        visibility=db_query.visibility,
-        wind_speed=db_query.wind_speed,
-        wind_degree=db_query.wind_deg,
-        wind_direction=db_query.wind_direction,
-        wind_code=db_query.wind_code,
-        cloudiness=db_query.cloudiness,
-        sunrise=db_query.sunrise,
-        sunset=db_query.sunset,
-        utc_timestamp=db_query.utc_timestamp
+    return QueriesLookupResponse(
+        queries=[records[query_id] for query_id in query_ids
+                 if query_id in records],
+        missing=[query_id for query_id in query_ids
+                 if query_id not in records]
+    )
+
+
+# ##################### GET CHANGES OF WEATHER QUERIES ###################### #
+@main_router.get(
+    '/queries/changes',
+    responses={
+        200: {'model': QueriesChangesResponse},
+        500: {'model': Error}
+    }
+)
+async def get_queries_changes(
+        response: Response,
+        changes_query: Annotated[QueriesChangesQueryParams, Query()]
+) -> Union[QueriesChangesResponse, Error]:  # noqa
+    """
+    Up to ``limit`` queries after ``since_id`` in ID order. If there are
+    none yet, waits up to ``timeout`` seconds for the next insert (of any
+    worker). Pass ``next_since_id`` as ``since_id`` of the next request.
+    Queries after an ID that may still be committed are sent only once
+    it is, or after ``COMMIT_GRACE`` seconds, so none is skipped.
+    """
+    since_id = changes_query.since_id
+
+    def load_changes(db: Session) -> Tuple[List[DB_Query], float]:
+        return committed_prefix(db.query(DB_Query).filter(
+            DB_Query.id > since_id
+        ).order_by(DB_Query.id).limit(changes_query.limit).all(), since_id)
+
+    try:
+        db_queries, settled_in = session_router.read(
+            load_changes, query_notifier.latest_id
+        )
+        if not db_queries:
+            if settled_in:
+                await asyncio.sleep(min(settled_in, changes_query.timeout))
+                changed = True
+            else:
+                changed = await query_notifier.wait(
+                    since_id, changes_query.timeout
+                )
+            if changed:
+                db_queries, _ = session_router.read(
+                    load_changes, query_notifier.latest_id
+                )
+        records = [
+            weather_response(db_query, db_query.city)
+            for db_query in db_queries
+        ]
+    except Exception as e:  # noqa: B902
+        error_logger.error(e)
+        response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        return Error(error=str(e))
+
+    response.status_code = status.HTTP_200_OK
+    response.headers['Cache-Control'] = CACHE_NO_CACHE
+    return QueriesChangesResponse(
+        queries=records,
+        next_since_id=records[-1].id if records else since_id
     )
 
 
+# ######################## GET WEATHER BY QUERY ID ######################## #
+@main_router.get(
+    '/queries/{query_id}',
+    responses={
+        200: {'model': WeatherResponse},
+        400: {'model': Error},
+        500: {'model': Error}
+    }
+)
+async def get_query(
+        response: Response,
+        query_id: int,
+        if_none_match: Annotated[Union[str, None], Header()] = None
+) -> Union[WeatherResponse, Error]:  # noqa
+    # Query records are never changed after insert, so the ETag depends
+    # only on the ID and a revalidation doesn't need the database at all
+    etag = make_etag(constants.API_VERSION, 'query', query_id)
+    if etag_matches(if_none_match, etag, exists=False):
+        return not_modified(etag, CACHE_IMMUTABLE)
+
+    record = record_cache.get(query_id)
+    if record is None:
+        try:
+            db_query = session_router.read(
+                lambda db: db.get(DB_Query, query_id),
+                query_id
+            )
+            if db_query:
+                record = weather_response(db_query, db_query.city)
+            else:
+                row = query_archive.get(query_id)
+                if row is None:
+                    response.status_code = status.HTTP_400_BAD_REQUEST
+                    return Error(error='No weather query with this ID')
+                record = WeatherResponse(**row)
+        except Exception as e:  # noqa: B902
+            error_logger.error(e)
+            response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+            return Error(error=str(e))
+        record_cache.put(record)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, CACHE_IMMUTABLE)
+
+    response.status_code = status.HTTP_200_OK
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = CACHE_IMMUTABLE
+    return record
+
+
 # ######################## GET ALL WEATHER QUERIES ######################## #
 @main_router.get(
     '/queries',
@@ -226,54 +882,60 @@ async def get_query(
 )
 async def get_queries(
         response: Response,
-        filter_query: Annotated[GetWeathersQueryParams, Query()]
+        filter_query: Annotated[GetWeathersQueryParams, Query()],
+        if_none_match: Annotated[Union[str, None], Header()] = None
 ) -> Union[List[WeatherResponse], Error]:  # noqa
+    """
+    Page of saved queries. Archived queries are not listed, the largest
+    archived ID is sent in ``X-Archived-Through`` header, and they are
+    still found by ``/queries/{query_id}`` and ``/queries/lookup``.
+    """
     limit = filter_query.limit
     offset = filter_query.offset
     descending = filter_query.descending
 
-    db = SessionLocal()
-    try:
+    def load_page(db: Session) -> tuple:
+        # Rows are only appended (and removed from the start), so the
+        # ID bounds identify the page content without loading it
+        min_id, max_id = db.query(
+            func.min(DB_Query.id), func.max(DB_Query.id)
+        ).one()
+        page_etag = make_etag(
+            constants.API_VERSION, 'queries',
+            limit, offset, descending, min_id, max_id,
+            weak=True
+        )
+        if etag_matches(if_none_match, page_etag, exists=False):
+            return page_etag, None
         db_queries = db.query(
             DB_Query
         ).order_by(
             DB_Query.id.desc() if descending else DB_Query.id.asc()
         ).limit(limit).offset(limit * offset).all()
+        if db_queries and etag_matches(if_none_match, page_etag):
+            return page_etag, None
+        return page_etag, db_queries
+
+    try:
+        etag, db_queries = session_router.read(load_page)
+        if db_queries is None:
+            return not_modified(etag, CACHE_NO_CACHE)
         if len(db_queries) == 0:
             response.status_code = status.HTTP_400_BAD_REQUEST
             return Error(error='End of weather queries')
         db_queries = [
-            WeatherResponse(
-                id=db_query.id,
-                city_name=db_query.city.name,
-                city_country=db_query.city.country,
-                latitude=db_query.city.lat,
-                longitude=db_query.city.lon,
-                weather_name=db_query.weather_name,
-                weather_description=db_query.weather_description,
-                weather_icon='https://openweathermap.org/img/wn/'
-                             f'{db_query.weather_icon}@2x.png',
-                temp=db_query.temp,
-                pressure=db_query.pressure,
-                humidity=db_query.humidity,
-                visibility=db_query.visibility,
-                wind_speed=db_query.wind_speed,
-                wind_degree=db_query.wind_deg,
-                wind_direction=db_query.wind_direction,
-                wind_code=db_query.wind_code,
-                cloudiness=db_query.cloudiness,
-                sunrise=db_query.sunrise,
-                sunset=db_query.sunset,
-                utc_timestamp=db_query.utc_timestamp
-            )
+            weather_response(db_query, db_query.city)
             for db_query in db_queries
         ]
     except Exception as e:  # noqa: B902
         error_logger.error(e)
         response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
         return Error(error=str(e))
-    finally:
-        db.close()
 
     response.status_code = status.HTTP_200_OK
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = CACHE_NO_CACHE
+    archived_through = query_archive.last_id
+    if archived_through is not None:
+        response.headers['X-Archived-Through'] = str(archived_through)
     return db_queries
@@ -0,0 +1,192 @@
+"""
+This module contains live weather subscriptions for API v1. Every
+subscribed city is polled by one shared task, whatever the number of its
+subscribers, and each new observation is passed to all of them.
+"""
+
+# Other imports
+import asyncio
+from logging import Logger
+from typing import Callable, Dict, Hashable, Iterable, List, Set, Union
+
+# Import from this API version
+from .database import Query
+# Imports from project
+from ...open_weather_api import UpstreamUnavailableError  # noqa: I100
+
+error_logger = Logger('uvicorn.error')
+
+
+class Publication:
+    """
+    Published query with its events, which are rendered once per format
+    (e.g. units and language) and shared by all subscribers of its city
+    """
+    __slots__ = ('query', '_events')
+
+    def __init__(self, query: Query):
+        self.query = query
+        self._events: Dict[Hashable, str] = {}
+
+    def __repr__(self):
+        return f'Publication(query={self.query!r})'
+
+    def render(self, key: Hashable, build: Callable[[Query], str]) -> str:
+        """Event of format ``key``, made by ``build`` on first use"""
+        event = self._events.get(key)
+        if event is None:
+            event = self._events[key] = build(self.query)
+        return event
+
+
+class Subscriber:
+    """
+    Mailbox of one connection, with only the latest unsent query of each
+    city. A slow client gets the newest weather when it catches up instead
+    of a backlog, so its memory use doesn't grow.
+    """
+    __slots__ = ('city_ids', '_mailbox', '_event')
+
+    def __init__(self, city_ids: Iterable[int]):
+        self.city_ids = tuple(city_ids)
+        self._mailbox: Dict[int, Publication] = {}
+        self._event = asyncio.Event()
+
+    def __repr__(self):
+        return f'Subscriber(city_ids={self.city_ids})'
+
+    def put(self, city_id: int, publication: Publication):
+        self._mailbox[city_id] = publication
+        self._event.set()
+
+    def take(self) -> List[Publication]:
+        """Unsent publications, the mailbox is emptied"""
+        publications = list(self._mailbox.values())
+        self._mailbox.clear()
+        self._event.clear()
+        return publications
+
+    async def wait(self, timeout: float) -> bool:
+        """Waits up to ``timeout`` seconds for a query, False if none came"""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+class SubscriptionHub:
+    def __init__(
+            self,
+            poll: Callable[[int, Union[int, None]], Union[Query, None]],
+            poll_interval: float = 60,
+            polls_per_minute: float = 30,
+            retry_after: Callable[[], float] = lambda: 60
+    ):
+        """
+        ``poll(city_id, observation_id)`` gets current weather of a city
+        and returns its saved query, or None if the observation is still
+        ``observation_id``. It is run in a thread.
+        Each city is polled every ``poll_interval`` seconds, or less often
+        when all cities together would need more than ``polls_per_minute``
+        upstream calls. While upstream is unavailable, a poller waits for
+        ``retry_after()`` seconds.
+        """
+        self._poll = poll
+        self._poll_interval = poll_interval
+        self._polls_per_minute = polls_per_minute
+        self._retry_after = retry_after
+        self._subscribers: Dict[int, Set[Subscriber]] = {}
+        self._pollers: Dict[int, asyncio.Task] = {}
+        self._latest: Dict[int, Publication] = {}
+        self._connections = 0
+        self._counters = {'polls': 0, 'failures': 0, 'published': 0}
+
+    def __repr__(self):
+        return (f'SubscriptionHub(poll_interval={self._poll_interval}, '
+                f'polls_per_minute={self._polls_per_minute})')
+
+    @property
+    def interval(self) -> float:
+        """Seconds between polls of one city"""
+        return max(
+            self._poll_interval,
+            len(self._pollers) * 60 / self._polls_per_minute
+        )
+
+    def subscribe(self, city_ids: Iterable[int]) -> Subscriber:
+        """
+        New subscriber of ``city_ids``, which gets the latest publication
+        of each city at once. Must be unsubscribed when its client leaves.
+        """
+        subscriber = Subscriber(city_ids)
+        for city_id in subscriber.city_ids:
+            self._subscribers.setdefault(city_id, set()).add(subscriber)
+            if city_id in self._latest:
+                subscriber.put(city_id, self._latest[city_id])
+            if city_id not in self._pollers:
+                self._pollers[city_id] = asyncio.create_task(
+                    self._run_poller(city_id)
+                )
+        self._connections += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        """Removes ``subscriber``, cities nobody follows stop being polled"""
+        for city_id in subscriber.city_ids:
+            subscribers = self._subscribers.get(city_id)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[city_id]
+                self._latest.pop(city_id, None)
+                poller = self._pollers.pop(city_id, None)
+                if poller is not None:
+                    poller.cancel()
+        self._connections -= 1
+
+    def _publish(self, city_id: int, db_query: Query):
+        publication = Publication(db_query)
+        self._latest[city_id] = publication
+        for subscriber in self._subscribers.get(city_id, ()):
+            subscriber.put(city_id, publication)
+        self._counters['published'] += 1
+
+    async def _run_poller(self, city_id: int):
+        observation_id = None
+        while True:
+            delay = self.interval
+            try:
+                db_query = await asyncio.get_running_loop().run_in_executor(
+                    None, self._poll, city_id, observation_id
+                )
+                self._counters['polls'] += 1
+            except UpstreamUnavailableError as e:
+                error_logger.error(e)
+                self._counters['failures'] += 1
+                delay = max(delay, self._retry_after())
+            except Exception as e:  # noqa: B902
+                error_logger.error(e)
+                self._counters['failures'] += 1
+            else:
+                if db_query is not None:
+                    observation_id = db_query.observation_id
+                    self._publish(city_id, db_query)
+            await asyncio.sleep(delay)
+
+    async def stop(self):
+        """Stops all pollers, at shutdown"""
+        pollers = list(self._pollers.values())
+        for poller in pollers:
+            poller.cancel()
+        await asyncio.gather(*pollers, return_exceptions=True)
+        self._pollers.clear()
+
+    def stats(self) -> dict:
+        return {
+            'cities': len(self._pollers),
+            'connections': self._connections,
+            'interval': round(self.interval, 3),
+            **self._counters
+        }
@@ -37,6 +37,9 @@ class MainConfigurator:
             'main_api_address': os.getenv('MAIN_API_ADDRESS', '/api'),
             'main_site': os.getenv('MAIN_SITE'),
             'static_dir': os.getenv('STATIC_DIR', 'static'),
+            'static_precompress': bool(
+                int(os.getenv('STATIC_PRECOMPRESS', '1'))
+            ),
             'favicon': os.path.join(
                 os.getenv('STATIC_DIR', 'static'),
                 os.getenv('FAVICON', 'favicon.ico')
@@ -53,12 +56,126 @@ class MainConfigurator:
                 os.getenv('STATIC_DIR', 'static'),
                 os.getenv('SWAGGER_CSS', 'swagger-ui.css')
             ),
+            'db_backend': os.getenv('DB_BACKEND', 'postgresql'),
+            'sqlite_path': os.getenv('SQLITE_PATH', 'weather.db'),
             'postgres_host': os.getenv('POSTGRES_HOST', 'localhost'),
             'postgres_port': int(os.getenv('POSTGRES_PORT', '5432')),
             'postgres_user': os.getenv('POSTGRES_USER', 'postgres'),
             'postgres_password': os.getenv('POSTGRES_PASSWORD', 'postgres'),
             'postgres_name': os.getenv('POSTGRES_NAME', 'postgres'),
+            'postgres_replica_host': os.getenv('POSTGRES_REPLICA_HOST'),
+            'postgres_replica_port': int(os.getenv(
+                'POSTGRES_REPLICA_PORT', os.getenv('POSTGRES_PORT', '5432')
+            )),
+            'postgres_replica_user': os.getenv(
+                'POSTGRES_REPLICA_USER', os.getenv('POSTGRES_USER', 'postgres')
+            ),
+            'postgres_replica_password': os.getenv(
+                'POSTGRES_REPLICA_PASSWORD',
+                os.getenv('POSTGRES_PASSWORD', 'postgres')
+            ),
+            'postgres_replica_name': os.getenv(
+                'POSTGRES_REPLICA_NAME', os.getenv('POSTGRES_NAME', 'postgres')
+            ),
+            'replica_max_lag': float(os.getenv('REPLICA_MAX_LAG', '5')),
+            'replica_check_interval': float(
+                os.getenv('REPLICA_CHECK_INTERVAL', '5')
+            ),
+            'weather_cache_ttl': int(os.getenv('WEATHER_CACHE_TTL', '600')),
+            'warm_start_dir': os.getenv('WARM_START_DIR', 'cache'),
+            'warm_start_interval': float(
+                os.getenv('WARM_START_INTERVAL', '60')
+            ),
+            'query_cache_size': int(os.getenv('QUERY_CACHE_SIZE', '10000')),
+            'archive_dir': os.getenv('ARCHIVE_DIR', 'archive'),
+            'archive_after_days': float(
+                os.getenv('ARCHIVE_AFTER_DAYS', '90')
+            ),
+            'subscription_poll_interval': float(
+                os.getenv('SUBSCRIPTION_POLL_INTERVAL', '60')
+            ),
+            'subscription_polls_per_minute': float(
+                os.getenv('SUBSCRIPTION_POLLS_PER_MINUTE', '30')
+            ),
+            'subscription_keepalive': float(
+                os.getenv('SUBSCRIPTION_KEEPALIVE', '15')
+            ),
+            'coords_snap_radius': float(
+                os.getenv('COORDS_SNAP_RADIUS', '10')
+            ),
+            'upstream_connect_timeout': float(
+                os.getenv('UPSTREAM_CONNECT_TIMEOUT', '3.05')
+            ),
+            'upstream_read_timeout': float(
+                os.getenv('UPSTREAM_READ_TIMEOUT', '10')
+            ),
+            'breaker_error_rate': float(
+                os.getenv('BREAKER_ERROR_RATE', '0.5')
+            ),
+            'breaker_window': int(os.getenv('BREAKER_WINDOW', '20')),
+            'breaker_min_calls': int(os.getenv('BREAKER_MIN_CALLS', '10')),
+            'breaker_cooldown': float(os.getenv('BREAKER_COOLDOWN', '30')),
+            'hedge_percentile': float(os.getenv('HEDGE_PERCENTILE', '0')),
+            'open_weather_key_rate': float(
+                os.getenv('OPEN_WEATHER_KEY_RATE', '60')
+            ),
+            'open_weather_key_unauthorized_cooldown': float(
+                os.getenv('OPEN_WEATHER_KEY_UNAUTHORIZED_COOLDOWN', '3600')
+            ),
+            'open_weather_key_rate_limited_cooldown': float(
+                os.getenv('OPEN_WEATHER_KEY_RATE_LIMITED_COOLDOWN', '60')
+            ),
+            'admission_control': bool(
+                int(os.getenv('ADMISSION_CONTROL', '1'))
+            ),
+            'admission_initial_limit': int(
+                os.getenv('ADMISSION_INITIAL_LIMIT', '20')
+            ),
+            'admission_max_limit': int(
+                os.getenv('ADMISSION_MAX_LIMIT', '200')
+            ),
+            'admission_target_latency': float(
+                os.getenv('ADMISSION_TARGET_LATENCY', '1')
+            ),
+            'admission_max_loop_lag': float(
+                os.getenv('ADMISSION_MAX_LOOP_LAG', '0.2')
+            ),
+            'admission_expensive_paths': os.getenv(
+                'ADMISSION_EXPENSIVE_PATHS', '/weather'
+            ).split(','),
+            'admission_stream_paths': os.getenv(
+                'ADMISSION_STREAM_PATHS', '/subscriptions,/queries/changes'
+            ).split(','),
+            'rate_limits': os.getenv('RATE_LIMITS', ''),
+            'rate_limit_key_header': os.getenv('RATE_LIMIT_KEY_HEADER'),
+            'rate_limit_forwarded_header': os.getenv(
+                'RATE_LIMIT_FORWARDED_HEADER'
+            ),
+            'rate_limit_max_clients': int(
+                os.getenv('RATE_LIMIT_MAX_CLIENTS', '100000')
+            ),
+            'blocking_detector': bool(int(
+                os.getenv('BLOCKING_DETECTOR', os.getenv('START_DEV', '0'))
+            )),
+            'blocking_threshold': float(
+                os.getenv('BLOCKING_THRESHOLD', '0.1')
+            ),
+            'memory_diagnostics': bool(
+                int(os.getenv('MEMORY_DIAGNOSTICS', '0'))
+            ),
+            'memory_snapshot_interval': float(
+                os.getenv('MEMORY_SNAPSHOT_INTERVAL', '0')
+            ),
+            'memory_trace_frames': int(
+                os.getenv('MEMORY_TRACE_FRAMES', '10')
+            ),
+            'debug_token': os.getenv('DEBUG_TOKEN'),
         }
+        if self.cfg['db_backend'] not in ('postgresql', 'sqlite'):
+            raise ValueError(
+                f'Unknown DB_BACKEND {self.cfg["db_backend"]!r}, '
+                f'must be postgresql or sqlite'
+            )
         if not self.cfg['main_api_address'].startswith('/'):
             self.cfg['main_api_address'] = f'/{self.cfg["main_api_address"]}'
         self.cfg['main_site'] = (
@@ -129,6 +246,10 @@ class MainConfigurator:
     def static_dir(self):
         return self.config['static_dir']
 
+    @property
+    def static_precompress(self):
+        return self.config['static_precompress']
+
     @property
     def favicon(self):
         return self.config['favicon']
@@ -145,6 +266,14 @@ class MainConfigurator:
     def swagger_css(self):
         return self.config['swagger_css']
 
+    @property
+    def db_backend(self):
+        return self.config['db_backend']
+
+    @property
+    def sqlite_path(self):
+        return self.config['sqlite_path']
+
     @property
     def postgres_host(self):
         return self.config['postgres_host']
@@ -164,3 +293,179 @@ class MainConfigurator:
     @property
     def postgres_name(self):
         return self.config['postgres_name']
+
+    @property
+    def postgres_replica_host(self):
+        return self.config['postgres_replica_host']
+
+    @property
+    def postgres_replica_port(self):
+        return self.config['postgres_replica_port']
+
+    @property
+    def postgres_replica_user(self):
+        return self.config['postgres_replica_user']
+
+    @property
+    def postgres_replica_password(self):
+        return self.config['postgres_replica_password']
+
+    @property
+    def postgres_replica_name(self):
+        return self.config['postgres_replica_name']
+
+    @property
+    def replica_max_lag(self):
+        return self.config['replica_max_lag']
+
+    @property
+    def replica_check_interval(self):
+        return self.config['replica_check_interval']
+
+    @property
+    def weather_cache_ttl(self):
+        return self.config['weather_cache_ttl']
+
+    @property
+    def warm_start_dir(self):
+        return self.config['warm_start_dir']
+
+    @property
+    def warm_start_interval(self):
+        return self.config['warm_start_interval']
+
+    @property
+    def query_cache_size(self):
+        return self.config['query_cache_size']
+
+    @property
+    def archive_dir(self):
+        return self.config['archive_dir']
+
+    @property
+    def archive_after_days(self):
+        return self.config['archive_after_days']
+
+    @property
+    def subscription_poll_interval(self):
+        return self.config['subscription_poll_interval']
+
+    @property
+    def subscription_polls_per_minute(self):
+        return self.config['subscription_polls_per_minute']
+
+    @property
+    def subscription_keepalive(self):
+        return self.config['subscription_keepalive']
+
+    @property
+    def coords_snap_radius(self):
+        return self.config['coords_snap_radius']
+
+    @property
+    def upstream_connect_timeout(self):
+        return self.config['upstream_connect_timeout']
+
+    @property
+    def upstream_read_timeout(self):
+        return self.config['upstream_read_timeout']
+
+    @property
+    def breaker_error_rate(self):
+        return self.config['breaker_error_rate']
+
+    @property
+    def breaker_window(self):
+        return self.config['breaker_window']
+
+    @property
+    def breaker_min_calls(self):
+        return self.config['breaker_min_calls']
+
+    @property
+    def breaker_cooldown(self):
+        return self.config['breaker_cooldown']
+
+    @property
+    def hedge_percentile(self):
+        return self.config['hedge_percentile']
+
+    @property
+    def open_weather_key_rate(self):
+        return self.config['open_weather_key_rate']
+
+    @property
+    def open_weather_key_unauthorized_cooldown(self):
+        return self.config['open_weather_key_unauthorized_cooldown']
+
+    @property
+    def open_weather_key_rate_limited_cooldown(self):
+        return self.config['open_weather_key_rate_limited_cooldown']
+
+    @property
+    def admission_control(self):
+        return self.config['admission_control']
+
+    @property
+    def admission_initial_limit(self):
+        return self.config['admission_initial_limit']
+
+    @property
+    def admission_max_limit(self):
+        return self.config['admission_max_limit']
+
+    @property
+    def admission_target_latency(self):
+        return self.config['admission_target_latency']
+
+    @property
+    def admission_max_loop_lag(self):
+        return self.config['admission_max_loop_lag']
+
+    @property
+    def admission_expensive_paths(self):
+        return self.config['admission_expensive_paths']
+
+    @property
+    def admission_stream_paths(self):
+        return self.config['admission_stream_paths']
+
+    @property
+    def rate_limits(self):
+        return self.config['rate_limits']
+
+    @property
+    def rate_limit_key_header(self):
+        return self.config['rate_limit_key_header']
+
+    @property
+    def rate_limit_forwarded_header(self):
+        return self.config['rate_limit_forwarded_header']
+
+    @property
+    def rate_limit_max_clients(self):
+        return self.config['rate_limit_max_clients']
+
+    @property
+    def blocking_detector(self):
+        return self.config['blocking_detector']
+
+    @property
+    def blocking_threshold(self):
+        return self.config['blocking_threshold']
+
+    @property
+    def memory_diagnostics(self):
+        return self.config['memory_diagnostics']
+
+    @property
+    def memory_snapshot_interval(self):
+        return self.config['memory_snapshot_interval']
+
+    @property
+    def memory_trace_frames(self):
+        return self.config['memory_trace_frames']
+
+    @property
+    def debug_token(self):
+        return self.config['debug_token']
@@ -0,0 +1,9 @@
+"""
+This module contains diagnostics for development and canary deployments.
+"""
+
+from .blocking import BlockingDetector, BlockingDetectorMiddleware
+from .memory import MemoryDiagnostics
+
+__all__ = ['BlockingDetector', 'BlockingDetectorMiddleware',
+           'MemoryDiagnostics']
@@ -0,0 +1,165 @@
+"""
+This module contains an event loop blocking detector. A heartbeat task
+runs on the event loop and a watchdog thread captures the stack of the
+event loop thread when the heartbeat stops for longer than a threshold,
+attributing it to the request being handled and to the blocking line.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import Union
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+__all__ = ['BlockingDetector', 'BlockingDetectorMiddleware']
+
+logger = logging.getLogger('uvicorn.error')
+
+MAX_STACK_DEPTH = 40
+
+
+class BlockingDetectorMiddleware:
+    def __init__(self, app: ASGIApp):
+        """
+        Keeps request ``scope`` in a frame on the stack of every request,
+        so ``BlockingDetector`` can tell which route blocked the loop.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        await self.app(scope, receive, send)
+
+
+_MIDDLEWARE_CODE = BlockingDetectorMiddleware.__call__.__code__
+
+
+class BlockingDetector:
+    def __init__(
+            self,
+            threshold: float = 0.1,
+            project_root: Union[str, None] = None,
+            max_reports: int = 100
+    ):
+        """
+        Reports every time the event loop is blocked for over
+        ``threshold`` seconds. The blocking line is the innermost frame
+        from ``project_root`` (or the innermost frame if there is none).
+        The last ``max_reports`` reports are kept.
+        """
+        self._threshold = threshold
+        self._interval = threshold / 2
+        self._project_root = os.path.abspath(project_root or os.getcwd())
+        self._reports = deque(maxlen=max_reports)
+        self._counts = Counter()
+        self._current_report: Union[dict, None] = None
+        self._last_beat = time.monotonic()
+        self._max_lag = 0.0
+        self._loop_thread_id: Union[int, None] = None
+        self._heartbeat_task: Union[asyncio.Task, None] = None
+        self._watchdog: Union[threading.Thread, None] = None
+        self._stopped = threading.Event()
+
+    def __repr__(self):
+        return f'BlockingDetector(threshold={self._threshold})'
+
+    def start(self):
+        """Starts heartbeat on the running loop and watchdog thread"""
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._heartbeat_task = asyncio.get_running_loop().create_task(
+            self._heartbeat()
+        )
+        self._watchdog = threading.Thread(
+            target=self._watch, name='blocking-detector', daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self):
+        self._stopped.set()
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self._interval
+            await asyncio.sleep(self._interval)
+            now = time.monotonic()
+            self._max_lag = max(self._max_lag, now - expected)
+            self._last_beat = now
+
+    def _watch(self):
+        while not self._stopped.wait(self._interval / 2):
+            blocked_for = time.monotonic() - self._last_beat - self._interval
+            report = self._current_report
+            if blocked_for > self._threshold:
+                if report is None:
+                    self._current_report = self._capture(blocked_for)
+                else:
+                    report['blocked_for'] = round(blocked_for, 4)
+            elif report is not None:
+                self._current_report = None
+                logger.warning(
+                    f'Event loop was blocked for {report["blocked_for"]}s '
+                    f'by {report["route"]} at {report["location"]}'
+                )
+
+    def _capture(self, blocked_for: float) -> dict:
+        """Captures event loop thread stack and saves a new report"""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.extract_stack(frame, limit=MAX_STACK_DEPTH)
+        route = None
+        while frame is not None:
+            if frame.f_code is _MIDDLEWARE_CODE:
+                scope = frame.f_locals.get('scope') or {}
+                route = f'{scope.get("method", "")} {scope.get("path", "")}'
+                break
+            frame = frame.f_back
+
+        location_frame = stack[-1] if stack else None
+        for stack_frame in reversed(stack):
+            if os.path.abspath(stack_frame.filename).startswith(
+                    self._project_root
+            ):
+                location_frame = stack_frame
+                break
+        location = (
+            f'{location_frame.filename}:{location_frame.lineno} '
+            f'in {location_frame.name}'
+            if location_frame else 'unknown'
+        )
+
+        report = {
+            'time': time.time(),
+            'blocked_for': round(blocked_for, 4),
+            'route': route or 'no request',
+            'location': location,
+            'code': location_frame.line if location_frame else None,
+            'stack': traceback.format_list(stack)
+        }
+        self._reports.append(report)
+        self._counts[(report['route'], location)] += 1
+        return report
+
+    def stats(self) -> dict:
+        return {
+            'threshold': self._threshold,
+            'max_lag': round(self._max_lag, 4),
+            'blocked': self._current_report is not None,
+            'top': [
+                {'route': route, 'location': location, 'count': count}
+                for (route, location), count in self._counts.most_common(20)
+            ],
+            'reports': list(self._reports)
+        }
@@ -0,0 +1,151 @@
+"""
+This module contains memory diagnostics: ``tracemalloc`` snapshots taken on
+demand or on a schedule, compared with a baseline snapshot to find the
+allocation sites and object types that keep growing.
+"""
+
+import asyncio
+import gc
+import json
+import logging
+import os
+import time
+import tracemalloc
+from collections import Counter
+from typing import Union
+
+__all__ = ['MemoryDiagnostics']
+
+logger = logging.getLogger('uvicorn.error')
+
+IGNORED_FILES = (tracemalloc.__file__, '<frozen importlib._bootstrap>',
+                 '<frozen importlib._bootstrap_external>', '<unknown>')
+
+
+def _object_counts() -> Counter:
+    return Counter(type(obj).__qualname__ for obj in gc.get_objects())
+
+
+class MemoryDiagnostics:
+    def __init__(
+            self,
+            output_dir: Union[str, None] = None,
+            frames: int = 10,
+            top: int = 20,
+            interval: float = 0
+    ):
+        """
+        Nothing is traced until ``start``. Then every snapshot (taken each
+        ``interval`` seconds, if it is set, or with ``snapshot``) is
+        compared with the baseline taken at start, and a report with
+        ``top`` allocation sites (``frames`` deep tracebacks) and object
+        types is logged and written to ``output_dir`` if it is set.
+        """
+        self._output_dir = output_dir
+        self._frames = frames
+        self._top = top
+        self._interval = interval
+        self._baseline: Union[tracemalloc.Snapshot, None] = None
+        self._baseline_objects = Counter()
+        self._baseline_time = 0.0
+        self._task: Union[asyncio.Task, None] = None
+
+    def __repr__(self):
+        return (f'MemoryDiagnostics(frames={self._frames}, '
+                f'interval={self._interval})')
+
+    @property
+    def started(self) -> bool:
+        return self._baseline is not None
+
+    def start(self):
+        """Starts tracing, takes baseline and schedules snapshots"""
+        tracemalloc.start(self._frames)
+        self.reset_baseline()
+        if self._interval > 0:
+            self._task = asyncio.get_running_loop().create_task(
+                self._snapshot_periodically()
+            )
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.started:
+            tracemalloc.stop()
+            self._baseline = None
+
+    async def _snapshot_periodically(self):
+        while True:
+            await asyncio.sleep(self._interval)
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.snapshot, 'scheduled'
+            )
+
+    def _take_snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, filename) for filename in IGNORED_FILES]
+        )
+
+    def reset_baseline(self):
+        """Makes the current state the one to compare snapshots with"""
+        self._baseline = self._take_snapshot()
+        self._baseline_objects = _object_counts()
+        self._baseline_time = time.time()
+
+    def snapshot(self, label: str = 'manual') -> dict:
+        """Compares a new snapshot with the baseline and saves the report"""
+        if not self.started:
+            raise RuntimeError('Memory diagnostics are not started')
+
+        snapshot = self._take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        stats = snapshot.compare_to(self._baseline, 'traceback')
+        objects = _object_counts()
+        objects.subtract(self._baseline_objects)
+
+        report = {
+            'label': label,
+            'time': time.time(),
+            'baseline_time': self._baseline_time,
+            'traced_memory': current,
+            'traced_memory_peak': peak,
+            'traced_memory_growth': sum(stat.size_diff for stat in stats),
+            'top_allocations': [
+                {
+                    'size': stat.size,
+                    'size_diff': stat.size_diff,
+                    'count': stat.count,
+                    'count_diff': stat.count_diff,
+                    'traceback': stat.traceback.format(most_recent_first=True)
+                }
+                for stat in stats[:self._top]
+            ],
+            'object_growth': [
+                {'type': type_name, 'count_diff': count_diff}
+                for type_name, count_diff in objects.most_common(self._top)
+                if count_diff > 0
+            ]
+        }
+
+        top_site = (report['top_allocations'][0]['traceback'][0].strip()
+                    if report['top_allocations'] else 'none')
+        logger.info(
+            f'Memory snapshot ({label}): '
+            f'{current / 1024 / 1024:.1f} MiB traced, '
+            f'{report["traced_memory_growth"] / 1024:+.1f} KiB since '
+            f'baseline, top growth at {top_site}'
+        )
+        if self._output_dir:
+            os.makedirs(self._output_dir, exist_ok=True)
+            path = os.path.join(
+                self._output_dir,
+                time.strftime(f'memory-%Y%m%d-%H%M%S-{label}.json')
+            )
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(report, file, indent=2)
+        return report
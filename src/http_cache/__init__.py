@@ -0,0 +1,22 @@
+"""
+This module contains helpers for HTTP caching: ETags, ``Cache-Control``
+values and ``304 Not Modified`` responses.
+"""
+
+from .http_cache import (
+    CACHE_IMMUTABLE,
+    CACHE_NO_CACHE,
+    etag_matches,
+    make_etag,
+    max_age,
+    not_modified
+)
+
+__all__ = [
+    'CACHE_IMMUTABLE',
+    'CACHE_NO_CACHE',
+    'etag_matches',
+    'make_etag',
+    'max_age',
+    'not_modified'
+]
@@ -0,0 +1,72 @@
+"""
+This module contains helpers for HTTP caching: ETags, ``Cache-Control``
+values and ``304 Not Modified`` responses.
+"""
+
+import hashlib
+from typing import Union
+
+from fastapi import Response, status
+
+__all__ = [
+    'CACHE_IMMUTABLE',
+    'CACHE_NO_CACHE',
+    'etag_matches',
+    'make_etag',
+    'max_age',
+    'not_modified'
+]
+
+CACHE_IMMUTABLE = 'public, max-age=31536000, immutable'
+CACHE_NO_CACHE = 'no-cache'
+
+
+def make_etag(*parts: Union[str, int, float, bool], weak=False) -> str:
+    """
+    Builds a quoted ETag from ``parts``.
+    Weak ETags are prefixed with ``W/`` as described in RFC 9110.
+    """
+    digest = hashlib.blake2b(
+        '|'.join(str(part) for part in parts).encode(), digest_size=12
+    ).hexdigest()
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+
+def etag_matches(
+        if_none_match: Union[str, None],
+        etag: str,
+        exists: bool = True
+) -> bool:
+    """
+    Checks ``If-None-Match`` header value against ``etag``.
+    Uses weak comparison, as required for ``If-None-Match``.
+    ``*`` matches any current representation, so only if it ``exists``.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return exists
+    opaque_tag = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque_tag:
+            return True
+    return False
+
+
+def max_age(seconds: Union[int, float]) -> str:
+    """``Cache-Control`` value for a response fresh for ``seconds``"""
+    seconds = max(int(seconds), 0)
+    if not seconds:
+        return CACHE_NO_CACHE
+    return f'public, max-age={seconds}'
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    """Empty ``304 Not Modified`` response with validators"""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={'ETag': etag, 'Cache-Control': cache_control}
+    )
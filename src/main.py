@@ -2,18 +2,36 @@
 Main starting point for the API
 """
 
+# Other imports
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from hmac import compare_digest
+from typing import Union
+
 # Main imports
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, HTTPException, Header, Request
 from fastapi.openapi.docs import (
     get_redoc_html,
     get_swagger_ui_html,
     get_swagger_ui_oauth2_redirect_html
 )
-from fastapi.staticfiles import StaticFiles
 
 # Imports from project
-from .api_versions import API_LATEST, API_VERSIONS  # noqa: I100
+from .admission import (  # noqa: I100
+    AdaptiveLimiter,
+    AdmissionController,
+    AdmissionMiddleware
+)
+from .api_versions import API_LATEST, API_VERSIONS
 from .configurator import MainConfigurator
+from .diagnostics import (
+    BlockingDetector,
+    BlockingDetectorMiddleware,
+    MemoryDiagnostics
+)
+from .rate_limiter import RateLimitMiddleware, RateLimiter, parse_rules
+from .static_files import PrecompressedStaticFiles
 
 # Config loading
 config = MainConfigurator()
@@ -21,8 +39,87 @@ config = MainConfigurator()
 DESCRIPTION = (f'This is the {config.api_name} API.\n\n'
                f'You can check the docs at {config.main_api_address}/docs '
                f'and {config.main_api_address}/redoc.{config.main_site}')
+# Prefixes API routers are included with
+API_PREFIXES = [
+    config.main_api_address,
+    config.main_api_address + '/latest',
+    *(config.main_api_address + f'/v{version.API_VERSION}'
+      for version in API_VERSIONS)
+]
+
+admission_controller = AdmissionController(
+    expensive_paths=config.admission_expensive_paths,
+    limiter_factory=lambda: AdaptiveLimiter(
+        initial_limit=config.admission_initial_limit,
+        max_limit=config.admission_max_limit,
+        target_latency=config.admission_target_latency
+    ),
+    max_loop_lag=config.admission_max_loop_lag,
+    db_pool_usage=API_LATEST.pool_usage,
+    stream_paths=config.admission_stream_paths,
+    prefixes=API_PREFIXES
+)
+rate_limiter = RateLimiter(
+    rules=parse_rules(config.rate_limits),
+    key_header=config.rate_limit_key_header,
+    max_clients=config.rate_limit_max_clients,
+    prefixes=API_PREFIXES,
+    forwarded_header=config.rate_limit_forwarded_header
+)
+blocking_detector = BlockingDetector(
+    threshold=config.blocking_threshold,
+    project_root=os.path.dirname(__file__)
+)
+memory_diagnostics = MemoryDiagnostics(
+    output_dir=(os.path.join(config.logs_dir, 'memory')
+                if config.save_logs else None),
+    frames=config.memory_trace_frames,
+    interval=config.memory_snapshot_interval
+)
+
+
+def check_debug_token(
+        x_debug_token: Union[str, None] = Header(default=None)
+):
+    """Allows debug endpoints only with DEBUG_TOKEN or in dev mode"""
+    if config.debug_token:
+        if compare_digest(x_debug_token or '', config.debug_token):
+            return
+    elif config.dev:
+        return
+    raise HTTPException(status_code=403, detail='Invalid debug token')
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Starts and stops background tasks"""
+    if config.admission_control:
+        admission_controller.loop_monitor.start()
+    if config.blocking_detector:
+        blocking_detector.start()
+    if config.memory_diagnostics:
+        memory_diagnostics.start()
+    for version in API_VERSIONS:
+        await asyncio.get_running_loop().run_in_executor(
+            None, version.load_city_indexes
+        )
+        version.query_notifier.start()
+        if config.warm_start_dir:
+            version.weather_cache_snapshot.load()
+            version.weather_cache_snapshot.start()
+    yield
+    await admission_controller.loop_monitor.stop()
+    await blocking_detector.stop()
+    await memory_diagnostics.stop()
+    for version in API_VERSIONS:
+        await version.subscription_hub.stop()
+        await version.query_notifier.stop()
+        if config.warm_start_dir:
+            await version.weather_cache_snapshot.stop()
+
 
 app = FastAPI(
+    lifespan=lifespan,
     title=f'{config.api_name} API',
     description=DESCRIPTION,
     version='1.0.0',
@@ -32,11 +129,21 @@ app = FastAPI(
     swagger_ui_oauth2_redirect_url=f'{config.main_api_address}'
                                    f'/docs/oauth2-redirect'
 )
+static_files = PrecompressedStaticFiles(
+    directory=config.static_dir,
+    precompress=config.static_precompress
+)
 app.mount(
     path=f'{config.main_api_address}/{config.static_dir}',
-    app=StaticFiles(directory=config.static_dir),
+    app=static_files,
     name='static'
 )
+if config.admission_control:
+    app.add_middleware(AdmissionMiddleware, controller=admission_controller)
+if config.blocking_detector:
+    app.add_middleware(BlockingDetectorMiddleware)
+# Added last to run first, so limited clients don't take admission slots
+app.add_middleware(RateLimitMiddleware, rate_limiter=rate_limiter)
 
 
 @app.get('/', include_in_schema=False)
@@ -46,6 +153,43 @@ async def root(request: Request):
             f'Check {request.url}{config.main_api_address[1:]} for more info.'}
 
 
+@app.get(f'{config.main_api_address}/status/admission',
+         include_in_schema=False)
+async def admission_status():
+    """Concurrency limits, shed requests and overload signals"""
+    return admission_controller.stats()
+
+
+@app.get(f'{config.main_api_address}/status/rate-limit',
+         include_in_schema=False)
+async def rate_limit_status():
+    """Rate limit rules, tracked clients and limited requests"""
+    return rate_limiter.stats()
+
+
+if config.blocking_detector:
+    @app.get(f'{config.main_api_address}/debug/blocking',
+             include_in_schema=False,
+             dependencies=[Depends(check_debug_token)])
+    async def blocking_reports():
+        """Event loop blocks with routes, blocking lines and stacks"""
+        return blocking_detector.stats()
+
+if config.memory_diagnostics:
+    @app.get(f'{config.main_api_address}/debug/memory',
+             include_in_schema=False,
+             dependencies=[Depends(check_debug_token)])
+    def memory_report(reset_baseline: bool = False):
+        """
+        Memory growth since baseline by allocation site and object type.
+        Runs in a thread, as it walks every traced allocation and object.
+        """
+        report = memory_diagnostics.snapshot()
+        if reset_baseline:
+            memory_diagnostics.reset_baseline()
+        return report
+
+
 @app.get(f'{config.main_api_address}/docs', include_in_schema=False)
 async def custom_docs():
     """Redefined docs endpoint"""
@@ -53,9 +197,9 @@ async def custom_docs():
         openapi_url=app.openapi_url,  # noqa
         title=app.title + ' - Swagger Docs',  # noqa
         oauth2_redirect_url=app.swagger_ui_oauth2_redirect_url,  # noqa
-        swagger_js_url=config.swagger_js,
-        swagger_css_url=config.swagger_css,
-        swagger_favicon_url=config.favicon
+        swagger_js_url=static_files.url_path(config.swagger_js),
+        swagger_css_url=static_files.url_path(config.swagger_css),
+        swagger_favicon_url=static_files.url_path(config.favicon)
     )
 
 
@@ -71,8 +215,8 @@ async def custom_redoc():
     return get_redoc_html(
         openapi_url=app.openapi_url,  # noqa
         title=app.title + ' - ReDoc',  # noqa
-        redoc_js_url=config.redoc_js,
-        redoc_favicon_url=config.favicon
+        redoc_js_url=static_files.url_path(config.redoc_js),
+        redoc_favicon_url=static_files.url_path(config.favicon)
     )
 
 app.include_router(
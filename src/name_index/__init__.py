@@ -0,0 +1,7 @@
+"""
+This module contains an in-memory name index for city autocompletion.
+"""
+
+from .name_index import CityNameIndex, normalize_name
+
+__all__ = ['CityNameIndex', 'normalize_name']
@@ -0,0 +1,211 @@
+"""
+This module contains an in-memory name index for city autocompletion.
+Normalized names are kept sorted, so cities starting with a prefix are a
+range found by bisection. Misspelled input falls back to trigram matching.
+Suggestions are ranked by city popularity.
+"""
+
+import bisect
+import heapq
+import math
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Set, Tuple
+
+__all__ = ['CityNameIndex', 'normalize_name']
+
+# Prefix ranges longer than this are not ranked one by one, cities are
+# taken from the popularity order instead
+MAX_RANKED_RANGE = 500
+# Lowest trigram similarity of a suggestion for misspelled input
+MIN_SIMILARITY = 0.3
+
+CityName = Tuple[int, str, str]
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase name without accents and repeated spaces"""
+    decomposed = unicodedata.normalize('NFKD', name.casefold())
+    return ' '.join(''.join(
+        char for char in decomposed if not unicodedata.combining(char)
+    ).split())
+
+
+def _trigrams(name: str) -> Set[str]:
+    padded = f' {name} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CityNameIndex:
+    def __init__(self):
+        """Initializes an empty index"""
+        self._keys: List[str] = []
+        self._key_ids: List[int] = []
+        # City ID: name, country, normalized name and its trigram count
+        self._cities: Dict[int, Tuple[str, str, str, int]] = {}
+        self._trigram_ids: Dict[str, Set[int]] = {}
+        self._popularity: Counter = Counter()
+        # City IDs, the most popular first
+        self._by_popularity: List[int] = []
+        # City ID: its index in ``_by_popularity``
+        self._positions: Dict[int, int] = {}
+        # Popularity: index of the first city this popular
+        self._block_starts: Dict[int, int] = {}
+        self._loaded = False
+
+    def __repr__(self):
+        return f'CityNameIndex(size={len(self._cities)})'
+
+    def __len__(self):
+        return len(self._cities)
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def load(self, cities: Iterable[Tuple[int, str, str, int]]):
+        """
+        Adds ``(city_id, name, country, popularity)`` rows and marks index
+        as loaded
+        """
+        for city_id, name, country, popularity in cities:
+            if self._index_city(city_id, name, country):
+                self._keys.append(self._cities[city_id][2])
+                self._key_ids.append(city_id)
+            self._popularity[city_id] += popularity
+        # Sorted once, inserting each name would move half of the list
+        order = sorted(range(len(self._keys)), key=self._keys.__getitem__)
+        self._keys = [self._keys[i] for i in order]
+        self._key_ids = [self._key_ids[i] for i in order]
+        self._by_popularity.sort(key=self._popularity.__getitem__,
+                                 reverse=True)
+        self._positions = {
+            city_id: position
+            for position, city_id in enumerate(self._by_popularity)
+        }
+        self._block_starts = {}
+        for position, city_id in enumerate(self._by_popularity):
+            self._block_starts.setdefault(self._popularity[city_id], position)
+        self._loaded = True
+
+    def _index_city(self, city_id: int, name: str, country: str) -> bool:
+        """Adds city to all but the sorted names, False if it is there"""
+        key = normalize_name(name)
+        if city_id in self._cities or not key:
+            return False
+        trigrams = _trigrams(key)
+        self._cities[city_id] = (name, country, key, len(trigrams))
+        for trigram in trigrams:
+            self._trigram_ids.setdefault(trigram, set()).add(city_id)
+        self._by_popularity.append(city_id)
+        return True
+
+    def add(self, city_id: int, name: str, country: str):
+        """Adds a new city, with no requests yet"""
+        if self._index_city(city_id, name, country):
+            key = self._cities[city_id][2]
+            position = bisect.bisect_right(self._keys, key)
+            self._keys.insert(position, key)
+            self._key_ids.insert(position, city_id)
+            # The least popular, so it goes last
+            position = len(self._by_popularity) - 1
+            self._positions[city_id] = position
+            self._block_starts.setdefault(0, position)
+
+    def hit(self, city_id: int):
+        """
+        Counts a request for the city. It swaps places with the first city
+        as popular as it was, so the popularity order stays sorted.
+        """
+        position = self._positions.get(city_id)
+        if position is None:
+            return
+        popularity = self._popularity[city_id]
+        first = self._block_starts[popularity]
+        other = self._by_popularity[first]
+        self._by_popularity[first] = city_id
+        self._by_popularity[position] = other
+        self._positions[city_id] = first
+        self._positions[other] = position
+        self._popularity[city_id] = popularity + 1
+
+        if first + 1 < len(self._by_popularity) and self._popularity[
+                self._by_popularity[first + 1]
+        ] == popularity:
+            self._block_starts[popularity] = first + 1
+        else:
+            del self._block_starts[popularity]
+        self._block_starts.setdefault(popularity + 1, first)
+
+    def _ranked(self, city_ids: Iterable[int], limit: int) -> List[int]:
+        return heapq.nlargest(limit, city_ids,
+                              key=self._popularity.__getitem__)
+
+    def _prefix_matches(self, prefix: str, limit: int) -> List[int]:
+        first = bisect.bisect_left(self._keys, prefix)
+        last = bisect.bisect_left(self._keys, prefix + '\U0010ffff', first)
+        if last - first <= MAX_RANKED_RANGE:
+            return self._ranked(self._key_ids[first:last], limit)
+        matches = []
+        for city_id in self._by_popularity:
+            if self._cities[city_id][2].startswith(prefix):
+                matches.append(city_id)
+                if len(matches) == limit:
+                    break
+        return matches
+
+    def _similar(self, key: str, limit: int) -> List[int]:
+        postings = sorted(
+            (self._trigram_ids.get(trigram, set())
+             for trigram in _trigrams(key)),
+            key=len
+        )
+        # Similar enough cities share at least this many trigrams, two or
+        # more, so every one is in an intersection of two trigram sets.
+        # The smaller set of each pair is iterated, the rarest ones first.
+        needed = max(2, math.ceil(MIN_SIMILARITY * len(postings)))
+        candidates = set()
+        for i, posting in enumerate(postings[:len(postings) - needed + 1]):
+            for other in postings[i + 1:]:
+                candidates |= posting & other
+        shared = Counter()
+        for posting in postings:
+            shared.update(candidates & posting)
+
+        scored = []
+        for city_id, count in shared.items():
+            # Jaccard similarity of trigram sets
+            similarity = count / (
+                len(postings) + self._cities[city_id][3] - count
+            )
+            if similarity >= MIN_SIMILARITY:
+                scored.append(
+                    (similarity, self._popularity[city_id], city_id)
+                )
+        return [city_id for *_, city_id in heapq.nlargest(limit, scored)]
+
+    def suggest(self, text: str, limit: int = 10) -> List[CityName]:
+        """
+        Up to ``limit`` ``(city_id, name, country)`` of the most popular
+        cities starting with ``text``, then of the most similar ones.
+        Cities of the same normalized name and country are returned once.
+        """
+        key = normalize_name(text)
+        if not key:
+            return []
+        # Extra candidates make up for repeated names
+        city_ids = self._prefix_matches(key, limit * 2)
+        if len(city_ids) < limit:
+            city_ids += self._similar(key, limit * 2)
+
+        suggestions = []
+        seen = set()
+        for city_id in city_ids:
+            name, country, city_key, _trigram_count = self._cities[city_id]
+            if (city_key, country) in seen:
+                continue
+            seen.add((city_key, country))
+            suggestions.append((city_id, name, country))
+            if len(suggestions) == limit:
+                break
+        return suggestions
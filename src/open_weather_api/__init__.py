@@ -2,6 +2,54 @@
 This module contains the base implementation of the OpenWeatherMap API.
 """
 
-from .openweathermap_api import APIError, OpenWeatherAPI
+from .cache_snapshot import WeatherCacheSnapshot
+from .circuit_breaker import CircuitBreaker, LatencyTracker
+from .conditions import LANGUAGES, condition_id, describe
+from .key_pool import ApiKey, ApiKeyPool
+from .openweathermap_api import (
+    APIError,
+    COMPASS_POINTS,
+    CircuitOpenError,
+    City,
+    InvalidApiKeyError,
+    NoAvailableKeyError,
+    OPEN_WEATHER_API_KEYS,
+    OpenWeatherAPI,
+    UpstreamUnavailableError,
+    WeatherInfo,
+    compass_point,
+    compass_points
+)
+from .units import (
+    UNITS,
+    convert_speed,
+    convert_temperature,
+    convert_visibility
+)
 
-__all__ = ['APIError', 'OpenWeatherAPI']
+__all__ = [
+    'APIError',
+    'ApiKey',
+    'ApiKeyPool',
+    'COMPASS_POINTS',
+    'CircuitBreaker',
+    'CircuitOpenError',
+    'City',
+    'InvalidApiKeyError',
+    'LANGUAGES',
+    'LatencyTracker',
+    'NoAvailableKeyError',
+    'OPEN_WEATHER_API_KEYS',
+    'OpenWeatherAPI',
+    'UNITS',
+    'UpstreamUnavailableError',
+    'WeatherCacheSnapshot',
+    'WeatherInfo',
+    'compass_point',
+    'compass_points',
+    'condition_id',
+    'convert_speed',
+    'convert_temperature',
+    'convert_visibility',
+    'describe'
+]
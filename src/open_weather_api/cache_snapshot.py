@@ -0,0 +1,181 @@
+"""
+This module contains snapshots of the weather cache, so a restarted worker
+starts with the weather its predecessor already got. Snapshots are binary:
+a header, then one fixed-size record per entry followed by its strings.
+"""
+
+import asyncio
+import logging
+import mmap
+import os
+import struct
+import time
+from typing import Union
+
+from .openweathermap_api import (
+    COMPASS_POINTS,
+    OpenWeatherAPI,
+    WeatherInfo,
+    compass_point
+)
+
+__all__ = ['WeatherCacheSnapshot']
+
+logger = logging.getLogger('uvicorn.error')
+
+MAGIC = b'OWMC'
+VERSION = 1
+# Magic, version, number of entries, wall-clock time of writing
+HEADER = struct.Struct('<4sHId')
+# Latitude, longitude, wall-clock expiry time, weather ID, temperature,
+# pressure, humidity, visibility, wind speed, wind degree, cloudiness,
+# sunrise, sunset, observation time and byte lengths of weather name,
+# description and icon
+RECORD = struct.Struct('<3di5did3q3H')
+
+
+class WeatherCacheSnapshot:
+    def __init__(
+            self,
+            api: OpenWeatherAPI,
+            path: str,
+            interval: float = 60
+    ):
+        """
+        Snapshot of ``api`` weather cache at ``path``, written every
+        ``interval`` seconds after ``start`` (0 disables it) and at
+        ``stop``. Cache TTLs are saved as wall-clock expiry times, so time
+        spent stopped is taken off when the snapshot is loaded.
+        """
+        self._api = api
+        self._path = path
+        self._interval = interval
+        self._task: Union[asyncio.Task, None] = None
+        self._stats = {'loaded': 0, 'saved': 0, 'saved_at': None}
+
+    def __repr__(self):
+        return (f'WeatherCacheSnapshot(path={self._path}, '
+                f'interval={self._interval})')
+
+    def save(self) -> int:
+        """Writes unexpired entries atomically, returns their number"""
+        now = time.time()
+        chunks = []
+        count = 0
+        for lat, lon, ttl, weather in self._api.cached_weather():
+            strings = [
+                value.encode('utf-8')
+                for value in (weather.weather_name,
+                              weather.weather_description,
+                              weather.weather_icon)
+            ]
+            chunks.append(RECORD.pack(
+                lat, lon, now + ttl, weather.weather_id, weather.temp,
+                weather.pressure, weather.humidity, weather.visibility,
+                weather.wind_speed, weather.wind_degree, weather.cloudiness,
+                weather.sunrise, weather.sunset, weather.observed_at,
+                *map(len, strings)
+            ))
+            chunks.extend(strings)
+            count += 1
+
+        os.makedirs(os.path.dirname(self._path) or '.', exist_ok=True)
+        with open(f'{self._path}.tmp', 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, count, now))
+            file.write(b''.join(chunks))
+        os.replace(f'{self._path}.tmp', self._path)
+        self._stats['saved'] = count
+        self._stats['saved_at'] = now
+        return count
+
+    def load(self) -> int:
+        """
+        Restores unexpired entries to the cache, returns their number.
+        A missing or unreadable snapshot leaves the cache empty.
+        """
+        try:
+            with open(self._path, 'rb') as file, mmap.mmap(
+                    file.fileno(), 0, access=mmap.ACCESS_READ
+            ) as data:
+                loaded = self._restore(data)
+        except (OSError, ValueError, struct.error) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning(f'Weather cache snapshot is not loaded: {e}')
+            return 0
+        self._stats['loaded'] = loaded
+        return loaded
+
+    def _restore(self, data: mmap.mmap) -> int:
+        magic, version, count, _saved_at = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('unknown snapshot format')
+        now = time.time()
+        offset = HEADER.size
+        loaded = 0
+        for _ in range(count):
+            (lat, lon, expires, weather_id, temp, pressure, humidity,
+             visibility, wind_speed, wind_degree, cloudiness, sunrise,
+             sunset, observed_at,
+             *lengths) = RECORD.unpack_from(data, offset)
+            offset += RECORD.size
+            strings = []
+            for length in lengths:
+                strings.append(data[offset:offset + length].decode('utf-8'))
+                offset += length
+            if expires <= now:
+                continue
+            direction, code = COMPASS_POINTS[compass_point(wind_degree)]
+            self._api.restore_weather(lat, lon, expires - now, WeatherInfo(
+                weather_id=weather_id,
+                weather_name=strings[0],
+                weather_description=strings[1],
+                weather_icon=strings[2],
+                temp=temp,
+                pressure=pressure,
+                humidity=humidity,
+                visibility=visibility,
+                wind_speed=wind_speed,
+                wind_degree=wind_degree,
+                wind_direction=direction,
+                wind_code=code,
+                cloudiness=cloudiness,
+                sunrise=sunrise,
+                sunset=sunset,
+                observed_at=observed_at
+            ))
+            loaded += 1
+        return loaded
+
+    def start(self):
+        """Schedules periodic snapshots"""
+        if self._interval > 0:
+            self._task = asyncio.get_running_loop().create_task(
+                self._save_periodically()
+            )
+
+    async def stop(self):
+        """Cancels periodic snapshots and writes the last one"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._save_logged()
+
+    async def _save_periodically(self):
+        while True:
+            await asyncio.sleep(self._interval)
+            await self._save_logged()
+
+    async def _save_logged(self):
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.save
+            )
+        except OSError as e:
+            logger.error(f'Weather cache snapshot is not saved: {e}')
+
+    def stats(self) -> dict:
+        return {'path': self._path, **self._stats}
@@ -0,0 +1,148 @@
+"""
+This module contains a circuit breaker and a latency tracker for calls to
+the OpenWeatherMap API.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Union
+
+__all__ = ['CircuitBreaker', 'LatencyTracker']
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+logger = logging.getLogger('uvicorn.error')
+
+
+class CircuitBreaker:
+    def __init__(
+            self,
+            error_rate: float = 0.5,
+            window: int = 20,
+            min_calls: int = 10,
+            cooldown: float = 30
+    ):
+        """
+        Opens after ``error_rate`` or more of the last ``window`` calls
+        (but at least ``min_calls``) failed. After ``cooldown`` seconds one
+        trial call is let through: it closes the breaker on success or
+        opens it again on failure.
+        """
+        self._error_rate = error_rate
+        self._min_calls = min_calls
+        self._cooldown = cooldown
+        self._results = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._times_opened = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'CircuitBreaker(state={self._state})'
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if (self._state == OPEN
+                    and time.monotonic() - self._opened_at >= self._cooldown):
+                return HALF_OPEN
+            return self._state
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until the next trial call is allowed"""
+        if self._state != OPEN:
+            return 0
+        return max(self._cooldown - (time.monotonic() - self._opened_at), 0)
+
+    def allow(self) -> bool:
+        """Checks if a call may be made now"""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if (self._state == OPEN
+                    and time.monotonic() - self._opened_at >= self._cooldown):
+                self._state = HALF_OPEN
+                self._trial_running = False
+                logger.warning('Circuit breaker is half-open')
+            if self._state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._state = CLOSED
+                self._results.clear()
+                logger.warning('Circuit breaker is closed')
+            self._results.append(True)
+
+    def record_ignored(self):
+        """Frees the trial call slot, if a call wasn't made after all"""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._open()
+                return
+            self._results.append(False)
+            failures = self._results.count(False)
+            if (self._state == CLOSED
+                    and len(self._results) >= self._min_calls
+                    and failures / len(self._results) >= self._error_rate):
+                self._open()
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._trial_running = False
+        self._times_opened += 1
+        logger.warning(
+            f'Circuit breaker is open for {self._cooldown} seconds'
+        )
+
+    def stats(self) -> Dict[str, Union[str, int, float]]:
+        with self._lock:
+            results = list(self._results)
+        return {
+            'state': self.state,
+            'retry_after': round(self.retry_after, 3),
+            'window_calls': len(results),
+            'window_failures': results.count(False),
+            'times_opened': self._times_opened,
+            'rejected_calls': self._rejected
+        }
+
+
+class LatencyTracker:
+    def __init__(self, size: int = 200):
+        """Keeps durations of the last ``size`` calls"""
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._samples)
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, percent: float) -> Union[float, None]:
+        """Returns ``percent`` percentile of durations or None if empty"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(int(len(samples) * percent / 100), len(samples) - 1)
+        return samples[index]
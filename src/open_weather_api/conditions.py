@@ -0,0 +1,206 @@
+"""
+This module contains localized descriptions of OpenWeatherMap weather
+conditions, keyed by condition ID, so one observation fetched in English
+can be served in every supported language.
+"""
+
+from typing import Union
+
+__all__ = [
+    'CONDITIONS',
+    'LANGUAGES',
+    'condition_id',
+    'describe'
+]
+
+LANGUAGES = ('en', 'ru', 'de', 'fr', 'es')
+
+# Condition ID: descriptions in ``LANGUAGES`` order
+CONDITIONS = {
+    200: ('thunderstorm with light rain', 'гроза с небольшим дождём',
+          'Gewitter mit leichtem Regen', 'orage et pluie fine',
+          'tormenta con lluvia ligera'),
+    201: ('thunderstorm with rain', 'гроза с дождём',
+          'Gewitter mit Regen', 'orage et pluie',
+          'tormenta con lluvia'),
+    202: ('thunderstorm with heavy rain', 'гроза с сильным дождём',
+          'Gewitter mit starkem Regen', 'orage et fortes pluies',
+          'tormenta con lluvia intensa'),
+    210: ('light thunderstorm', 'слабая гроза',
+          'leichtes Gewitter', 'orage léger',
+          'tormenta ligera'),
+    211: ('thunderstorm', 'гроза',
+          'Gewitter', 'orage',
+          'tormenta'),
+    212: ('heavy thunderstorm', 'сильная гроза',
+          'schweres Gewitter', 'fort orage',
+          'tormenta fuerte'),
+    221: ('ragged thunderstorm', 'прерывистая гроза',
+          'vereinzelte Gewitter', 'orages épars',
+          'tormenta irregular'),
+    230: ('thunderstorm with light drizzle', 'гроза с мелкой моросью',
+          'Gewitter mit leichtem Nieselregen', 'orage et bruine fine',
+          'tormenta con llovizna ligera'),
+    231: ('thunderstorm with drizzle', 'гроза с моросью',
+          'Gewitter mit Nieselregen', 'orage et bruine',
+          'tormenta con llovizna'),
+    232: ('thunderstorm with heavy drizzle', 'гроза с сильной моросью',
+          'Gewitter mit starkem Nieselregen', 'orage et forte bruine',
+          'tormenta con llovizna intensa'),
+    300: ('light intensity drizzle', 'слабая морось',
+          'leichter Nieselregen', 'bruine légère',
+          'llovizna ligera'),
+    301: ('drizzle', 'морось',
+          'Nieselregen', 'bruine',
+          'llovizna'),
+    302: ('heavy intensity drizzle', 'сильная морось',
+          'starker Nieselregen', 'forte bruine',
+          'llovizna intensa'),
+    310: ('light intensity drizzle rain', 'слабый моросящий дождь',
+          'leichter Nieselregen mit Regen', 'pluie fine et bruine',
+          'lluvia y llovizna ligera'),
+    311: ('drizzle rain', 'моросящий дождь',
+          'Nieselregen mit Regen', 'pluie et bruine',
+          'lluvia y llovizna'),
+    312: ('heavy intensity drizzle rain', 'сильный моросящий дождь',
+          'starker Nieselregen mit Regen', 'forte pluie et bruine',
+          'lluvia y llovizna intensa'),
+    313: ('shower rain and drizzle', 'ливень и морось',
+          'Regenschauer und Nieselregen', 'averses et bruine',
+          'chubascos y llovizna'),
+    314: ('heavy shower rain and drizzle', 'сильный ливень и морось',
+          'starke Regenschauer und Nieselregen', 'fortes averses et bruine',
+          'chubascos intensos y llovizna'),
+    321: ('shower drizzle', 'ливневая морось',
+          'Nieselschauer', 'averses de bruine',
+          'chubascos de llovizna'),
+    500: ('light rain', 'небольшой дождь',
+          'leichter Regen', 'légère pluie',
+          'lluvia ligera'),
+    501: ('moderate rain', 'умеренный дождь',
+          'mäßiger Regen', 'pluie modérée',
+          'lluvia moderada'),
+    502: ('heavy intensity rain', 'сильный дождь',
+          'starker Regen', 'forte pluie',
+          'lluvia intensa'),
+    503: ('very heavy rain', 'очень сильный дождь',
+          'sehr starker Regen', 'très forte pluie',
+          'lluvia muy intensa'),
+    504: ('extreme rain', 'проливной дождь',
+          'extremer Regen', 'pluie extrême',
+          'lluvia extrema'),
+    511: ('freezing rain', 'ледяной дождь',
+          'gefrierender Regen', 'pluie verglaçante',
+          'lluvia helada'),
+    520: ('light intensity shower rain', 'небольшой ливень',
+          'leichte Regenschauer', 'averses légères',
+          'chubascos ligeros'),
+    521: ('shower rain', 'ливень',
+          'Regenschauer', 'averses',
+          'chubascos'),
+    522: ('heavy intensity shower rain', 'сильный ливень',
+          'starke Regenschauer', 'fortes averses',
+          'chubascos intensos'),
+    531: ('ragged shower rain', 'прерывистый ливень',
+          'vereinzelte Regenschauer', 'averses éparses',
+          'chubascos irregulares'),
+    600: ('light snow', 'небольшой снег',
+          'leichter Schneefall', 'légère neige',
+          'nevada ligera'),
+    601: ('snow', 'снег',
+          'Schnee', 'neige',
+          'nieve'),
+    602: ('heavy snow', 'сильный снег',
+          'starker Schneefall', 'forte neige',
+          'nevada intensa'),
+    611: ('sleet', 'мокрый снег',
+          'Schneeregen', 'neige fondue',
+          'aguanieve'),
+    612: ('light shower sleet', 'небольшой мокрый снег',
+          'leichte Schneeregenschauer', 'légères averses de neige fondue',
+          'chubascos ligeros de aguanieve'),
+    613: ('shower sleet', 'ливневый мокрый снег',
+          'Schneeregenschauer', 'averses de neige fondue',
+          'chubascos de aguanieve'),
+    615: ('light rain and snow', 'небольшой дождь со снегом',
+          'leichter Regen und Schnee', 'pluie et neige légères',
+          'lluvia y nieve ligeras'),
+    616: ('rain and snow', 'дождь со снегом',
+          'Regen und Schnee', 'pluie et neige',
+          'lluvia y nieve'),
+    620: ('light shower snow', 'небольшой снегопад',
+          'leichte Schneeschauer', 'légères averses de neige',
+          'chubascos ligeros de nieve'),
+    621: ('shower snow', 'снегопад',
+          'Schneeschauer', 'averses de neige',
+          'chubascos de nieve'),
+    622: ('heavy shower snow', 'сильный снегопад',
+          'starke Schneeschauer', 'fortes averses de neige',
+          'chubascos intensos de nieve'),
+    701: ('mist', 'дымка',
+          'Dunst', 'brume',
+          'niebla ligera'),
+    711: ('smoke', 'дым',
+          'Rauch', 'fumée',
+          'humo'),
+    721: ('haze', 'мгла',
+          'Trübung', 'brume sèche',
+          'calima'),
+    731: ('sand/dust whirls', 'песчаные и пыльные вихри',
+          'Sand- und Staubwirbel', 'tourbillons de sable et de poussière',
+          'remolinos de arena y polvo'),
+    741: ('fog', 'туман',
+          'Nebel', 'brouillard',
+          'niebla'),
+    751: ('sand', 'песок',
+          'Sand', 'sable',
+          'arena'),
+    761: ('dust', 'пыль',
+          'Staub', 'poussière',
+          'polvo'),
+    762: ('volcanic ash', 'вулканический пепел',
+          'Vulkanasche', 'cendres volcaniques',
+          'ceniza volcánica'),
+    771: ('squalls', 'шквалы',
+          'Sturmböen', 'bourrasques',
+          'turbonadas'),
+    781: ('tornado', 'торнадо',
+          'Tornado', 'tornade',
+          'tornado'),
+    800: ('clear sky', 'ясно',
+          'klarer Himmel', 'ciel dégagé',
+          'cielo claro'),
+    801: ('few clouds', 'небольшая облачность',
+          'ein paar Wolken', 'peu nuageux',
+          'algunas nubes'),
+    802: ('scattered clouds', 'переменная облачность',
+          'Mäßig bewölkt', 'partiellement nuageux',
+          'nubes dispersas'),
+    803: ('broken clouds', 'облачно с прояснениями',
+          'Überwiegend bewölkt', 'nuageux',
+          'muy nuboso'),
+    804: ('overcast clouds', 'пасмурно',
+          'Bedeckt', 'couvert',
+          'nubes'),
+}
+
+_IDS_BY_DESCRIPTION = {
+    descriptions[0]: weather_id
+    for weather_id, descriptions in CONDITIONS.items()
+}
+
+
+def condition_id(description: str) -> Union[int, None]:
+    """Condition ID by its English description"""
+    return _IDS_BY_DESCRIPTION.get(description)
+
+
+def describe(weather_id: Union[int, None], lang: str, fallback: str) -> str:
+    """
+    Description of condition ``weather_id`` in ``lang`` or ``fallback``
+    if condition or language is unknown.
+    """
+    descriptions = CONDITIONS.get(weather_id)
+    if not descriptions or lang not in LANGUAGES:
+        return fallback
+    return descriptions[LANGUAGES.index(lang)]
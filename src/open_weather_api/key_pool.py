@@ -0,0 +1,173 @@
+"""
+This module contains a pool of OpenWeatherMap API keys with per-key rate
+budgets and health state.
+"""
+
+import logging
+import threading
+import time
+from typing import List, Union
+
+__all__ = ['ApiKey', 'ApiKeyPool']
+
+logger = logging.getLogger('uvicorn.error')
+
+
+class ApiKey:
+    __slots__ = (
+        'key', 'label', 'tokens', 'updated_at', 'in_flight', 'disabled_until',
+        'disabled_by', 'calls', 'unauthorized', 'rate_limited', 'errors'
+    )
+
+    def __init__(self, key: str, tokens: float, label: str = 'key'):
+        """``label`` names the key in logs and stats instead of the key"""
+        self.key = key
+        self.label = label
+        self.tokens = tokens
+        self.updated_at = time.monotonic()
+        self.in_flight = 0
+        self.disabled_until = 0.0
+        # Status code of the response the key was disabled after
+        self.disabled_by = None
+        self.calls = 0
+        self.unauthorized = 0
+        self.rate_limited = 0
+        self.errors = 0
+
+    def __repr__(self):
+        return f'ApiKey(label={self.label})'
+
+
+class ApiKeyPool:
+    def __init__(
+            self,
+            keys: List[str],
+            rate_per_minute: float = 60,
+            unauthorized_cooldown: float = 3600,
+            rate_limit_cooldown: float = 60
+    ):
+        """
+        Each key gets a token bucket refilled with ``rate_per_minute``
+        tokens per minute. A key is taken out of rotation for
+        ``unauthorized_cooldown`` seconds after a 401 response and for
+        ``rate_limit_cooldown`` seconds after a 429 response.
+        """
+        if not keys:
+            raise ValueError('No OpenWeatherMap API keys')
+        self._rate = rate_per_minute / 60
+        self._capacity = float(rate_per_minute)
+        self._unauthorized_cooldown = unauthorized_cooldown
+        self._rate_limit_cooldown = rate_limit_cooldown
+        self._keys = [
+            ApiKey(key, self._capacity, f'key#{number}')
+            for number, key in enumerate(dict.fromkeys(keys), 1)
+        ]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __repr__(self):
+        return f'ApiKeyPool(keys={len(self._keys)})'
+
+    def _refill(self, api_key: ApiKey, now: float):
+        api_key.tokens = min(
+            api_key.tokens + (now - api_key.updated_at) * self._rate,
+            self._capacity
+        )
+        api_key.updated_at = now
+
+    def acquire(self) -> Union[ApiKey, None]:
+        """
+        Takes a token from the least loaded healthy key: fewest calls in
+        flight, then most tokens left. Returns None if every key is
+        disabled or out of budget.
+        """
+        now = time.monotonic()
+        with self._lock:
+            best = None
+            for api_key in self._keys:
+                if api_key.disabled_until > now:
+                    continue
+                self._refill(api_key, now)
+                if api_key.tokens < 1:
+                    continue
+                if best is None or (api_key.in_flight, -api_key.tokens) < (
+                        best.in_flight, -best.tokens
+                ):
+                    best = api_key
+            if best is None:
+                return None
+            best.tokens -= 1
+            best.in_flight += 1
+            best.calls += 1
+            return best
+
+    def charge(self, api_key: ApiKey):
+        """Counts one more call (e.g. hedged) made with an acquired key"""
+        with self._lock:
+            api_key.tokens -= 1
+            api_key.calls += 1
+
+    def release(self, api_key: ApiKey, status_code: Union[int, None] = None):
+        """
+        Returns a key after a call finished with ``status_code``
+        (None if there was no response).
+        """
+        with self._lock:
+            api_key.in_flight -= 1
+            if status_code == 401:
+                api_key.unauthorized += 1
+                api_key.disabled_until = (
+                    time.monotonic() + self._unauthorized_cooldown
+                )
+                api_key.disabled_by = status_code
+                logger.warning(
+                    f'OpenWeatherMap API key {api_key.label} is '
+                    f'unauthorized, disabled for '
+                    f'{self._unauthorized_cooldown} seconds'
+                )
+            elif status_code == 429:
+                api_key.rate_limited += 1
+                api_key.disabled_until = (
+                    time.monotonic() + self._rate_limit_cooldown
+                )
+                api_key.disabled_by = status_code
+                logger.warning(
+                    f'OpenWeatherMap API key {api_key.label} is '
+                    f'rate limited, disabled for '
+                    f'{self._rate_limit_cooldown} seconds'
+                )
+            elif status_code is None or status_code >= 500:
+                api_key.errors += 1
+
+    def all_unauthorized(self) -> bool:
+        """Whether every key is disabled after a 401 response"""
+        now = time.monotonic()
+        with self._lock:
+            return all(
+                api_key.disabled_until > now and api_key.disabled_by == 401
+                for api_key in self._keys
+            )
+
+    def stats(self) -> List[dict]:
+        now = time.monotonic()
+        with self._lock:
+            for api_key in self._keys:
+                self._refill(api_key, now)
+            return [
+                {
+                    'key': api_key.label,
+                    'healthy': api_key.disabled_until <= now,
+                    'disabled_for': round(
+                        max(api_key.disabled_until - now, 0), 3
+                    ),
+                    'tokens': round(api_key.tokens, 3),
+                    'in_flight': api_key.in_flight,
+                    'calls': api_key.calls,
+                    'unauthorized': api_key.unauthorized,
+                    'rate_limited': api_key.rate_limited,
+                    'errors': api_key.errors
+                }
+                for api_key in self._keys
+            ]
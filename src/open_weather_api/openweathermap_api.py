@@ -3,7 +3,9 @@ This module contains the base implementation of the OpenWeatherMap API.
 """
 
 import os
-from typing import Tuple, Union
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Sequence, Tuple, Union
 
 from dotenv import load_dotenv
 
@@ -11,30 +13,93 @@ from pydantic import BaseModel
 
 import requests
 
+try:
+    import numpy
+except ImportError:
+    # NumPy is optional, compass points are then mapped one by one
+    numpy = None
+
+from .circuit_breaker import CircuitBreaker, LatencyTracker
+from .key_pool import ApiKey, ApiKeyPool
+
 load_dotenv('.env.api')
-OPEN_WEATHER_API_KEY = os.getenv('OPEN_WEATHER_API_KEY')
+OPEN_WEATHER_API_KEYS = [
+    key.strip()
+    for key in os.getenv(
+        'OPEN_WEATHER_API_KEYS', os.getenv('OPEN_WEATHER_API_KEY', '')
+    ).split(',')
+    if key.strip()
+]
 
-if not OPEN_WEATHER_API_KEY:
+if not OPEN_WEATHER_API_KEYS:
     raise ValueError('OPEN_WEATHER_API_KEY is not set')
 
 OPEN_WEATHER_GEO_URL = 'https://api.openweathermap.org/geo/1.0/direct'
+OPEN_WEATHER_REVERSE_GEO_URL = (
+    'https://api.openweathermap.org/geo/1.0/reverse'
+)
 OPEN_WEATHER_DATA_URL = 'https://api.openweathermap.org/data/2.5/weather'
 
+# API key ('appid') is added to every call by ``ApiKeyPool``
 OPEN_WEATHER_GEO_PARAMS = {
-    'appid': OPEN_WEATHER_API_KEY,
     'limit': 1
 }
 
 OPEN_WEATHER_DATA_PARAMS = {
-    'appid': OPEN_WEATHER_API_KEY,
     'units': 'metric',
     'lang': 'en'
 }
 
+# Directions and codes of 8 compass points clockwise from north, 45 degrees
+# apart, so index of a point is its sector number
+COMPASS_POINTS = (
+    ('North', 'N'),
+    ('Northeast', 'NE'),
+    ('East', 'E'),
+    ('Southeast', 'SE'),
+    ('South', 'S'),
+    ('Southwest', 'SW'),
+    ('West', 'W'),
+    ('Northwest', 'NW')
+)
+
+MAX_WEATHER_CACHE_SIZE = 10000
+# Hedged requests need some latency history to pick a delay
+MIN_HEDGE_SAMPLES = 20
+
+
+def compass_point(degrees: Union[int, float]) -> int:
+    """Index in ``COMPASS_POINTS`` of the direction of ``degrees``"""
+    return int((degrees % 360 + 22.5) // 45) % 8
+
+
+def compass_points(degrees: Sequence[Union[int, float]]) -> List[int]:
+    """``compass_point`` of every value, computed over the whole array"""
+    if numpy is None:
+        return [compass_point(value) for value in degrees]
+    sectors = numpy.asarray(degrees, dtype=numpy.float64) % 360 + 22.5
+    return ((sectors // 45).astype(numpy.int64) % 8).tolist()
+
 
 APIError = ValueError
 
 
+class UpstreamUnavailableError(APIError):
+    """OpenWeatherMap API can't be reached or keeps failing"""
+
+
+class CircuitOpenError(UpstreamUnavailableError):
+    """Calls are not made while the circuit breaker is open"""
+
+
+class NoAvailableKeyError(UpstreamUnavailableError):
+    """Every API key is disabled or out of its rate budget"""
+
+
+class InvalidApiKeyError(APIError):
+    """Every API key is rejected as unauthorized, a configuration error"""
+
+
 class City(BaseModel):
     name: str
     country: str
@@ -43,6 +108,7 @@ class City(BaseModel):
 
 
 class WeatherInfo(BaseModel):
+    weather_id: int = 0
     weather_name: str
     weather_description: str
     weather_icon: str
@@ -57,19 +123,233 @@ class WeatherInfo(BaseModel):
     cloudiness: float
     sunrise: int
     sunset: int
+    # Upstream observation time ('dt'), the same for ~10 minutes
+    observed_at: int = 0
 
 
 class OpenWeatherAPI:
-    def __init__(self):
+    def __init__(
+            self,
+            cache_ttl: int = 0,
+            timeout: Tuple[float, float] = (3.05, 10),
+            circuit_breaker: Union[CircuitBreaker, None] = None,
+            hedge_percentile: float = 0,
+            hedge_workers: int = 4,
+            key_pool: Union[ApiKeyPool, None] = None
+    ):
+        """
+        ``cache_ttl`` is the number of seconds weather data for the same
+        coordinates is reused without calling the API again, 0 disables it.
+        ``timeout`` is a (connect, read) timeout in seconds for every call.
+        If ``hedge_percentile`` is set, a second identical call is made when
+        the first one takes longer than that percentile of recent calls.
+        ``key_pool`` defaults to all keys from ``OPEN_WEATHER_API_KEYS``.
+        """
         self._geo_url = OPEN_WEATHER_GEO_URL
+        self._reverse_geo_url = OPEN_WEATHER_REVERSE_GEO_URL
         self._data_url = OPEN_WEATHER_DATA_URL
         self._geo_params = OPEN_WEATHER_GEO_PARAMS
         self._data_params = OPEN_WEATHER_DATA_PARAMS
+        self._cache_ttl = cache_ttl
+        self._weather_cache: Dict[Tuple[float, float],
+                                  Tuple[float, WeatherInfo]] = {}
+        self._timeout = timeout
+        self._breaker = circuit_breaker or CircuitBreaker()
+        self._latency = LatencyTracker()
+        self._hedge_percentile = hedge_percentile
+        self._hedge_executor = (
+            ThreadPoolExecutor(hedge_workers, thread_name_prefix='owm-hedge')
+            if hedge_percentile else None
+        )
+        self._key_pool = key_pool or ApiKeyPool(OPEN_WEATHER_API_KEYS)
+        self._counters = {
+            'calls': 0,
+            'failures': 0,
+            'timeouts': 0,
+            'hedged': 0,
+            'hedge_wins': 0
+        }
+
+    @property
+    def cache_ttl(self):
+        return self._cache_ttl
+
+    def weather_cache_ttl(self, lat, lon) -> float:
+        """Seconds left before cached weather data for coordinates expires"""
+        cached = self._weather_cache.get((lat, lon))
+        if not cached:
+            return 0
+        return max(cached[0] - time.monotonic(), 0)
+
+    def _get_cached_weather(self, lat, lon) -> Union[WeatherInfo, None]:
+        cached = self._weather_cache.get((lat, lon))
+        if not cached:
+            return None
+        if cached[0] <= time.monotonic():
+            del self._weather_cache[(lat, lon)]
+            return None
+        return cached[1]
+
+    def _cache_weather(self, lat, lon, weather_info: WeatherInfo):
+        if not self._cache_ttl:
+            return
+        now = time.monotonic()
+        if len(self._weather_cache) >= MAX_WEATHER_CACHE_SIZE:
+            self._weather_cache = {
+                key: value for key, value in self._weather_cache.items()
+                if value[0] > now
+            }
+        self._weather_cache[(lat, lon)] = (now + self._cache_ttl,
+                                           weather_info)
+
+    def cached_weather(self) -> List[Tuple[float, float, float, WeatherInfo]]:
+        """``(lat, lon, seconds_left, weather_info)`` of cached weather"""
+        now = time.monotonic()
+        return [
+            (lat, lon, expires - now, weather_info)
+            for (lat, lon), (expires, weather_info)
+            in list(self._weather_cache.items())
+            if expires > now
+        ]
+
+    def restore_weather(self, lat, lon, ttl: float, weather_info: WeatherInfo):
+        """Caches ``weather_info`` for ``ttl`` seconds (from a snapshot)"""
+        if (ttl <= 0 or not self._cache_ttl
+                or len(self._weather_cache) >= MAX_WEATHER_CACHE_SIZE):
+            return
+        self._weather_cache[(lat, lon)] = (
+            time.monotonic() + min(ttl, self._cache_ttl), weather_info
+        )
+
+    @property
+    def circuit_breaker(self):
+        return self._breaker
+
+    def stats(self) -> dict:
+        """Counters, latency and circuit breaker state for monitoring"""
+        latency = {
+            f'p{percent}': self._latency.percentile(percent)
+            for percent in (50, 95, 99)
+        }
+        return {
+            **self._counters,
+            'latency': latency,
+            'hedge_delay': self._hedge_delay(),
+            'circuit_breaker': self._breaker.stats(),
+            'api_keys': self._key_pool.stats()
+        }
+
+    def _timed_get(self, url, params) -> requests.Response:
+        start = time.monotonic()
+        response = requests.get(url, params=params, timeout=self._timeout)
+        self._latency.add(time.monotonic() - start)
+        return response
+
+    def _hedge_delay(self) -> Union[float, None]:
+        if (not self._hedge_percentile
+                or len(self._latency) < MIN_HEDGE_SAMPLES):
+            return None
+        return self._latency.percentile(self._hedge_percentile)
+
+    def _hedged_get(self, url, params, api_key: ApiKey) -> requests.Response:
+        """
+        Makes a call and, if it's slower than usual, a second identical one
+        with the same ``api_key``. Returns whichever succeeds first.
+        """
+        delay = self._hedge_delay()
+        if delay is None:
+            return self._timed_get(url, params)
+
+        first = self._hedge_executor.submit(self._timed_get, url, params)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+
+        self._counters['hedged'] += 1
+        self._key_pool.charge(api_key)
+        second = self._hedge_executor.submit(self._timed_get, url, params)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except requests.RequestException as e:
+                    error = e
+                    continue
+                if future is second:
+                    self._counters['hedge_wins'] += 1
+                return response
+        raise error
+
+    def _request_with_keys(self, url, params) -> requests.Response:
+        """
+        Calls the API with the least loaded healthy key, moving on to the
+        next one if a key is rejected (401) or rate limited (429).
+        """
+        while True:
+            api_key = self._key_pool.acquire()
+            if not api_key:
+                if self._key_pool.all_unauthorized():
+                    raise InvalidApiKeyError(
+                        'Invalid OpenWeatherMap API key'
+                    )
+                raise NoAvailableKeyError(
+                    'No OpenWeatherMap API key is available'
+                )
+            self._counters['calls'] += 1
+            status_code = None
+            try:
+                response = self._hedged_get(
+                    url, {**params, 'appid': api_key.key}, api_key
+                )
+                status_code = response.status_code
+            finally:
+                self._key_pool.release(api_key, status_code)
+            if status_code not in (401, 429):
+                return response
+
+    def _request(self, url, params) -> requests.Response:
+        """
+        Calls the API through the circuit breaker.
+        Raises ``UpstreamUnavailableError`` on network errors, timeouts
+        and server errors, or ``CircuitOpenError`` without calling it.
+        Raises ``InvalidApiKeyError`` if every key is unauthorized.
+        """
+        if not self._breaker.allow():
+            raise CircuitOpenError('OpenWeatherMap API is unavailable')
+        try:
+            response = self._request_with_keys(url, params)
+        except (NoAvailableKeyError, InvalidApiKeyError):
+            self._breaker.record_ignored()
+            raise
+        except requests.Timeout as e:
+            self._counters['timeouts'] += 1
+            self._counters['failures'] += 1
+            self._breaker.record_failure()
+            raise UpstreamUnavailableError(
+                'OpenWeatherMap API timed out'
+            ) from e
+        except requests.RequestException as e:
+            self._counters['failures'] += 1
+            self._breaker.record_failure()
+            raise UpstreamUnavailableError(
+                'OpenWeatherMap API is unreachable'
+            ) from e
+        if response.status_code >= 500:
+            self._counters['failures'] += 1
+            self._breaker.record_failure()
+            raise UpstreamUnavailableError(
+                f'OpenWeatherMap API error {response.status_code}'
+            )
+        self._breaker.record_success()
+        return response
 
     def get_geo_data(self, city) -> City:
         params = self._geo_params.copy()
         params['q'] = city
-        response = requests.get(self._geo_url, params=params)
+        response = self._request(self._geo_url, params)
         if not response.json():
             raise APIError('No such city')
         if (not isinstance(response.json(), list)
@@ -83,16 +363,38 @@ class OpenWeatherAPI:
             lon=_json[0]['lon']
         )
 
-    def get_weather_data(self, lat, lon):
+    def get_reverse_geo_data(self, lat, lon) -> City:
+        params = self._geo_params.copy()
+        params['lat'] = lat
+        params['lon'] = lon
+        response = self._request(self._reverse_geo_url, params)
+        if not response.json():
+            raise APIError('No city near these coordinates')
+        if (not isinstance(response.json(), list)
+                and response.json()['cod'] != 200):
+            raise APIError(response.json()['message'])
+        _json = response.json()
+        return City(
+            name=_json[0]['name'],
+            country=_json[0]['country'],
+            lat=_json[0]['lat'],
+            lon=_json[0]['lon']
+        )
+
+    def get_weather_data(self, lat, lon) -> WeatherInfo:
+        cached = self._get_cached_weather(lat, lon)
+        if cached:
+            return cached
         params = self._data_params.copy()
         params['lat'] = lat
         params['lon'] = lon
-        response = requests.get(self._data_url, params=params)
+        response = self._request(self._data_url, params)
         if response.json()['cod'] != 200:
             raise APIError(response.json()['message'])
         _json = response.json()
         wind_d, wind_c = self.get_direction(_json['wind']['deg'])
-        return WeatherInfo(
+        weather_info = WeatherInfo(
+            weather_id=_json['weather'][0]['id'],
             weather_name=_json['weather'][0]['main'],
             weather_description=_json['weather'][0]['description'],
             weather_icon=_json['weather'][0]['icon'],
@@ -106,27 +408,13 @@ class OpenWeatherAPI:
             wind_code=wind_c,
             cloudiness=_json['clouds']['all'],
             sunrise=_json['sys']['sunrise'],
-            sunset=_json['sys']['sunset']
+            sunset=_json['sys']['sunset'],
+            observed_at=_json['dt']
         )
+        self._cache_weather(lat, lon, weather_info)
+        return weather_info
 
     @staticmethod
     def get_direction(degrees: Union[int, float]) -> Tuple[str, str]:
         """Convert degrees to direction and code (1-2 letters)"""
-        degrees = degrees % 360
-
-        if 22.5 <= degrees < 67.5:
-            return 'Northeast', 'NE'
-        elif 67.5 <= degrees < 112.5:
-            return 'East', 'E'
-        elif 112.5 <= degrees < 157.5:
-            return 'Southeast', 'SE'
-        elif 157.5 <= degrees < 202.5:
-            return 'South', 'S'
-        elif 202.5 <= degrees < 247.5:
-            return 'Southwest', 'SW'
-        elif 247.5 <= degrees < 292.5:
-            return 'West', 'W'
-        elif 292.5 <= degrees < 337.5:
-            return 'Northwest', 'NW'
-        else:
-            return 'North', 'N'
+        return COMPASS_POINTS[compass_point(degrees)]
@@ -0,0 +1,40 @@
+"""
+This module contains conversion of weather values from metric units, which
+are requested from the OpenWeatherMap API, to other supported units.
+"""
+
+__all__ = [
+    'UNITS',
+    'convert_speed',
+    'convert_temperature',
+    'convert_visibility'
+]
+
+# Same names as the 'units' parameter of the OpenWeatherMap API
+UNITS = ('standard', 'metric', 'imperial')
+
+METERS_PER_MILE = 1609.344
+MPH_PER_METER_PER_SECOND = 3600 / METERS_PER_MILE
+
+
+def convert_temperature(celsius: float, units: str) -> float:
+    """Kelvin for 'standard', Fahrenheit for 'imperial'"""
+    if units == 'standard':
+        return round(celsius + 273.15, 2)
+    if units == 'imperial':
+        return round(celsius * 9 / 5 + 32, 2)
+    return celsius
+
+
+def convert_speed(meters_per_second: float, units: str) -> float:
+    """Miles per hour for 'imperial'"""
+    if units == 'imperial':
+        return round(meters_per_second * MPH_PER_METER_PER_SECOND, 2)
+    return meters_per_second
+
+
+def convert_visibility(meters: float, units: str) -> float:
+    """Miles for 'imperial'"""
+    if units == 'imperial':
+        return round(meters / METERS_PER_MILE, 2)
+    return meters
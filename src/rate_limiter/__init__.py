@@ -0,0 +1,20 @@
+"""
+This module contains per-client rate limiting with the generic cell rate
+algorithm (GCRA) and a middleware applying it to configured paths.
+"""
+
+from .rate_limiter import (
+    GCRALimiter,
+    RateLimitMiddleware,
+    RateLimitRule,
+    RateLimiter,
+    parse_rules
+)
+
+__all__ = [
+    'GCRALimiter',
+    'RateLimitMiddleware',
+    'RateLimitRule',
+    'RateLimiter',
+    'parse_rules'
+]
@@ -0,0 +1,258 @@
+"""
+This module contains per-client rate limiting with the generic cell rate
+algorithm (GCRA) and a middleware applying it to configured paths.
+GCRA keeps a single float per client: the theoretical arrival time (TAT)
+of its next request.
+"""
+
+import json
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, Sequence, Tuple, Union
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+__all__ = [
+    'GCRALimiter',
+    'RateLimitMiddleware',
+    'RateLimitRule',
+    'RateLimiter',
+    'parse_rules'
+]
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+# Idle clients removed from the limiter per request
+EVICTIONS_PER_HIT = 4
+
+
+class RateLimitRule:
+    __slots__ = ('path', 'limit', 'period')
+
+    def __init__(self, path: str, limit: int, period: int):
+        self.path = path
+        self.limit = limit
+        self.period = period
+
+    def __repr__(self):
+        return (f'RateLimitRule(path={self.path}, limit={self.limit}, '
+                f'period={self.period})')
+
+    def __eq__(self, other):
+        return (isinstance(other, RateLimitRule)
+                and (self.path, self.limit, self.period)
+                == (other.path, other.limit, other.period))
+
+
+def parse_rules(rules: str) -> List[RateLimitRule]:
+    """
+    Parses rules like ``/weather=60/minute;/queries=600/minute``.
+    Requests to a rule's path or below it are limited by the rule.
+    """
+    parsed = []
+    for rule in rules.split(';'):
+        if not rule.strip():
+            continue
+        path, _, rate = rule.strip().partition('=')
+        limit, _, period = rate.partition('/')
+        if period not in PERIODS or not limit.isdigit() or not path:
+            raise ValueError(f'Invalid rate limit rule: {rule}')
+        parsed.append(RateLimitRule(path, int(limit), PERIODS[period]))
+    return parsed
+
+
+class GCRALimiter:
+    def __init__(self, limit: int, period: float, max_clients: int = 100000):
+        """
+        Allows ``limit`` requests per ``period`` seconds (all of them may
+        come at once) for each client. At most ``max_clients`` clients are
+        tracked, the least recently seen are forgotten first.
+        """
+        self._limit = limit
+        self._period = period
+        self._emission_interval = period / limit
+        self._max_clients = max_clients
+        # Every allowed hit moves its client to the end, so the first
+        # entries are the least recently seen clients
+        self._tats: Dict[str, float] = OrderedDict()
+        self.limited = 0
+
+    def __len__(self):
+        return len(self._tats)
+
+    def __repr__(self):
+        return f'GCRALimiter(limit={self._limit}, period={self._period})'
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def period(self) -> float:
+        return self._period
+
+    def _evict(self, now: float):
+        tats = self._tats
+        for _ in range(EVICTIONS_PER_HIT):
+            if not tats:
+                return
+            client, tat = next(iter(tats.items()))
+            # A client whose TAT has passed has the full burst again, so
+            # forgetting it changes nothing
+            if tat > now and len(tats) < self._max_clients:
+                return
+            tats.popitem(last=False)
+
+    def hit(
+            self,
+            client: str,
+            now: Union[float, None] = None
+    ) -> Tuple[bool, int, float]:
+        """
+        Registers a request from ``client``.
+        Returns whether it's allowed, how many requests are left and in
+        how many seconds the client may retry (if not allowed) or gets
+        the full limit back (if allowed).
+        """
+        if now is None:
+            now = time.monotonic()
+        tats = self._tats
+        tat = max(tats.get(client, now), now)
+        new_tat = tat + self._emission_interval
+        allow_at = new_tat - self._period
+        if allow_at > now:
+            self.limited += 1
+            return False, 0, allow_at - now
+        self._evict(now)
+        tats[client] = new_tat
+        tats.move_to_end(client)
+        remaining = int((now - allow_at) / self._emission_interval)
+        return True, remaining, new_tat - now
+
+
+class RateLimiter:
+    def __init__(
+            self,
+            rules: List[RateLimitRule],
+            key_header: Union[str, None] = None,
+            max_clients: int = 100000,
+            prefixes: Sequence[str] = ('',),
+            forwarded_header: Union[str, None] = None
+    ):
+        """
+        Limits requests matching ``rules`` under any of route ``prefixes``
+        per client: the value of ``key_header`` if set and sent, otherwise
+        the client IP. Behind a reverse proxy every request comes from its
+        IP, so the client IP is taken from the last address in
+        ``forwarded_header`` (e.g. ``X-Forwarded-For``) if it is set. Only
+        set it if the proxy always sets the header, as clients can send it.
+        """
+        self._limiters = [
+            (rule, GCRALimiter(rule.limit, rule.period, max_clients))
+            for rule in rules
+        ]
+        self._rule_paths = [
+            tuple(prefix + rule.path for prefix in prefixes)
+            for rule in rules
+        ]
+        self._key_header = key_header.lower().encode() if key_header else None
+        self._forwarded_header = (
+            forwarded_header.lower().encode() if forwarded_header else None
+        )
+
+    def __repr__(self):
+        return f'RateLimiter(rules={len(self._limiters)})'
+
+    def match(
+            self,
+            path: str
+    ) -> Union[Tuple[RateLimitRule, GCRALimiter], None]:
+        """First rule (with its limiter) for ``path``"""
+        for (rule, limiter), rule_paths in zip(
+                self._limiters, self._rule_paths
+        ):
+            for rule_path in rule_paths:
+                if path == rule_path or path.startswith(rule_path + '/'):
+                    return rule, limiter
+        return None
+
+    def client_key(self, scope: Scope) -> str:
+        if self._key_header:
+            for name, value in scope['headers']:
+                if name == self._key_header:
+                    return 'key:' + value.decode('latin-1')
+        if self._forwarded_header:
+            for name, value in scope['headers']:
+                if name == self._forwarded_header:
+                    # The proxy appends the address it got the request from
+                    return 'ip:' + value.decode(
+                        'latin-1'
+                    ).rsplit(',', 1)[-1].strip()
+        client = scope.get('client')
+        return 'ip:' + (client[0] if client else '')
+
+    def stats(self) -> Dict[str, dict]:
+        return {
+            rule.path: {
+                'limit': rule.limit,
+                'period': rule.period,
+                'clients': len(limiter),
+                'limited': limiter.limited
+            }
+            for rule, limiter in self._limiters
+        }
+
+
+class RateLimitMiddleware:
+    def __init__(self, app: ASGIApp, rate_limiter: RateLimiter):
+        """
+        Adds ``RateLimit-*`` headers to limited HTTP requests and rejects
+        ones over the limit with 429.
+        """
+        self.app = app
+        self._rate_limiter = rate_limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        matched = self._rate_limiter.match(scope['path'])
+        if not matched:
+            await self.app(scope, receive, send)
+            return
+
+        rule, limiter = matched
+        allowed, remaining, reset = limiter.hit(
+            self._rate_limiter.client_key(scope)
+        )
+        headers = [
+            (b'ratelimit-limit', str(rule.limit).encode()),
+            (b'ratelimit-remaining', str(remaining).encode()),
+            (b'ratelimit-reset', str(math.ceil(reset)).encode()),
+            (b'ratelimit-policy', f'{rule.limit};w={rule.period}'.encode())
+        ]
+        if not allowed:
+            await self._reject(send, headers, reset)
+            return
+
+        async def send_with_headers(message: Message):
+            if message['type'] == 'http.response.start':
+                message['headers'] = list(message.get('headers', [])) + headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+    @staticmethod
+    async def _reject(send: Send, headers: list, retry_after: float):
+        body = json.dumps({'error': 'Too many requests'}).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': 429,
+            'headers': headers + [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+                (b'retry-after', str(math.ceil(retry_after)).encode())
+            ]
+        })
+        await send({'type': 'http.response.body', 'body': body})
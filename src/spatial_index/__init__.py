@@ -0,0 +1,7 @@
+"""
+This module contains an in-memory spatial index for nearest city lookups.
+"""
+
+from .spatial_index import CityIndex, haversine_km
+
+__all__ = ['CityIndex', 'haversine_km']
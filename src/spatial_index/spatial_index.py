@@ -0,0 +1,115 @@
+"""
+This module contains an in-memory spatial index for nearest city lookups.
+Cities are kept in buckets of a fixed lat/lon grid, so a lookup only checks
+cities from the few cells around the point.
+"""
+
+import math
+from typing import Dict, Iterable, List, Set, Tuple, Union
+
+__all__ = ['CityIndex', 'haversine_km']
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+CityPoint = Tuple[int, float, float]
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometers"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    chord = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(math.sqrt(chord), 1))
+
+
+class CityIndex:
+    def __init__(self, cell_size_km: float = 10):
+        """
+        Initializes an empty index with grid cells of ``cell_size_km``
+        (along a meridian), best set close to the usual search radius.
+        """
+        self._cell_size = cell_size_km / KM_PER_DEGREE
+        self._cells: Dict[Tuple[int, int], List[CityPoint]] = {}
+        self._cities: Dict[int, Tuple[float, float]] = {}
+        self._loaded = False
+
+    def __len__(self):
+        return len(self._cities)
+
+    def __contains__(self, city_id: int):
+        return city_id in self._cities
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (math.floor(lat / self._cell_size),
+                math.floor(lon / self._cell_size))
+
+    def load(self, cities: Iterable[CityPoint]):
+        """Adds ``(city_id, lat, lon)`` rows and marks index as loaded"""
+        for city_id, lat, lon in cities:
+            self.add(city_id, lat, lon)
+        self._loaded = True
+
+    def add(self, city_id: int, lat: float, lon: float):
+        if city_id in self._cities or lat is None or lon is None:
+            return
+        self._cities[city_id] = (lat, lon)
+        self._cells.setdefault(self._cell(lat, lon), []).append(
+            (city_id, lat, lon)
+        )
+
+    def _columns(self, lon: float, lon_span: float) -> Set[int]:
+        """Grid columns covering ``lon`` +- ``lon_span``, wrapping at 180"""
+        if lon_span >= 180:
+            return {column for _, column in self._cells}
+        lon_ranges = [(max(lon - lon_span, -180), min(lon + lon_span, 180))]
+        if lon - lon_span < -180:
+            lon_ranges.append((lon - lon_span + 360, 180))
+        if lon + lon_span > 180:
+            lon_ranges.append((-180, lon + lon_span - 360))
+        columns = set()
+        for first_lon, last_lon in lon_ranges:
+            columns.update(range(
+                math.floor(first_lon / self._cell_size),
+                math.floor(last_lon / self._cell_size) + 1
+            ))
+        return columns
+
+    def nearest(
+            self,
+            lat: float,
+            lon: float,
+            radius_km: float
+    ) -> Union[Tuple[int, float], None]:
+        """
+        Returns ``(city_id, distance_km)`` of the nearest city within
+        ``radius_km`` or None if there is no such city.
+        """
+        lat_span = radius_km / KM_PER_DEGREE
+        # Degrees of longitude shrink towards the poles, so the widest
+        # latitude in the search window decides how many columns to check
+        cos_lat = math.cos(math.radians(min(abs(lat) + lat_span, 90)))
+        lon_span = 180 if cos_lat < 1e-9 else lat_span / cos_lat
+
+        first_row = math.floor((lat - lat_span) / self._cell_size)
+        last_row = math.floor((lat + lat_span) / self._cell_size)
+        columns = self._columns(lon, lon_span)
+
+        best = None
+        for row in range(first_row, last_row + 1):
+            for column in columns:
+                for city_id, city_lat, city_lon in self._cells.get(
+                        (row, column), ()
+                ):
+                    distance = haversine_km(lat, lon, city_lat, city_lon)
+                    if distance <= radius_km and (
+                            best is None or distance < best[1]
+                    ):
+                        best = (city_id, distance)
+        return best
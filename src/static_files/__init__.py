@@ -0,0 +1,8 @@
+"""
+This module contains a static files application that serves precompressed
+assets under content-hashed URLs.
+"""
+
+from .static_files import PrecompressedStaticFiles
+
+__all__ = ['PrecompressedStaticFiles']
@@ -0,0 +1,180 @@
+"""
+This module contains a static files application that serves precompressed
+assets under content-hashed URLs.
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+from typing import Dict, List
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from ..http_cache import CACHE_IMMUTABLE
+
+try:
+    import brotli
+except ImportError:
+    # Brotli is optional, gzip is always available
+    brotli = None
+
+__all__ = ['PrecompressedStaticFiles']
+
+logger = logging.getLogger('uvicorn.error')
+
+CACHE_REVALIDATE = 'public, max-age=0, must-revalidate'
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.html', '.js', '.json', '.map', '.svg', '.txt'
+)
+ENCODING_EXTENSIONS = {'br': '.br', 'gzip': '.gz'}
+HASH_LENGTH = 12
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    def __init__(self, *, directory: str, precompress: bool = True, **kwargs):
+        """
+        Serves files from ``directory`` like ``StaticFiles``.
+        If ``precompress`` is True, every compressible file gets ``.gz``
+        (and ``.br`` if ``brotli`` is installed) siblings once at startup,
+        and each file is also available under a content-hashed name, which
+        is cached by clients forever. Files whose siblings can't be written
+        (e.g. in a read-only directory) are served uncompressed.
+        """
+        super().__init__(directory=directory, **kwargs)
+        self._precompress = precompress
+        self._hashed_names: Dict[str, str] = {}
+        self._names_to_hashed: Dict[str, str] = {}
+        self._compressed: Dict[str, Dict[str, str]] = {}
+        if self._precompress:
+            self._prepare_files()
+
+    @property
+    def encodings(self) -> List[str]:
+        """Content encodings files are precompressed with"""
+        return ['br', 'gzip'] if brotli else ['gzip']
+
+    def _prepare_files(self):
+        for dir_path, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if filename.endswith(tuple(ENCODING_EXTENSIONS.values())):
+                    continue
+                full_path = os.path.join(dir_path, filename)
+                name = os.path.relpath(full_path, self.directory)
+                with open(full_path, 'rb') as file:
+                    content = file.read()
+
+                digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+                stem, extension = os.path.splitext(name)
+                hashed_name = f'{stem}.{digest}{extension}'
+                self._hashed_names[hashed_name] = name
+                self._names_to_hashed[name] = hashed_name
+
+                if extension.lower() in COMPRESSIBLE_EXTENSIONS:
+                    self._compressed[name] = self._compress_file(
+                        full_path, content
+                    )
+
+    def _compress_file(self, full_path: str, content: bytes) -> Dict[str, str]:
+        """
+        Writes compressed siblings of ``full_path``, unless they already
+        are up to date, and returns them by content encoding. Siblings
+        that can't be written or don't make the file smaller are left out.
+        """
+        source_mtime = os.stat(full_path).st_mtime
+        compressed = {}
+        for encoding in self.encodings:
+            compressed_path = full_path + ENCODING_EXTENSIONS[encoding]
+            if (not os.path.exists(compressed_path)
+                    or os.stat(compressed_path).st_mtime < source_mtime):
+                if encoding == 'br':
+                    data = brotli.compress(content, quality=11)
+                else:
+                    data = gzip.compress(content, compresslevel=9, mtime=0)
+                # Not worth serving if it doesn't save anything. An empty
+                # sibling records that, so it isn't compressed again on
+                # the next start
+                if len(data) >= len(content):
+                    data = b''
+                tmp_path = compressed_path + '.tmp'
+                try:
+                    with open(tmp_path, 'wb') as file:
+                        file.write(data)
+                    os.replace(tmp_path, compressed_path)
+                except OSError as e:
+                    logger.warning(f'No {encoding} copy of {full_path}: {e}')
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    continue
+            if not os.path.getsize(compressed_path):
+                continue
+            compressed[encoding] = compressed_path
+        return compressed
+
+    def url_path(self, path: str) -> str:
+        """
+        Returns content-hashed version of ``path`` (relative to the static
+        directory, may be prefixed with it) or ``path`` itself if
+        there is no such file.
+        """
+        prefix, name = '', os.path.normpath(path)
+        directory = os.path.normpath(str(self.directory))
+        if name.startswith(directory + os.sep):
+            prefix = directory + '/'
+            name = name[len(directory) + 1:]
+        hashed_name = self._names_to_hashed.get(os.path.normpath(name))
+        if not hashed_name:
+            return path
+        return prefix + hashed_name.replace(os.sep, '/')
+
+    def _accepted_encodings(self, scope: Scope) -> List[str]:
+        accept_encoding = Headers(scope=scope).get('accept-encoding', '')
+        accepted = set()
+        for item in accept_encoding.split(','):
+            encoding, _, params = item.strip().partition(';')
+            params = params.strip().replace(' ', '')
+            try:
+                quality = float(params[2:]) if params.startswith('q=') else 1
+            except ValueError:
+                quality = 0
+            if quality > 0:
+                accepted.add(encoding.strip().lower())
+        return [
+            encoding for encoding in self.encodings
+            if encoding in accepted or '*' in accepted
+        ]
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        name = self._hashed_names.get(path, path)
+        immutable = name != path
+
+        response = None
+        compressed = self._compressed.get(name, {})
+        encodings = (
+            self._accepted_encodings(scope)
+            if scope['method'] in ('GET', 'HEAD') else []
+        )
+        for encoding in encodings:
+            if encoding not in compressed:
+                continue
+            response = FileResponse(
+                compressed[encoding],
+                media_type=mimetypes.guess_type(name)[0],
+                headers={'Content-Encoding': encoding}
+            )
+            if self.is_not_modified(response.headers, Headers(scope=scope)):
+                response = NotModifiedResponse(response.headers)
+            break
+        if response is None:
+            response = await super().get_response(name, scope)
+
+        if compressed:
+            response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = (
+            CACHE_IMMUTABLE if immutable else CACHE_REVALIDATE
+        )
+        return response
@@ -0,0 +1,19 @@
+import pytest
+
+from src.api_versions.v1.pydantic_models import WeatherResponse
+
+
+@pytest.fixture
+def record():
+    """Factory of weather responses of query ``query_id``"""
+    def make(query_id, utc_timestamp=0):
+        return WeatherResponse(
+            id=query_id, city_name='Paris', city_country='FR',
+            latitude=48.85, longitude=2.35, weather_name='Clouds',
+            weather_description='broken clouds', weather_icon='04d',
+            temp=12.5, pressure=1012, humidity=70, visibility=10000,
+            wind_speed=3.5, wind_degree=200, wind_direction='South',
+            wind_code='S', cloudiness=75, sunrise=0, sunset=0,
+            utc_timestamp=utc_timestamp
+        )
+    return make
@@ -0,0 +1,39 @@
+from src.admission import AdaptiveLimiter, AdmissionController
+
+
+def test_limiter_sheds_over_limit():
+    limiter = AdaptiveLimiter(initial_limit=2)
+    assert limiter.try_acquire()
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()
+    assert limiter.stats()['shed'] == 1
+
+
+def test_limiter_backs_off_on_slow_requests():
+    limiter = AdaptiveLimiter(initial_limit=10, target_latency=0.5)
+    limiter.try_acquire()
+    limiter.release(latency=1)
+    assert limiter.limit == 9
+
+
+def test_expensive_paths_have_own_limiter():
+    controller = AdmissionController(
+        expensive_paths=['/weather'], prefixes=['/api']
+    )
+    assert (controller.limiter('/api/weather/Paris')
+            is not controller.limiter('/api/queries/1'))
+
+
+def test_paths_are_matched_under_prefixes():
+    controller = AdmissionController(
+        expensive_paths=['/weather'],
+        stream_paths=['/subscriptions'],
+        prefixes=['/api', '/api/v1']
+    )
+    assert controller.limiter('/api/v1/subscriptions') is None
+    # A city named like a stream path is an ordinary weather request
+    assert (controller.limiter('/api/weather/subscriptions')
+            is controller.limiter('/api/weather/Paris'))
+    assert controller.limiter('/api/weather/subscriptions') is not None
+    assert (controller.limiter('/api/queries/weather')
+            is not controller.limiter('/api/v1/weather/Paris'))
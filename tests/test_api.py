@@ -1,7 +1,9 @@
 from fastapi.testclient import TestClient
 
 from src import app
+from src.api_versions.v1 import routes
 from src.configurator import MainConfigurator
+from src.open_weather_api import City
 
 config = MainConfigurator()
 base_address = config.main_api_address
@@ -46,6 +48,14 @@ def test_get_weather_found():
     assert 'weather_name' in response.json()
 
 
+def test_get_weather_ignores_other_params():
+    response = client.get(
+        f'{base_address}/weather/New York',
+        params={'_': 1, 'units': 'imperial'}
+    )
+    assert response.status_code == 200
+
+
 def test_get_weather_not_found():
     response = client.get(f'{base_address}/weather/UnknownCity')
     assert response.status_code == 400
@@ -80,3 +90,152 @@ def test_get_queries_not_found():
     )
     assert response.status_code == 400
     assert response.json()['error'] == 'End of weather queries'
+
+
+def test_lookup_queries():
+    response = client.post(
+        f'{base_address}/queries/lookup', json={'ids': [1, -1, 1]}
+    )
+    assert response.status_code == 200
+    assert [query['id'] for query in response.json()['queries']] == [1]
+    assert response.json()['missing'] == [-1]
+
+
+def test_get_queries_changes():
+    response = client.get(
+        f'{base_address}/queries/changes?since_id=0&limit=2&timeout=0'
+    )
+    assert response.status_code == 200
+    ids = [query['id'] for query in response.json()['queries']]
+    assert ids == sorted(ids) and 0 < len(ids) <= 2
+    assert response.json()['next_since_id'] == ids[-1]
+
+
+def test_get_queries_changes_timeout():
+    since_id = client.get(f'{base_address}/weather/New York').json()['id']
+    response = client.get(
+        f'{base_address}/queries/changes?since_id={since_id}&timeout=0.05'
+    )
+    assert response.status_code == 200
+    assert response.json() == {'queries': [], 'next_since_id': since_id}
+
+
+def test_lookup_queries_too_many_ids():
+    response = client.post(
+        f'{base_address}/queries/lookup', json={'ids': list(range(501))}
+    )
+    assert response.status_code == 422
+
+
+def test_get_query_not_modified():
+    response = client.get(f'{base_address}/queries/1')
+    assert 'immutable' in response.headers['cache-control']
+    etag = response.headers['etag']
+    response = client.get(
+        f'{base_address}/queries/1', headers={'If-None-Match': etag}
+    )
+    assert response.status_code == 304
+
+
+def test_get_query_any_etag_needs_query():
+    response = client.get(
+        f'{base_address}/queries/1', headers={'If-None-Match': '*'}
+    )
+    assert response.status_code == 304
+    response = client.get(
+        f'{base_address}/queries/999999999', headers={'If-None-Match': '*'}
+    )
+    assert response.status_code == 400
+
+
+def test_get_queries_not_modified():
+    response = client.get(f'{base_address}/queries?limit=5')
+    etag = response.headers['etag']
+    assert etag.startswith('W/')
+    response = client.get(
+        f'{base_address}/queries?limit=5', headers={'If-None-Match': etag}
+    )
+    assert response.status_code == 304
+
+
+def test_get_weather_max_age():
+    response = client.get(f'{base_address}/weather/New York')
+    assert response.status_code == 200
+    assert 'max-age' in response.headers['cache-control']
+
+
+def test_docs_static_precompressed():
+    response = client.get(f'{base_address}/docs')
+    assert response.status_code == 200
+    js_url = response.text.split('swagger-ui-bundle.')[1].split('"')[0]
+    response = client.get(
+        f'{base_address}/static/swagger-ui-bundle.{js_url}',
+        headers={'Accept-Encoding': 'gzip'}
+    )
+    assert response.status_code == 200
+    assert response.headers['content-encoding'] == 'gzip'
+    assert 'immutable' in response.headers['cache-control']
+
+
+def test_get_weather_by_coords_snaps_to_known_city():
+    city = client.get(f'{base_address}/weather/New York').json()
+    response = client.get(
+        f'{base_address}/weather/by-coords'
+        f'?lat={city["latitude"] + 0.01}&lon={city["longitude"] - 0.01}'
+    )
+    assert response.status_code == 200
+    assert response.json()['city_name'] == city['city_name']
+
+
+def test_get_weather_by_coords_same_name_cities(monkeypatch):
+    db = routes.SessionLocal()
+    try:
+        routes.add_city(db, 'Paris', City(
+            name='Paris', country='FR', lat=48.8566, lon=2.3522
+        ))
+    finally:
+        db.close()
+    monkeypatch.setattr(
+        routes.open_weather_api,
+        'get_reverse_geo_data',
+        lambda lat, lon: City(name='Paris', country='US', lat=lat, lon=lon)
+    )
+    response = client.get(
+        f'{base_address}/weather/by-coords?lat=33.66&lon=-95.55'
+    )
+    assert response.status_code == 200
+    assert response.json()['city_country'] == 'US'
+    assert abs(response.json()['latitude'] - 33.66) < 0.01
+
+
+def test_get_weather_by_coords_invalid():
+    response = client.get(f'{base_address}/weather/by-coords?lat=91&lon=0')
+    assert response.status_code == 422
+
+
+def test_get_weather_units_and_lang():
+    metric = client.get(f'{base_address}/weather/New York').json()
+    response = client.get(
+        f'{base_address}/weather/New York?units=imperial&lang=de'
+    )
+    assert response.status_code == 200
+    imperial = response.json()
+    assert abs(imperial['temp'] - (metric['temp'] * 9 / 5 + 32)) < 0.01
+    assert imperial['city_name'] == metric['city_name']
+
+
+def test_get_weather_unknown_units():
+    response = client.get(f'{base_address}/weather/New York?units=furlongs')
+    assert response.status_code == 422
+
+
+def test_suggest_cities():
+    client.get(f'{base_address}/weather/New York')
+    response = client.get(f'{base_address}/cities/suggest?q=new%20y')
+    assert response.status_code == 200
+    assert response.json()[0]['name'] == 'New York'
+
+
+def test_suggest_cities_empty_query():
+    response = client.get(f'{base_address}/cities/suggest?q=')
+    assert response.status_code == 422
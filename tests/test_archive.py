@@ -0,0 +1,51 @@
+from fastapi.testclient import TestClient
+
+import pytest
+
+from src import app
+from src.api_versions.v1 import routes
+from src.api_versions.v1.archive import QueryArchive
+from src.configurator import MainConfigurator
+
+pytest.importorskip('pyarrow')
+
+# 2024-01-31 and 2024-02-01, 00:00 UTC
+JANUARY = 1706659200
+FEBRUARY = 1706745600
+
+
+def test_records_are_read_back_from_monthly_files(tmp_path, record):
+    archive = QueryArchive(str(tmp_path))
+    archive.write([
+        record(query_id, utc_timestamp).model_dump()
+        for query_id, utc_timestamp in (
+            (1, JANUARY), (2, JANUARY), (5, FEBRUARY)
+        )
+    ])
+    archive.write([record(8, FEBRUARY).model_dump()])
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        '2024-01', '2024-02', 'index.json'
+    ]
+    assert archive.get(2) == record(2, JANUARY).model_dump()
+    assert archive.get(3) is None
+    assert archive.get(9) is None
+    assert set(archive.get_many([1, 4, 5, 8])) == {1, 5, 8}
+
+
+def test_empty_archive_has_no_records(tmp_path):
+    assert QueryArchive(str(tmp_path / 'missing')).get_many([1, 2]) == {}
+
+
+def test_queries_listing_tells_archived_ids(tmp_path, record, monkeypatch):
+    archive = QueryArchive(str(tmp_path))
+    assert archive.last_id is None
+    archive.write([record(1, JANUARY).model_dump()])
+    archive.write([record(5, FEBRUARY).model_dump()])
+    assert archive.last_id == 5
+
+    monkeypatch.setattr(routes, 'query_archive', archive)
+    response = TestClient(app).get(
+        f'{MainConfigurator().main_api_address}/queries'
+    )
+    assert response.status_code == 200
+    assert response.headers['x-archived-through'] == '5'
@@ -0,0 +1,52 @@
+import time
+
+from src.open_weather_api import (
+    OpenWeatherAPI,
+    WeatherCacheSnapshot,
+    WeatherInfo
+)
+
+
+def weather(temp):
+    return WeatherInfo(
+        weather_id=803, weather_name='Clouds',
+        weather_description='überall Wolken', weather_icon='04d',
+        temp=temp, pressure=1012, humidity=70, visibility=10000,
+        wind_speed=3.6, wind_degree=200, wind_direction='South',
+        wind_code='S', cloudiness=75, sunrise=1, sunset=2,
+        observed_at=1700000000
+    )
+
+
+def test_weather_cache_survives_restart(tmp_path):
+    path = str(tmp_path / 'cache' / 'weather.bin')
+    api = OpenWeatherAPI(cache_ttl=600)
+    api.restore_weather(48.85, 2.35, 600, weather(12.5))
+    api.restore_weather(52.52, 13.4, 600, weather(-3))
+    assert WeatherCacheSnapshot(api, path).save() == 2
+
+    restarted = OpenWeatherAPI(cache_ttl=600)
+    assert WeatherCacheSnapshot(restarted, path).load() == 2
+    assert restarted.get_weather_data(48.85, 2.35) == weather(12.5)
+    assert 590 < restarted.weather_cache_ttl(52.52, 13.4) <= 600
+
+
+def test_expired_entries_are_not_loaded(tmp_path, monkeypatch):
+    path = str(tmp_path / 'weather.bin')
+    api = OpenWeatherAPI(cache_ttl=600)
+    api.restore_weather(48.85, 2.35, 10, weather(12.5))
+    WeatherCacheSnapshot(api, path).save()
+
+    # Stopped for longer than the entry had left
+    wall_clock = time.time() + 60
+    monkeypatch.setattr(time, 'time', lambda: wall_clock)
+    restarted = OpenWeatherAPI(cache_ttl=600)
+    assert WeatherCacheSnapshot(restarted, path).load() == 0
+
+
+def test_missing_or_broken_snapshot_is_ignored(tmp_path):
+    path = tmp_path / 'weather.bin'
+    snapshot = WeatherCacheSnapshot(OpenWeatherAPI(cache_ttl=600), str(path))
+    assert snapshot.load() == 0
+    path.write_bytes(b'not a snapshot')
+    assert snapshot.load() == 0
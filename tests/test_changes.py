@@ -0,0 +1,66 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+
+from src.api_versions.v1.changes import QueryNotifier, committed_prefix
+from src.api_versions.v1.database import Base
+
+
+def make_engine():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def test_insert_in_other_thread_wakes_waiter():
+    notifier = QueryNotifier(make_engine())
+
+    async def run():
+        notifier.start()
+        assert not await notifier.wait(0, 0.01)
+        threading.Timer(0.05, notifier.committed, args=(7,)).start()
+        assert await notifier.wait(0, 5)
+        assert notifier.latest_id == 7
+        # Newer query is already known, no waiting
+        assert await notifier.wait(6, 0)
+        await notifier.stop()
+
+    asyncio.run(run())
+    assert notifier.stats()['timeouts'] == 1
+
+
+def test_start_from_latest_saved_query():
+    engine = make_engine()
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            'INSERT INTO queries (id, observation_id) VALUES (41, 1)'
+        )
+    notifier = QueryNotifier(engine)
+
+    async def run():
+        notifier.start()
+        assert notifier.latest_id == 41
+        assert not await notifier.wait(41, 0.01)
+        await notifier.stop()
+
+    asyncio.run(run())
+
+
+def test_queries_after_uncommitted_id_are_held_back():
+    def queries(*ids_and_times):
+        return [
+            SimpleNamespace(id=query_id, utc_timestamp=utc_timestamp)
+            for query_id, utc_timestamp in ids_and_times
+        ]
+
+    # ID 3 is missing right before a query saved a second ago
+    page = queries((2, 90), (4, 99), (5, 99))
+    assert committed_prefix(page, 1, now=100, grace=5) == (page[:1], 4)
+    # After the grace period, the gap is a rolled back query
+    assert committed_prefix(page, 1, now=110, grace=5) == (page, 0)
+    # Gaps before old queries are not waited for
+    page = queries((10, 50), (12, 60))
+    assert committed_prefix(page, 0, now=100, grace=5) == (page, 0)
+    assert committed_prefix([], 0) == ([], 0)
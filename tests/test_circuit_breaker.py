@@ -0,0 +1,28 @@
+import time
+
+from src.open_weather_api import CircuitBreaker, LatencyTracker
+
+
+def test_circuit_breaker_opens_and_recovers():
+    breaker = CircuitBreaker(error_rate=0.5, window=4, min_calls=4,
+                             cooldown=0.05)
+    for _ in range(2):
+        breaker.record_success()
+        breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+
+
+def test_latency_tracker_percentile():
+    tracker = LatencyTracker()
+    assert tracker.percentile(95) is None
+    for value in range(100):
+        tracker.add(value)
+    assert tracker.percentile(50) == 50
+    assert tracker.percentile(95) == 95
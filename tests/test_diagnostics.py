@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+from src.diagnostics import (
+    BlockingDetector,
+    BlockingDetectorMiddleware,
+    MemoryDiagnostics
+)
+
+
+class Leaked:
+    pass
+
+
+def blocking_call():
+    time.sleep(0.3)
+
+
+async def blocking_app(_scope, _receive, _send):
+    blocking_call()
+
+
+def test_blocking_detector_reports_route_and_line():
+    detector = BlockingDetector(threshold=0.05)
+    middleware = BlockingDetectorMiddleware(blocking_app)
+
+    async def run():
+        detector.start()
+        await asyncio.sleep(0.1)
+        await middleware(
+            {'type': 'http', 'method': 'GET', 'path': '/api/slow'},
+            None, None
+        )
+        await asyncio.sleep(0.2)
+        await detector.stop()
+
+    asyncio.run(run())
+    stats = detector.stats()
+    assert len(stats['reports']) == 1
+    report = stats['reports'][0]
+    assert report['route'] == 'GET /api/slow'
+    assert 'blocking_call' in report['location']
+    assert report['blocked_for'] >= 0.2
+    assert stats['top'][0]['count'] == 1
+    assert not stats['blocked']
+
+
+def test_memory_diagnostics_reports_growth(tmp_path):
+    diagnostics = MemoryDiagnostics(output_dir=str(tmp_path), frames=5)
+
+    async def run():
+        diagnostics.start()
+        leak = [Leaked() for _ in range(10000)]
+        report = diagnostics.snapshot()
+        await diagnostics.stop()
+        return leak, report
+
+    _leak, report = asyncio.run(run())
+    assert report['traced_memory_growth'] > 0
+    assert any(row['type'] == 'Leaked' and row['count_diff'] >= 10000
+               for row in report['object_growth'])
+    assert any('test_diagnostics.py' in line
+               for line in report['top_allocations'][0]['traceback'])
+    assert len(list(tmp_path.iterdir())) == 1
+    assert not diagnostics.started
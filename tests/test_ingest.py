@@ -0,0 +1,64 @@
+import gzip
+import json
+
+from sqlalchemy import text
+
+from src.api_versions.v1.database import Base, build_engine
+from src.api_versions.v1.ingest import BulkIngest, copy_text
+from src.open_weather_api import compass_point, compass_points
+
+
+def dump_line(name, observed_at, deg):
+    return json.dumps({
+        'coord': {'lon': 2.35, 'lat': 48.85}, 'dt': observed_at,
+        'name': name, 'sys': {'country': 'FR', 'sunrise': 1, 'sunset': 2},
+        'weather': [{'id': 803, 'main': 'Clouds',
+                     'description': 'broken clouds', 'icon': '04d'}],
+        'main': {'temp': 12.5, 'pressure': 1012, 'humidity': 70},
+        'visibility': 10000, 'wind': {'speed': 3.6, 'deg': deg},
+        'clouds': {'all': 75}
+    }) + '\n'
+
+
+def test_compass_points_match_compass_point():
+    degrees = [0, 22.4, 22.5, 200, 337.5, 359.9, 360, 725]
+    assert compass_points(degrees) == [compass_point(d) for d in degrees]
+
+
+def test_ingest_dump(tmp_path):
+    engine = build_engine('sqlite', str(tmp_path / 'ingest.db'))
+    Base.metadata.create_all(bind=engine)
+    path = str(tmp_path / 'dump.json.gz')
+    with gzip.open(path, 'wt', encoding='utf-8') as file:
+        file.writelines(
+            dump_line('Paris' if i % 2 else 'Lyon', 1700000000 + i, i * 40)
+            for i in range(25)
+        )
+        file.write('not json\n')
+        # Repeated observation
+        file.write(dump_line('paris', 1700000001, 40))
+
+    ingest = BulkIngest(engine)
+    assert ingest.ingest_file(path, batch_size=10,
+                              progress=lambda _: None) == 25
+    # Saved observations are skipped when a dump is loaded again
+    assert ingest.ingest_file(path, progress=lambda _: None) == 0
+
+    with engine.connect() as connection:
+        assert connection.execute(text(
+            'SELECT name FROM cities ORDER BY id'
+        )).scalars().all() == ['Lyon', 'Paris']
+        rows = connection.execute(text(
+            'SELECT observations.observed_at, observations.wind_point, '
+            'queries.utc_timestamp FROM queries JOIN observations '
+            'ON observations.id = queries.observation_id '
+            'ORDER BY observations.observed_at'
+        )).all()
+    assert len(rows) == 25
+    assert rows[5] == (1700000005, compass_point(200), 1700000005)
+
+
+def test_copy_text_escapes_values():
+    assert copy_text([(1, None, 'a\tb\\c\nd', 2.5)]) == (
+        '1\t\\N\ta\\tb\\\\c\\nd\t2.5\n'
+    )
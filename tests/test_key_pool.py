@@ -0,0 +1,60 @@
+import pytest
+
+import requests
+
+from src.open_weather_api import (
+    ApiKeyPool,
+    InvalidApiKeyError,
+    OpenWeatherAPI,
+    UpstreamUnavailableError
+)
+
+
+def test_key_pool_spreads_calls():
+    pool = ApiKeyPool(['first-key', 'second-key'])
+    first = pool.acquire()
+    second = pool.acquire()
+    assert first.key != second.key
+
+
+def test_key_pool_disables_rejected_keys():
+    pool = ApiKeyPool(['first-key', 'second-key'])
+    for status_code in (401, 429):
+        api_key = pool.acquire()
+        pool.release(api_key, status_code)
+    assert pool.acquire() is None
+    assert [key['healthy'] for key in pool.stats()] == [False, False]
+
+
+def test_key_pool_rate_budget():
+    pool = ApiKeyPool(['only-key'], rate_per_minute=2)
+    for _ in range(2):
+        pool.release(pool.acquire(), 200)
+    assert pool.acquire() is None
+
+
+def test_key_pool_stats_hide_keys():
+    pool = ApiKeyPool(['first-secret-key', 'second-secret-key'])
+    stats = pool.stats()
+    assert [key['key'] for key in stats] == ['key#1', 'key#2']
+    assert 'secret' not in repr(stats)
+
+
+class UnauthorizedResponse:
+    status_code = 401
+
+    @staticmethod
+    def json():
+        return {'cod': 401, 'message': 'Invalid API key'}
+
+
+def test_unauthorized_keys_are_not_an_outage(monkeypatch):
+    monkeypatch.setattr(
+        requests, 'get', lambda *args, **kwargs: UnauthorizedResponse()
+    )
+    api = OpenWeatherAPI(key_pool=ApiKeyPool(['first-key', 'second-key']))
+    # Also when the keys are already disabled
+    for _ in range(2):
+        with pytest.raises(InvalidApiKeyError) as error:
+            api.get_weather_data(48.85, 2.35)
+        assert not isinstance(error.value, UpstreamUnavailableError)
@@ -0,0 +1,111 @@
+from sqlalchemy import create_engine, text
+
+from src.api_versions.v1.database import Base, WeatherConditionMap
+from src.api_versions.v1.database import build_sessionmaker
+from src.api_versions.v1.migrations import (
+    add_condition_owm_ids,
+    encode_weather_strings,
+    split_observations
+)
+
+OLD_QUERIES_TABLE = (
+    'CREATE TABLE queries (id INTEGER PRIMARY KEY, city_id INTEGER, '
+    'weather_name VARCHAR, weather_description VARCHAR, '
+    'weather_icon VARCHAR, temp FLOAT, pressure FLOAT, humidity FLOAT, '
+    'visibility FLOAT, wind_speed FLOAT, wind_deg INTEGER, '
+    'wind_direction VARCHAR, wind_code VARCHAR, cloudiness FLOAT, '
+    'sunrise INTEGER, sunset INTEGER, utc_timestamp FLOAT)'
+)
+
+
+def test_migrate_old_queries(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "old.db"}')
+    with engine.begin() as connection:
+        connection.execute(text(OLD_QUERIES_TABLE))
+        connection.execute(text(
+            'CREATE INDEX ix_queries_weather_name ON queries (weather_name)'
+        ))
+        for i in range(1, 26):
+            # Ten queries got the same clouds, then the weather changed
+            clouds = i <= 10
+            connection.execute(text(
+                'INSERT INTO queries (id, city_id, weather_name, '
+                'weather_description, weather_icon, temp, wind_deg, '
+                'wind_direction, wind_code, utc_timestamp) VALUES (:id, 1, '
+                ':name, :description, :icon, :temp, :deg, :direction, :code, '
+                ':timestamp)'
+            ), {
+                'id': i,
+                'name': 'Clouds' if clouds else 'Rain',
+                'description': 'broken clouds' if clouds else 'light rain',
+                'icon': '04d' if clouds else '10n',
+                'temp': 12.5 if clouds else 9.0,
+                'deg': 200 if clouds else 320,
+                'direction': 'South' if clouds else 'Northwest',
+                'code': 'S' if clouds else 'NW',
+                'timestamp': 1700000000 + i * 60
+            })
+    Base.metadata.create_all(bind=engine)
+
+    for migrate in (encode_weather_strings, split_observations):
+        migrate(engine, batch_size=10, drop_old_columns=True,
+                progress=lambda _: None)
+
+    conditions = WeatherConditionMap(build_sessionmaker(engine))
+    with engine.connect() as connection:
+        rows = connection.execute(text(
+            'SELECT queries.id, observations.observed_at, '
+            'observations.weather_condition_id, observations.wind_point, '
+            'observations.temp FROM queries JOIN observations '
+            'ON observations.id = queries.observation_id ORDER BY queries.id'
+        )).all()
+        observations = connection.execute(text(
+            'SELECT COUNT(*) FROM observations'
+        )).scalar()
+        columns = connection.execute(text(
+            "SELECT name FROM pragma_table_info('queries')"
+        )).scalars().all()
+    assert len(rows) == 25
+    assert observations == 2
+    for query_id, observed_at, condition, wind_point, temp in rows:
+        if query_id <= 10:
+            assert observed_at == 1700000060
+            assert conditions.decode(condition) == (
+                'Clouds', 'broken clouds', '04d'
+            )
+            assert conditions.owm_id(condition) == 803
+            assert (wind_point, temp) == (4, 12.5)
+        else:
+            assert observed_at == 1700000660
+            assert conditions.decode(condition) == (
+                'Rain', 'light rain', '10n'
+            )
+            assert conditions.owm_id(condition) == 500
+            assert (wind_point, temp) == (7, 9.0)
+    assert 'weather_name' not in columns
+    assert 'temp' not in columns
+
+
+def test_add_condition_owm_ids(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "old.db"}')
+    with engine.begin() as connection:
+        connection.execute(text(
+            'CREATE TABLE weather_conditions (id INTEGER PRIMARY KEY, '
+            'name VARCHAR NOT NULL, description VARCHAR NOT NULL, '
+            'icon VARCHAR NOT NULL, UNIQUE (name, description, icon))'
+        ))
+        connection.execute(text(
+            'INSERT INTO weather_conditions VALUES '
+            "(1, 'Clouds', 'broken clouds', '04d'), "
+            "(2, 'Clouds', 'cloudy with meatballs', '04d')"
+        ))
+    add_condition_owm_ids(engine, progress=lambda _: None)
+
+    conditions = WeatherConditionMap(build_sessionmaker(engine))
+    assert conditions.owm_id(1) == 803
+    assert conditions.owm_id(2) is None
+    # Learned from the next OpenWeatherMap response
+    assert conditions.encode(
+        'Clouds', 'cloudy with meatballs', '04d', 803
+    ) == 2
+    assert WeatherConditionMap(build_sessionmaker(engine)).owm_id(2) == 803
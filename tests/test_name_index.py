@@ -0,0 +1,93 @@
+from src.api_versions.v1 import routes
+from src.api_versions.v1.database import (
+    Base,
+    City,
+    Observation,
+    Query,
+    build_engine,
+    build_sessionmaker
+)
+from src.name_index import CityNameIndex, normalize_name
+
+
+def make_index() -> CityNameIndex:
+    index = CityNameIndex()
+    index.load([
+        (1, 'Paris', 'FR', 10),
+        (2, 'Paris', 'US', 50),
+        (3, 'Parma', 'IT', 5),
+        (4, 'Berlin', 'DE', 20),
+        (5, 'São Paulo', 'BR', 30)
+    ])
+    return index
+
+
+def test_normalize_name():
+    assert normalize_name('  São   Paulo ') == 'sao paulo'
+    assert normalize_name('MÜNCHEN') == 'munchen'
+
+
+def test_suggest_prefix_by_popularity():
+    index = make_index()
+    assert [city[0] for city in index.suggest('par')] == [2, 1, 3]
+    assert index.suggest('berl') == [(4, 'Berlin', 'DE')]
+    assert index.suggest('Par', limit=1) == [(2, 'Paris', 'US')]
+
+
+def test_suggest_follows_requests():
+    index = make_index()
+    for _ in range(100):
+        index.hit(3)
+    assert index.suggest('par')[0][0] == 3
+
+
+def test_suggest_accents_and_misspelling():
+    index = make_index()
+    assert index.suggest('sao p') == [(5, 'São Paulo', 'BR')]
+    assert index.suggest('berlni')[0][0] == 4
+    assert index.suggest('xyz') == []
+
+
+def test_suggest_added_city_and_duplicates():
+    index = make_index()
+    index.add(6, 'Parla', 'ES')
+    index.add(7, 'paris', 'FR')
+    assert [city[0] for city in index.suggest('par')] == [2, 1, 3, 6]
+
+
+def test_popularity_order_of_long_prefix_ranges():
+    index = CityNameIndex()
+    index.load((city_id, f'Town {city_id}', 'XX', 0)
+               for city_id in range(1000))
+    index.add(1000, 'Town New', 'XX')
+    for city_id in (5, 7, 7, 1000, 1000, 1000):
+        index.hit(city_id)
+    assert [city[0] for city in index.suggest('town', limit=3)] == [
+        1000, 7, 5
+    ]
+
+
+def test_popularity_starts_from_queries(tmp_path, monkeypatch):
+    engine = build_engine('sqlite', str(tmp_path / 'weather.db'))
+    Base.metadata.create_all(bind=engine)
+    db = build_sessionmaker(engine)()
+    try:
+        # Lyon has more observations, Lille more requests of one
+        lyon = City(name='Lyon', country='FR', lat=45.76, lon=4.84)
+        lille = City(name='Lille', country='FR', lat=50.63, lon=3.06)
+        lyon.observations = [
+            Observation(observed_at=observed_at, queries=[Query()])
+            for observed_at in (1, 2)
+        ]
+        lille.observations = [
+            Observation(observed_at=1, queries=[Query() for _ in range(3)])
+        ]
+        db.add_all([lyon, lille, City(name='Limoges', country='FR')])
+        db.commit()
+        monkeypatch.setattr(routes, 'city_names', CityNameIndex())
+        city_names = routes.get_city_names(db)
+    finally:
+        db.close()
+    assert [city[1] for city in city_names.suggest('l')] == [
+        'Lille', 'Lyon', 'Limoges'
+    ]
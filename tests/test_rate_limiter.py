@@ -0,0 +1,62 @@
+import pytest
+
+from src.rate_limiter import (
+    GCRALimiter,
+    RateLimitRule,
+    RateLimiter,
+    parse_rules
+)
+
+
+def test_parse_rules():
+    assert parse_rules('/weather=60/minute; /queries=10/second') == [
+        RateLimitRule('/weather', 60, 60),
+        RateLimitRule('/queries', 10, 1)
+    ]
+    assert parse_rules('') == []
+    with pytest.raises(ValueError):
+        parse_rules('/weather=often')
+
+
+def test_gcra_burst_and_refill():
+    limiter = GCRALimiter(limit=3, period=3)
+    assert [limiter.hit('client', now=0)[:2] for _ in range(3)] == [
+        (True, 2), (True, 1), (True, 0)
+    ]
+    allowed, _, retry_after = limiter.hit('client', now=0)
+    assert not allowed and retry_after == pytest.approx(1)
+    assert limiter.hit('client', now=1)[0]
+    assert limiter.hit('other', now=1)[0]
+
+
+def test_gcra_max_clients():
+    limiter = GCRALimiter(limit=1, period=60, max_clients=100)
+    for client in range(1000):
+        limiter.hit(str(client), now=0)
+    assert len(limiter) <= 100
+
+
+def test_rules_match_paths_under_prefixes():
+    rate_limiter = RateLimiter(
+        parse_rules('/weather=60/minute;/queries=600/minute'),
+        prefixes=['/api', '/api/v1']
+    )
+    assert rate_limiter.match('/api/weather/Paris')[0].path == '/weather'
+    assert rate_limiter.match('/api/v1/weather')[0].path == '/weather'
+    # Containing a rule's path is not enough
+    assert rate_limiter.match('/api/queries/weather')[0].path == '/queries'
+    assert rate_limiter.match('/api/status/weather') is None
+    assert rate_limiter.match('/api/weatherx') is None
+
+
+def test_client_ip_from_forwarded_header():
+    scope = {
+        'headers': [(b'x-forwarded-for', b'203.0.113.9, 198.51.100.7')],
+        'client': ('10.0.0.2', 5000)
+    }
+    assert RateLimiter([]).client_key(scope) == 'ip:10.0.0.2'
+    rate_limiter = RateLimiter([], forwarded_header='X-Forwarded-For')
+    assert rate_limiter.client_key(scope) == 'ip:198.51.100.7'
+    assert rate_limiter.client_key(
+        {'headers': [], 'client': ('10.0.0.2', 5000)}
+    ) == 'ip:10.0.0.2'
@@ -0,0 +1,18 @@
+from src.api_versions.v1.record_cache import RecordCache
+
+
+def test_least_recently_used_record_is_evicted(record):
+    cache = RecordCache(max_size=2)
+    cache.put(record(1))
+    cache.put(record(2))
+    assert cache.get(1).id == 1
+    cache.put(record(3))
+    assert cache.get(2) is None
+    assert set(cache.get_many([1, 2, 3])) == {1, 3}
+    assert cache.stats()['hits'] == 3
+
+
+def test_zero_size_disables_cache(record):
+    cache = RecordCache(max_size=0)
+    cache.put(record(1))
+    assert len(cache) == 0
@@ -0,0 +1,62 @@
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import sessionmaker
+
+from src.api_versions.v1.database import SessionRouter
+
+
+def make_router(lag=0.0):
+    primary = sessionmaker(bind=create_engine('sqlite://'))
+    replica = sessionmaker(bind=create_engine('sqlite://'))
+    router = SessionRouter(primary, replica, max_lag=5, check_interval=0)
+    router._replica_lag = lambda: lag  # noqa: SF01
+    return router, primary, replica
+
+
+def test_reads_go_to_replica():
+    router, _primary, replica = make_router()
+    assert router.read(lambda db: db.get_bind()) is replica.kw['bind']
+    assert router.stats()['replica_reads'] == 1
+
+
+def test_recent_write_is_read_from_primary():
+    router, primary, _replica = make_router()
+    router.record_write(10)
+    assert router.read(lambda db: db.get_bind(), 10) is primary.kw['bind']
+    assert router.read(lambda db: db.get_bind(), 9) is not primary.kw['bind']
+
+
+def test_lagging_replica_falls_back_to_primary():
+    router, primary, _replica = make_router(lag=60)
+    assert router.read(lambda db: db.get_bind()) is primary.kw['bind']
+
+
+def test_missing_row_and_failure_fall_back_to_primary():
+    router, primary, replica = make_router()
+
+    def load(db):
+        if db.get_bind() is replica.kw['bind']:
+            return None
+        return 'primary'
+    assert router.read(load) == 'primary'
+
+    def fail_on_replica(db):
+        if db.get_bind() is replica.kw['bind']:
+            raise OperationalError('SELECT 1', {}, Exception('down'))
+        return 'primary'
+    assert router.read(fail_on_replica) == 'primary'
+    assert not router.stats()['replica_usable']
+
+
+def test_failing_lag_check_falls_back_to_primary():
+    router, primary, _replica = make_router()
+
+    def undefined_function():
+        raise ProgrammingError(
+            'SELECT pg_last_wal_receive_lsn()', {},
+            Exception('function does not exist')
+        )
+    router._replica_lag = undefined_function  # noqa: SF01
+    assert router.read(lambda db: db.get_bind()) is primary.kw['bind']
+    assert not router.stats()['replica_usable']
+    assert router.stats()['replica_lag'] is None
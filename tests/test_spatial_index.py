@@ -0,0 +1,20 @@
+from src.spatial_index import CityIndex, haversine_km
+
+
+def test_haversine_km():
+    # Paris - London
+    assert 340 < haversine_km(48.8566, 2.3522, 51.5074, -0.1278) < 345
+
+
+def test_nearest_within_radius():
+    index = CityIndex(cell_size_km=10)
+    index.load([(1, 48.8566, 2.3522), (2, 48.90, 2.40), (3, 51.5, -0.12)])
+    assert index.nearest(48.86, 2.35, 10)[0] == 1
+    assert index.nearest(48.89, 2.39, 10)[0] == 2
+    assert index.nearest(50.0, 1.0, 10) is None
+
+
+def test_nearest_across_antimeridian():
+    index = CityIndex(cell_size_km=10)
+    index.add(1, -16.5, 179.99)
+    assert index.nearest(-16.5, -179.99, 10)[0] == 1
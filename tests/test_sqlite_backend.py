@@ -0,0 +1,108 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+
+from src.api_versions.v1 import routes
+from src.api_versions.v1.database import (
+    Base,
+    City,
+    SQLiteSession,
+    WeatherConditionMap,
+    build_engine,
+    build_sessionmaker,
+    sqlite_write_lock
+)
+from src.open_weather_api import WeatherInfo
+
+
+def test_sqlite_engine_uses_wal(tmp_path):
+    engine = build_engine('sqlite', str(tmp_path / 'weather.db'))
+    with engine.connect() as connection:
+        assert connection.execute(
+            text('PRAGMA journal_mode')
+        ).scalar() == 'wal'
+        assert connection.execute(text('PRAGMA synchronous')).scalar() == 1
+
+
+def test_concurrent_sqlite_writes(tmp_path):
+    engine = build_engine('sqlite', str(tmp_path / 'weather.db'))
+    Base.metadata.create_all(bind=engine)
+    session_maker = build_sessionmaker(engine)
+    assert issubclass(session_maker.class_, SQLiteSession)
+
+    def add_city(i):
+        db = session_maker()
+        try:
+            db.add(City(name=f'City {i}', country='XX', lat=i, lon=i))
+            db.commit()
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(add_city, range(200)))
+    db = session_maker()
+    assert db.query(City).filter(City.name.like('City %')).count() == 200
+    db.close()
+
+
+def test_sqlite_write_lock_held_from_first_write(tmp_path):
+    engine = build_engine('sqlite', str(tmp_path / 'weather.db'))
+    Base.metadata.create_all(bind=engine)
+    session_maker = build_sessionmaker(engine)
+    db = session_maker()
+    try:
+        db.add(City(name='Lock', country='XX', lat=0, lon=0))
+        db.flush()
+        assert sqlite_write_lock.locked()
+        db.commit()
+        assert not sqlite_write_lock.locked()
+
+        db.query(City).filter(City.name == 'Lock').update({'lat': 1})
+        assert sqlite_write_lock.locked()
+        db.rollback()
+        assert not sqlite_write_lock.locked()
+
+        db.execute(text("UPDATE cities SET lon = 1 WHERE name = 'Lock'"))
+        assert sqlite_write_lock.locked()
+    finally:
+        db.close()
+    assert not sqlite_write_lock.locked()
+
+
+def test_query_is_notified_and_committed_holding_write_lock(
+        tmp_path, monkeypatch
+):
+    engine = build_engine('sqlite', str(tmp_path / 'weather.db'))
+    Base.metadata.create_all(bind=engine)
+    session_maker = build_sessionmaker(engine)
+    monkeypatch.setattr(
+        routes, 'weather_conditions', WeatherConditionMap(session_maker)
+    )
+    monkeypatch.setattr(routes, 'latest_observations', {})
+    monkeypatch.setattr(
+        routes.open_weather_api, 'get_weather_data',
+        lambda *_: WeatherInfo(
+            weather_id=800, weather_name='Clear',
+            weather_description='clear sky', weather_icon='01d', temp=20,
+            pressure=1010, humidity=40, visibility=10000, wind_speed=2,
+            wind_degree=90, wind_direction='East', wind_code='E',
+            cloudiness=0, sunrise=0, sunset=0, observed_at=1700000000
+        )
+    )
+    locked = []
+    monkeypatch.setattr(
+        routes.query_notifier, 'notify',
+        lambda *_: locked.append(sqlite_write_lock.locked())
+    )
+
+    db = session_maker()
+    try:
+        db_city = City(name='Locked', country='XX', lat=0, lon=0)
+        db.add(db_city)
+        db.commit()
+        db_query = routes.add_weather_query(db, db_city)
+    finally:
+        db.close()
+    assert locked == [True]
+    assert db_query.temp == 20
+    assert not sqlite_write_lock.locked()
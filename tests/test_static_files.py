@@ -0,0 +1,52 @@
+import gzip
+import os
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.static_files import PrecompressedStaticFiles
+
+
+def test_read_only_directory(tmp_path, monkeypatch):
+    (tmp_path / 'app.js').write_text('console.log(1);\n' * 100)
+
+    def read_only(*_args):
+        raise PermissionError('Read-only file system')
+
+    monkeypatch.setattr(os, 'replace', read_only)
+    static_files = PrecompressedStaticFiles(directory=str(tmp_path))
+    monkeypatch.undo()
+    assert os.listdir(tmp_path) == ['app.js']
+
+    app = FastAPI()
+    app.mount('/static', static_files)
+    client = TestClient(app)
+    response = client.get(
+        f'/static/{static_files.url_path("app.js")}',
+        headers={'Accept-Encoding': 'gzip'}
+    )
+    assert response.status_code == 200
+    assert 'content-encoding' not in response.headers
+    assert 'immutable' in response.headers['cache-control']
+
+
+def test_incompressible_file_is_not_compressed_again(tmp_path, monkeypatch):
+    (tmp_path / 'tiny.js').write_text('1')
+    PrecompressedStaticFiles(directory=str(tmp_path))
+    assert os.path.getsize(tmp_path / 'tiny.js.gz') == 0
+
+    def compress(*_args, **_kwargs):
+        raise AssertionError('Compressed again')
+
+    monkeypatch.setattr(gzip, 'compress', compress)
+    static_files = PrecompressedStaticFiles(directory=str(tmp_path))
+
+    app = FastAPI()
+    app.mount('/static', static_files)
+    client = TestClient(app)
+    response = client.get(
+        '/static/tiny.js', headers={'Accept-Encoding': 'gzip'}
+    )
+    assert response.status_code == 200
+    assert 'content-encoding' not in response.headers
+    assert response.text == '1'
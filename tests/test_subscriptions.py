@@ -0,0 +1,83 @@
+import asyncio
+from types import SimpleNamespace
+
+from src.api_versions.v1.subscriptions import SubscriptionHub
+
+
+def test_one_poller_per_city_fans_out_latest_weather():
+    polls = []
+
+    def poll(city_id, observation_id):
+        polls.append(city_id)
+        # Weather changes on every second poll
+        new_id = len(polls) // 2
+        if new_id == observation_id:
+            return None
+        return SimpleNamespace(city_id=city_id, observation_id=new_id)
+
+    async def run():
+        hub = SubscriptionHub(poll, poll_interval=0.01)
+        first = hub.subscribe([1])
+        second = hub.subscribe([1])
+        await asyncio.sleep(0.1)
+        assert hub.stats()['cities'] == 1
+        # Not read for a while, but only the latest update is kept
+        assert len(first.take()) == 1
+        assert await second.wait(1)
+        assert len(second.take()) == 1
+
+        # New subscriber gets the latest weather at once
+        third = hub.subscribe([1])
+        assert len(third.take()) == 1
+        for subscriber in (first, second, third):
+            hub.unsubscribe(subscriber)
+        polled = len(polls)
+        await asyncio.sleep(0.05)
+        assert len(polls) == polled
+        assert hub.stats()['connections'] == 0
+        await hub.stop()
+
+    asyncio.run(run())
+
+
+def test_poll_interval_respects_upstream_budget():
+    async def run():
+        hub = SubscriptionHub(lambda *_: None, poll_interval=10,
+                              polls_per_minute=30)
+        subscriber = hub.subscribe(range(60))
+        assert hub.interval == 120
+        assert not await subscriber.wait(0.01)
+        hub.unsubscribe(subscriber)
+        assert hub.interval == 10
+
+    asyncio.run(run())
+
+
+def test_event_is_rendered_once_per_publication_and_format():
+    renders = []
+
+    def build(db_query):
+        renders.append(db_query.observation_id)
+        return f'event {db_query.observation_id}'
+
+    async def run():
+        hub = SubscriptionHub(
+            lambda city_id, _: SimpleNamespace(
+                city_id=city_id, observation_id=1
+            ),
+            poll_interval=60
+        )
+        subscribers = [hub.subscribe([1]) for _ in range(3)]
+        assert await subscribers[0].wait(1)
+        events = [
+            publication.render(('metric', 'en'), build)
+            for subscriber in subscribers
+            for publication in subscriber.take()
+        ]
+        assert events == ['event 1'] * 3
+        assert renders == [1]
+        for subscriber in subscribers:
+            hub.unsubscribe(subscriber)
+        await hub.stop()
+
+    asyncio.run(run())